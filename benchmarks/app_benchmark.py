@@ -0,0 +1,435 @@
+"""Measure the rerun latency of dagapp pages, driven headlessly with AppTest
+
+Each target (a bundled example, or a synthetic dag of a given shape and size) is
+served by `dag_app` with each page class, and timed at three moments:
+
+- cold start: the first run in a fresh process (see `time_cold_start`), in which no
+  page, index or cached value was built yet
+- first render: the first run of a new session, in a warm process
+- changes: the rerun after each change of a (main area) widget of that session
+
+Times include the overhead of `streamlit.testing.v1.AppTest` (which runs the
+script the way a server would, minus the browser), so compare them between
+revisions rather than read them as absolute latencies.
+
+Run with::
+
+    python -m benchmarks.app_benchmark [--pages simple static vectorize]
+        [--examples simple infection ...] [--shapes wide deep diamond]
+        [--sizes 10 100] [--output app_benchmark.json] [--compare old.json]
+        [--max-slowdown 1.25]
+
+The run fails (exits with status 1) if a page raised errors, or, with `--compare`,
+if the median change latency of a page (vectorize ones included) got more than
+`--max-slowdown` times (and `DFLT_MIN_REGRESSION` seconds) slower. First renders
+and cold starts, timed once, are too noisy to fail on.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from inspect import Parameter, Signature
+
+from meshed import DAG
+
+PAGES = ("simple", "static", "vectorize")
+EXAMPLES = (
+    "simple",
+    "configs",
+    "infection",
+    "consulting_fees",
+    "rent_or_buy",
+    "vectorized",
+)
+SHAPES = ("wide", "deep", "diamond")
+DFLT_SIZES = (10, 50)
+DFLT_MAX_CHANGES = 5
+DFLT_TIMEOUT = 120
+DFLT_MAX_SLOWDOWN = 1.25  # new / old timing ratio above which a page regressed
+DFLT_MIN_REGRESSION = 0.02  # seconds: slowdowns smaller than this are noise
+
+SCRIPT = """
+from benchmarks.app_benchmark import run_app
+
+run_app({target!r}, {page!r}, {size!r})
+"""
+
+
+# --------------------------------------------------------------------------------------
+# Targets
+
+
+def node_func(name, params):
+    """
+    Return a function called name, of the given (float, defaulting to 1) params,
+    returning one plus their sum.
+
+    >>> f = node_func('f', ['a', 'b'])
+    >>> f.__signature__, f(2, b=3)
+    (<Signature (a=1.0, b=1.0)>, 6)
+    """
+
+    def func(*args, **kwargs):
+        return 1 + sum(args) + sum(kwargs.values())
+
+    func.__name__ = func.__qualname__ = name
+    func.__signature__ = Signature(
+        [
+            Parameter(param, Parameter.POSITIONAL_OR_KEYWORD, default=1.0)
+            for param in params
+        ]
+    )
+    return func
+
+
+def wide_dag(n):
+    """A dag of n roots, each feeding a node of its own (n widgets, n leaves)"""
+    return DAG([node_func(f"y{i}", [f"x{i}"]) for i in range(n)])
+
+
+def deep_dag(n):
+    """A chain of n nodes from a single root"""
+    return DAG([node_func(f"y{i}", [f"y{i - 1}" if i else "x"]) for i in range(n)])
+
+
+def diamond_dag(n):
+    """A chain of n diamonds: each node feeds two nodes, which meet in the next"""
+    funcs = []
+    for i in range(n):
+        source = f"y{i - 1}" if i else "x"
+        funcs += [
+            node_func(f"l{i}", [source]),
+            node_func(f"r{i}", [source]),
+            node_func(f"y{i}", [f"l{i}", f"r{i}"]),
+        ]
+    return DAG(funcs)
+
+
+SYNTHETIC = dict(wide=wide_dag, deep=deep_dag, diamond=diamond_dag)
+
+
+def example_target(name):
+    """Return the (dags, configs) of a bundled example"""
+    from dagapp.examples import (
+        simple_example,
+        configs_example,
+        consulting_fees,
+        infection,
+        rent_or_buy,
+        vectorized_example,
+    )
+
+    if name == "simple":
+        return simple_example.dags, None
+    if name == "configs":
+        return configs_example.dags, configs_example.configs
+    if name == "infection":
+        return infection.dags, infection.configs
+    if name == "consulting_fees":
+        return [consulting_fees.get_dag()], None
+    if name == "rent_or_buy":
+        return [DAG((rent_or_buy.calculate_rent_vs_buy,))], None
+    if name == "vectorized":
+        return vectorized_example.dags, None
+    raise ValueError(f"Unknown example: {name}")
+
+
+def get_target(target, size=None):
+    """Return the (dags, configs) of an example, or of a synthetic shape of size"""
+    if target in SYNTHETIC:
+        return [SYNTHETIC[target](size)], None
+    return example_target(target)
+
+
+def page_factory(page):
+    from dagapp.page_funcs import SimplePageFunc, StaticPageFunc, VectorizePageFunc
+
+    return dict(
+        simple=SimplePageFunc, static=StaticPageFunc, vectorize=VectorizePageFunc
+    )[page]
+
+
+def run_app(target, page, size=None):
+    """The body of the benchmarked script"""
+    from dagapp.base import dag_app
+
+    dags, configs = get_target(target, size)
+    dag_app(dags, page_factory=page_factory(page), configs=configs)
+
+
+# --------------------------------------------------------------------------------------
+# Measurements
+
+
+def nudge(widget):
+    """Change the value of widget (a little), or return False if it can't be"""
+    kind = type(widget).__name__
+    if kind == "NumberInput":
+        widget.increment()
+    elif kind == "Checkbox":
+        widget.set_value(not widget.value)
+    elif kind == "Selectbox":
+        if len(widget.options) < 2:
+            return False
+        widget.select_index(((widget.index or 0) + 1) % len(widget.options))
+    elif kind == "Slider":
+        step = widget.step or 1
+        value = widget.value
+        if isinstance(value, (tuple, list)):
+            low, high = value
+            high = high - step if high - step > low else min(high + step, widget.max)
+            widget.set_range(low, type(low)(high))
+        else:
+            moved = value + step if value + step <= widget.max else value - step
+            widget.set_value(type(value)(moved))
+    else:
+        return False
+    return True
+
+
+def changeable_widgets(at):
+    widgets = []
+    for kind in ("number_input", "slider", "checkbox", "selectbox"):
+        widgets += list(getattr(at.main, kind))
+    return widgets
+
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    seconds = time.perf_counter() - start
+    errors = [str(exception.message) for exception in at.exception]
+    return seconds, errors
+
+
+def summary(seconds):
+    if not seconds:
+        return None
+    return dict(
+        mean=statistics.mean(seconds),
+        median=statistics.median(seconds),
+        max=max(seconds),
+        n=len(seconds),
+    )
+
+
+def mk_app(target, page, size=None, timeout=DFLT_TIMEOUT):
+    from streamlit.testing.v1 import AppTest
+
+    return AppTest.from_string(
+        SCRIPT.format(target=target, page=page, size=size), default_timeout=timeout
+    )
+
+
+def print_cold_start(target, page, size=None, timeout=DFLT_TIMEOUT):
+    """Print (as json) the timing of the first run of the page, in this process"""
+    seconds, errors = timed_run(mk_app(target, page, size, timeout))
+    print(json.dumps(dict(seconds=seconds, errors=errors)))
+
+
+def time_cold_start(target, page, size=None, timeout=DFLT_TIMEOUT):
+    """
+    Return the timing (and errors) of the first run of the page in a fresh process,
+    which, as a freshly started server, has none of the process-wide caches of
+    dagapp filled (nor its on-disk result store: it gets an empty one)
+    """
+    args = ", ".join(map(repr, (target, page, size, timeout)))
+    code = "from benchmarks.app_benchmark import print_cold_start\n"
+    code += f"print_cold_start({args})"
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DAGAPP_RESULT_STORE=os.path.join(directory, "store"))
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["seconds"], result["errors"]
+
+
+def bench_app(
+    target, page, size=None, max_changes=DFLT_MAX_CHANGES, timeout=DFLT_TIMEOUT
+):
+    """Return the timings (in seconds) of the page of target"""
+
+    def app():
+        return mk_app(target, page, size, timeout)
+
+    cold_start, errors = time_cold_start(target, page, size, timeout)
+    timed_run(app())  # warms this process up, if no earlier target did
+    at = app()
+    first_render, more_errors = timed_run(at)
+    errors += more_errors
+    changes = []
+    for i in range(max_changes):
+        widgets = changeable_widgets(at)  # the element tree is rebuilt by each run
+        if i >= len(widgets):
+            break
+        widget = widgets[i]
+        if not nudge(widget):
+            continue
+        seconds, more_errors = timed_run(at)
+        errors += more_errors
+        label = getattr(widget, "label", "")
+        changes.append(dict(widget=label, kind=type(widget).__name__, seconds=seconds))
+    return dict(
+        target=target,
+        page=page,
+        size=size,
+        cold_start=cold_start,
+        first_render=first_render,
+        changes=changes,
+        change_latency=summary([change["seconds"] for change in changes]),
+        errors=sorted(set(errors)),
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import streamlit
+
+    return dict(
+        revision=git_revision(),
+        date=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        python=platform.python_version(),
+        streamlit=streamlit.__version__,
+        machine=platform.machine(),
+    )
+
+
+def run_benchmarks(pages, examples, shapes, sizes, max_changes, timeout):
+    targets = [(example, None) for example in examples]
+    targets += [(shape, size) for shape in shapes for size in sizes]
+    results = []
+    for target, size in targets:
+        for page in pages:
+            result = bench_app(target, page, size, max_changes, timeout)
+            print_result(result)
+            results.append(result)
+    return dict(environment=environment(), results=results)
+
+
+# --------------------------------------------------------------------------------------
+# Reporting
+
+
+def result_name(result):
+    size = result["size"]
+    return f"{result['target']}{'' if size is None else f'[{size}]'}/{result['page']}"
+
+
+def median_change(result):
+    latency = result.get("change_latency")
+    return latency["median"] if latency else float("nan")
+
+
+def print_result(result):
+    errors = f"  {len(result['errors'])} error(s)" if result["errors"] else ""
+    print(
+        f"{result_name(result):<32}{result['cold_start'] * 1e3:>10.0f}"
+        f"{result['first_render'] * 1e3:>10.0f}{median_change(result) * 1e3:>10.0f}"
+        f"{errors}"
+    )
+
+
+def regressed(new_seconds, old_seconds, max_slowdown=DFLT_MAX_SLOWDOWN):
+    """
+    Whether a timing of new_seconds regressed from old_seconds
+
+    >>> regressed(0.5, 0.2), regressed(0.21, 0.2), regressed(0.015, 0.005)
+    (True, False, False)
+    """
+    return (
+        new_seconds > max_slowdown * old_seconds
+        and new_seconds - old_seconds > DFLT_MIN_REGRESSION
+    )
+
+
+def compare(old, new, max_slowdown=DFLT_MAX_SLOWDOWN):
+    """
+    Print the ratios of the timings of new to old (results of `run_benchmarks`), and
+    return the names of the pages whose median change latency regressed
+    """
+    old_results = {result_name(result): result for result in old["results"]}
+    print(f"{'page':<32}{'cold':>8}{'first':>8}{'change':>8}  (new / old)")
+    regressions = []
+    for result in new["results"]:
+        name = result_name(result)
+        if name not in old_results:
+            continue
+        previous = old_results[name]
+        ratios = [
+            result["cold_start"] / previous["cold_start"],
+            result["first_render"] / previous["first_render"],
+            median_change(result) / median_change(previous),
+        ]
+        slower = regressed(median_change(result), median_change(previous), max_slowdown)
+        if slower:
+            regressions.append(name)
+        print(
+            f"{name:<32}"
+            + "".join(f"{ratio:>8.2f}" for ratio in ratios)
+            + ("  regressed" if slower else "")
+        )
+    return regressions
+
+
+def main(
+    pages=PAGES,
+    examples=EXAMPLES,
+    shapes=SHAPES,
+    sizes=DFLT_SIZES,
+    max_changes=DFLT_MAX_CHANGES,
+    timeout=DFLT_TIMEOUT,
+    output="app_benchmark.json",
+    compare_to=None,
+    max_slowdown=DFLT_MAX_SLOWDOWN,
+):
+    """Run the benchmarks, returning 1 if some page failed (see the module's doc)"""
+    print(f"{'page':<32}{'cold (ms)':>10}{'first':>10}{'change':>10}")
+    benchmarks = run_benchmarks(pages, examples, shapes, sizes, max_changes, timeout)
+    with open(output, "w") as file:
+        json.dump(benchmarks, file, indent=2)
+    print(f"Results written to {output}")
+    failures = [result_name(r) for r in benchmarks["results"] if r["errors"]]
+    if compare_to:
+        with open(compare_to) as file:
+            failures += compare(json.load(file), benchmarks, max_slowdown)
+    if failures:
+        print(f"Failed: {', '.join(dict.fromkeys(failures))}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="*", choices=PAGES, default=PAGES)
+    parser.add_argument("--examples", nargs="*", choices=EXAMPLES, default=EXAMPLES)
+    parser.add_argument("--shapes", nargs="*", choices=SHAPES, default=SHAPES)
+    parser.add_argument("--sizes", nargs="*", type=int, default=DFLT_SIZES)
+    parser.add_argument("--max-changes", type=int, default=DFLT_MAX_CHANGES)
+    parser.add_argument("--timeout", type=float, default=DFLT_TIMEOUT)
+    parser.add_argument("--output", default="app_benchmark.json")
+    parser.add_argument("--compare", dest="compare_to", default=None)
+    parser.add_argument("--max-slowdown", type=float, default=DFLT_MAX_SLOWDOWN)
+    sys.exit(main(**vars(parser.parse_args())))
@@ -0,0 +1,104 @@
+"""Measure the import time of dagapp modules, and check what they import
+
+Each module is imported in fresh interpreters (the best of `--repeat` runs is
+kept), so the times include everything the module imports. The headless modules
+(the ones that don't display anything) must not import the heavy dependencies
+they don't need: the script exits with an error if one of them does, or if an
+import got slower than `--max-seconds`.
+
+Run with::
+
+    python -m benchmarks.import_benchmark [--repeat N] [--max-seconds S]
+        [--output import_benchmark.json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY = ("streamlit", "pandas", "numpy")
+
+# module -> the heavy dependencies it must not import
+HEADLESS = {
+    "dagapp": HEAVY,
+    "dagapp.utils": HEAVY,
+    "dagapp.index": HEAVY,
+    "dagapp.session": HEAVY,
+    "dagapp.cache": HEAVY,
+    "dagapp.disk_cache": HEAVY,
+    "dagapp.budget": HEAVY,
+    "dagapp.profiling": HEAVY,
+    "dagapp.parallel": ("streamlit", "pandas"),
+    "dagapp.vectorize": ("streamlit", "pandas"),
+    "dagapp.batch": ("streamlit", "pandas"),
+    "dagapp.sensitivity": HEAVY,
+    "dagapp.goal_seek": HEAVY,
+    "dagapp.charts": ("streamlit",),
+}
+UI = ("dagapp.base", "dagapp.page_funcs")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps(dict(seconds=seconds, heavy=heavy)))
+"""
+
+
+def probe(module):
+    """Return the time to import module in a fresh interpreter, and what it imported"""
+    script = PROBE.format(module=module, heavy=HEAVY)
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def bench_module(module, repeat=3):
+    runs = [probe(module) for _ in range(repeat)]
+    return dict(
+        module=module,
+        seconds=min(run["seconds"] for run in runs),
+        heavy=runs[0]["heavy"],
+    )
+
+
+def regressions(result, max_seconds=None):
+    """Return the problems of an import benchmark result (an empty list if none)"""
+    problems = []
+    forbidden = set(HEADLESS.get(result["module"], ())) & set(result["heavy"])
+    if forbidden:
+        problems.append(f"imports {', '.join(sorted(forbidden))}")
+    if max_seconds is not None and result["seconds"] > max_seconds:
+        problems.append(f"took more than {max_seconds:g}s")
+    return problems
+
+
+def main(repeat=3, max_seconds=None, output=None):
+    print(f"{'module':<20}{'import (ms)':>12}  heavy dependencies")
+    results, failed = [], False
+    for module in [*HEADLESS, *UI]:
+        result = bench_module(module, repeat)
+        result["problems"] = regressions(result, max_seconds)
+        failed = failed or bool(result["problems"])
+        results.append(result)
+        problems = f"  <- {'; '.join(result['problems'])}" if result["problems"] else ""
+        print(
+            f"{module:<20}{result['seconds'] * 1e3:>12.0f}"
+            f"  {', '.join(result['heavy']) or '-'}{problems}"
+        )
+    if output:
+        with open(output, "w") as file:
+            json.dump(results, file, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--output", default=None)
+    sys.exit(main(**vars(parser.parse_args())))
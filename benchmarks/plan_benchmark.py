@@ -0,0 +1,97 @@
+"""Compare evaluating the example DAGs with an ExecutionPlan vs with reflection
+
+The reflective path is the one `dagapp.utils._compute_node_value` used to take:
+`inspect.signature` and a dict lookup per parameter, on every node evaluation.
+
+Run with::
+
+    python -m benchmarks.plan_benchmark [--number N]
+"""
+
+import argparse
+import inspect
+import timeit
+from inspect import Parameter
+
+from meshed.dag import DAG
+
+from dagapp.index import DagIndex
+
+
+def example_dags():
+    """Yield (name, dag) pairs for the bundled examples"""
+    from dagapp.examples import (
+        simple_example,
+        configs_example,
+        consulting_fees,
+        infection,
+        rent_or_buy,
+        vectorized_example,
+    )
+
+    yield "simple", simple_example.dags[0]
+    yield "configs_profit", configs_example.dags[0]
+    yield "configs_revenue", configs_example.dags[1]
+    yield "consulting_fees", consulting_fees.get_dag()
+    yield "infection", infection.dags[0]
+    yield "rent_or_buy", DAG((rent_or_buy.calculate_rent_vs_buy,))
+    yield "vectorized", vectorized_example.dags[0]
+
+
+def reflective_node_value(func_node, values):
+    """Compute a node the way it was done before execution plans"""
+    func = func_node.func
+    args, kwargs = [], {}
+    for name, param in inspect.signature(func).parameters.items():
+        if name not in values:
+            if param.default is not inspect._empty:
+                continue
+            _ = values[name]
+        if param.kind == Parameter.POSITIONAL_ONLY:
+            args.append(values[name])
+        elif param.kind == Parameter.VAR_POSITIONAL:
+            args.extend(values.get(name, ()))
+        elif param.kind == Parameter.VAR_KEYWORD:
+            kwargs.update(values.get(name, {}))
+        else:
+            kwargs[name] = values[name]
+    return func(*args, **kwargs)
+
+
+def bench_dag(dag, number):
+    """Return the mean seconds per full evaluation, (reflective, plan)"""
+    index = DagIndex(dag)
+    roots = {node: index.defaults[node] for node in index.roots}
+    non_roots = [node for node in index.order if node not in index.roots]
+
+    def reflective():
+        values = dict(roots)
+        for node in non_roots:
+            values[node] = reflective_node_value(index.funcs[node], values)
+
+    plan = index.plan
+
+    def planned():
+        plan.run(plan.load(roots))
+
+    assert plan(**roots) == {**index.defaults}, "plan and defaults disagree"
+    return (
+        timeit.timeit(reflective, number=number) / number,
+        timeit.timeit(planned, number=number) / number,
+    )
+
+
+def main(number=2000):
+    print(f"{'dag':<18}{'nodes':>6}{'reflective (us)':>18}{'plan (us)':>12}{'x':>7}")
+    for name, dag in example_dags():
+        reflective, planned = bench_dag(dag, number)
+        print(
+            f"{name:<18}{len(dag.var_nodes):>6}{reflective * 1e6:>18.1f}"
+            f"{planned * 1e6:>12.1f}{reflective / planned:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    main(parser.parse_args().number)
@@ -1,3 +1,23 @@
 """Making apps from DAGs"""
 
-from dagapp.base import dag_app
+import importlib
+
+# imported on first use (see __getattr__), so that `import dagapp` doesn't import
+# streamlit
+_LAZY_ATTRS = {
+    "dag_app": "dagapp.base",
+    "DagSession": "dagapp.session",
+    "batch_evaluate": "dagapp.batch",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_ATTRS])
@@ -0,0 +1,63 @@
+"""The processes `dagapp.parallel.WorkerPool` runs calls in.
+
+A worker is started as `python -m dagapp._worker`, so, unlike the processes of a
+multiprocessing "spawn" context, it doesn't run the parent's main script (the app's,
+under streamlit). It reads pickled `(func, args, kwargs)` calls on its stdin, and
+writes back pickled `(ok, result_or_error)` replies on its stdout, until its stdin is
+closed. Messages are prefixed with their length (see `send` and `receive`).
+"""
+
+import os
+import pickle
+import struct
+import sys
+
+_HEADER = struct.Struct("!Q")
+
+
+def send(file, data):
+    """Write the bytes data to file, prefixed with their length"""
+    file.write(_HEADER.pack(len(data)))
+    file.write(data)
+    file.flush()
+
+
+def receive(file):
+    """Read the bytes written by `send` from file, raising EOFError if it's closed"""
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise EOFError("The other end of the pipe was closed")
+    (size,) = _HEADER.unpack(header)
+    data = file.read(size)
+    if len(data) < size:
+        raise EOFError("The other end of the pipe was closed")
+    return data
+
+
+def _reply(data):
+    try:
+        func, args, kwargs = pickle.loads(data)
+        reply = True, func(*args, **kwargs)
+    except Exception as error:
+        reply = False, error
+    try:
+        return pickle.dumps(reply, pickle.HIGHEST_PROTOCOL)
+    except Exception as error:
+        return pickle.dumps((False, RuntimeError(f"Unpicklable reply: {error!r}")))
+
+
+def main():
+    calls = sys.stdin.buffer
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    # what the called functions print goes to stderr, not in the replies
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    while True:
+        try:
+            data = receive(calls)
+        except EOFError:
+            break
+        send(replies, _reply(data))
+
+
+if __name__ == "__main__":
+    main()
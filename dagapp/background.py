@@ -0,0 +1,119 @@
+"""Running recomputes on worker threads, abandoning the ones newer inputs supersede"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+DFLT_BACKGROUND_WORKERS = 4
+DFLT_POLL_INTERVAL = 0.5  # seconds between the checks of whether a run finished
+
+
+class Abandoned(Exception):
+    """Raised inside a job whose generation was superseded by a newer one"""
+
+
+_executor = None
+_executor_lock = Lock()
+
+
+def background_executor():
+    """Return the process-wide thread pool background jobs run on"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DFLT_BACKGROUND_WORKERS, thread_name_prefix="dagapp"
+            )
+        return _executor
+
+
+class BackgroundRunner:
+    """
+    Runs the jobs submitted to it on a worker thread, one generation at a time.
+
+    A job is a function taking a `check` function, that it should call between
+    steps (typically before computing each node): once a newer job is submitted,
+    `check` raises `Abandoned`, so that stale runs stop early instead of queuing
+    up. A job returns the mapping of (state) keys to the values it computed,
+    which `pop_results` hands over once, and only if no newer job was submitted.
+
+    >>> import time
+    >>> runner = BackgroundRunner()
+    >>> def slow_job(check):
+    ...     for i in range(100):
+    ...         check()
+    ...         time.sleep(0.01)
+    ...     return {'x': 'slow'}
+    >>> _ = runner.submit(slow_job, stale=['x'])
+    >>> _ = runner.submit(lambda check: {'x': 'fast'}, stale=['x'])
+    >>> runner.wait()
+    >>> runner.pop_results()
+    {'x': 'fast'}
+    >>> runner.pop_results(), runner.stale
+    (None, frozenset())
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.generation = 0
+        self.stale = frozenset()  # the keys whose (displayed) values are outdated
+        self.error = None
+        self._results = None
+        self._future = None
+        self._lock = Lock()
+
+    def check(self, generation):
+        if generation != self.generation:
+            raise Abandoned(f"Generation {generation} was superseded")
+
+    def submit(self, job, stale=()):
+        """Run job on a worker thread, superseding the previously submitted one"""
+        executor = self.executor or background_executor()
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            if self._future is not None:
+                self._future.cancel()  # only cancels it if it didn't start yet
+            self.stale |= frozenset(stale)
+            self.error = None
+            self._future = executor.submit(self._run, job, generation)
+        return generation
+
+    def _run(self, job, generation):
+        try:
+            results = job(partial(self.check, generation))
+        except Abandoned:
+            return
+        except Exception as error:
+            with self._lock:
+                if generation == self.generation:
+                    self.error = error
+                    self.stale = frozenset()
+            return
+        with self._lock:
+            if generation == self.generation:
+                self._results = results
+
+    @property
+    def pending(self):
+        """Whether the results of the last job are waiting to be popped"""
+        return self._results is not None
+
+    @property
+    def running(self):
+        future = self._future
+        return future is not None and not future.done()
+
+    def wait(self, timeout=None):
+        """Wait for the current job to finish"""
+        future = self._future
+        if future is not None:
+            future.exception(timeout)
+
+    def pop_results(self):
+        """Return the results of the last job if they weren't returned yet, or None"""
+        with self._lock:
+            results, self._results = self._results, None
+            if results is not None:
+                self.stale = frozenset()
+            return results
@@ -1,7 +1,9 @@
 """The base components for making apps from DAGs"""
 
+from threading import RLock
+
 import streamlit as st
-from dagapp.utils import check_configs, get_default_configs
+from dagapp.utils import check_configs, get_default_configs, dag_fingerprint, freeze
 from dagapp.page_funcs import SimplePageFunc
 
 
@@ -16,14 +18,13 @@ def get_page_callbacks(dags, page_names, page_factory, configs):
     ]
 
 
-def get_pages_specs(dags, page_factory, configs):
+def get_page_names(dags, configs):
     """
-    Return a mapping of page names to page callback objects.
+    Return the page name of each dag.
 
-    The `configs` argument is an iterable of per-dag config dicts. If a config
-    provides `page_name` or `page_title` that string will be used as the page
-    name (and as the page title passed to the page factory). Otherwise a name
-    is autogenerated from the dag via `dag_to_page_name`.
+    If a config provides `page_name` or `page_title` that string will be used as
+    the page name. Otherwise a name is autogenerated from the dag via
+    `dag_to_page_name`.
     """
     page_names = []
     for dag, config in zip(dags, configs):
@@ -34,22 +35,95 @@ def get_pages_specs(dags, page_factory, configs):
         if not page_name:
             page_name = dag_to_page_name(dag)
         page_names.append(page_name)
+    return page_names
+
 
+def get_pages_specs(dags, page_factory, configs):
+    """
+    Return a mapping of page names to page callback objects.
+
+    The `configs` argument is an iterable of per-dag config dicts. If a config
+    provides `page_name` or `page_title` that string will be used as the page
+    name (and as the page title passed to the page factory). Otherwise a name
+    is autogenerated from the dag via `dag_to_page_name`.
+    """
+    page_names = get_page_names(dags, configs)
     page_callbacks = get_page_callbacks(dags, page_names, page_factory, configs)
     return dict(zip(page_names, page_callbacks))
 
 
-def dag_app(dags, page_factory=SimplePageFunc, configs=None):
-    if configs is None:
-        configs = get_default_configs(dags)
+class PageRegistry:
+    """
+    Process-wide store of page objects, so that streamlit reruns don't rebuild them.
+
+    Pages are built lazily (only when requested) and are keyed by the dag's
+    fingerprint (see `dagapp.utils.dag_fingerprint`), the page factory, the page
+    name and the config, so a script that rebuilds its DAGs on every rerun still
+    gets the pages it built the first time.
+    Page objects are shared by all sessions: they must keep their per-session
+    state in `st.session_state`, never on `self`.
+    """
 
-    check_configs(dags, configs)
+    def __init__(self):
+        self._pages = dict()
+        self._configs = dict()
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_configs(self, dags, configs=None):
+        """
+        Return the (default if `configs` is None) configs of dags, checked once
+        """
+        key = (tuple(map(dag_fingerprint, dags)), freeze(configs))
+        with self._lock:
+            if key not in self._configs:
+                if configs is None:
+                    configs = get_default_configs(dags)
+                check_configs(dags, configs)
+                self._configs[key] = configs
+            return self._configs[key]
+
+    def get_page(self, dag, page_name, page_factory, config):
+        """
+        Return the page for dag, building it if it's not already in the registry
+        """
+        key = (dag_fingerprint(dag), page_factory, page_name, freeze(config))
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                page = self._pages[key] = page_factory(dag, page_name, **config)
+            else:
+                self.hits += 1
+            return page
+
+    @property
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, pages=len(self._pages))
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._configs.clear()
+            self.hits = self.misses = 0
+
+
+page_registry = PageRegistry()
+
+
+def dag_app(dags, page_factory=SimplePageFunc, configs=None, registry=page_registry):
+    dags = list(dags)
+    configs = registry.get_configs(dags, configs)
 
     # st.set_page_config(layout="wide")
 
-    pages = get_pages_specs(dags, page_factory, configs)
+    page_names = get_page_names(dags, configs)
+    # like get_pages_specs, later pages win when names collide
+    page_idx = {page_name: i for i, page_name in enumerate(page_names)}
 
     st.sidebar.title("Navigation")
-    page = st.sidebar.radio("Select your page", tuple(pages.keys()))
+    page = st.sidebar.radio("Select your page", tuple(page_idx))
 
-    pages[page]()
+    i = page_idx[page]
+    registry.get_page(dags[i], page, page_factory, configs[i])()
@@ -0,0 +1,293 @@
+"""Evaluating a DAG on a table of scenarios, one row of root values per scenario"""
+
+import os
+import time
+
+import numpy as np
+
+from dagapp.index import DagIndex, dag_index
+from dagapp.utils import LazyModule, get_root_values
+from dagapp.vectorize import call_step
+
+pd = LazyModule("pandas")
+
+DFLT_BATCH_CHUNK_SIZE = 50_000  # rows of the chunks files are evaluated in
+FILE_FORMATS = ("csv", "parquet")
+
+
+def _column(value, n):
+    """Return value as a 1d array of n values (repeating it if it's not one)"""
+    array = np.asarray(value) if not isinstance(value, np.ndarray) else value
+    if array.shape == (n,):
+        return array
+    if array.ndim == 0:
+        return np.repeat(array, n)
+    column = np.empty(n, dtype=object)  # e.g. a list computed once for all rows
+    column[:] = [value] * n
+    return column
+
+
+def batch_evaluate(
+    dag,
+    scenarios,
+    nodes=None,
+    *,
+    fixed=None,
+    modes=None,
+    executor=None,
+    check=None,
+    profiler=None,
+):
+    """
+    Evaluate dag for each row of the scenarios table, whose columns are (some of)
+    the roots of dag, returning a table (with the same index) of the values of the
+    roots and the nodes.
+
+    The roots that aren't columns of scenarios take their `fixed` value, or their
+    default one (see `dagapp.utils.get_root_values`). Each node function is called
+    once on whole columns if it supports numpy broadcasting, and on each row
+    otherwise (see `dagapp.vectorize.vectorized_call`), and the nodes that don't
+    depend on any column are computed once.
+
+    :param dag: The dag, or its `dagapp.index.DagIndex`
+    :param scenarios: A `pandas.DataFrame` (or a mapping of root names to columns)
+    :param nodes: The nodes to output (all the non-root nodes by default)
+    :param fixed: Values of the roots that aren't columns of scenarios
+    :param modes: A mapping of nodes to the `dagapp.vectorize.VEC_MODES` to call
+        their functions with
+    :param executor: The `dagapp.parallel.SweepExecutor` of the "parallel" nodes
+    :param check: A function called before computing each node (that can raise to
+        abandon the evaluation)
+    :param profiler: A `dagapp.profiling.NodeProfiler` timing the computations of
+        the nodes
+
+    >>> from meshed.dag import DAG
+    >>> def fees(hours, rate=100):
+    ...     return hours * rate
+    >>> def band(fees):
+    ...     return 'high' if fees > 1000 else 'low'  # doesn't support arrays
+    >>> scenarios = pd.DataFrame(
+    ...     dict(hours=[5, 20, 8], rate=[100, 80, 150]), index=['ann', 'bob', 'cy']
+    ... )
+    >>> batch_evaluate(DAG((fees, band)), scenarios)
+         hours  rate  fees  band
+    ann      5   100   500   low
+    bob     20    80  1600  high
+    cy       8   150  1200  high
+    >>> batch_evaluate(DAG((fees, band)), dict(hours=[5, 20]))
+       hours  rate  fees  band
+    0      5   100   500   low
+    1     20   100  2000  high
+
+    Results computed on whole columns are only kept if they're right for every row
+    (see `dagapp.vectorize.broadcast_call`): a row overflowing numpy integers gets
+    the function called on each row instead.
+
+    >>> def cube(x):
+    ...     return x ** 3
+    >>> batch_evaluate(DAG([cube]), dict(x=[1, 3_000_000, 2]))['cube'].tolist()
+    [1, 27000000000000000000, 8]
+    """
+    index = dag if isinstance(dag, DagIndex) else dag_index(dag)
+    plan = index.plan
+    if not isinstance(scenarios, pd.DataFrame):
+        scenarios = pd.DataFrame(scenarios)
+    unknown = [column for column in scenarios.columns if column not in index.roots]
+    if unknown:
+        raise ValueError(f"Not roots of the dag: {', '.join(map(str, unknown))}")
+    steps = {step.node: step for step in plan.steps}
+    nodes = list(nodes or (node for node in plan.nodes if node in steps))
+    modes = modes or {}
+
+    needed = set(nodes)
+    for node in reversed(plan.nodes):
+        if node in needed and node in steps:
+            needed.update(steps[node].sources)
+
+    columns = {root: scenarios[root].to_numpy() for root in scenarios.columns}
+    roots = {**get_root_values(index.dag), **(fixed or {}), **columns}
+    values = plan.load(roots)
+    for step in plan.steps:
+        if step.node not in needed:
+            continue
+        if check is not None:
+            check()
+        mode = modes.get(step.node, "auto")
+        if profiler is None:
+            values[step.out] = call_step(step, values, mode, executor)
+        else:
+            args = (step, values, mode, executor)
+            values[step.out] = profiler.call(step.node, call_step, args, {})
+
+    n = len(scenarios)
+    outputs = [root for root in index.nodes if root in index.roots and root in roots]
+    return pd.DataFrame(
+        {node: _column(values[plan.slot[node]], n) for node in [*outputs, *nodes]},
+        index=scenarios.index,
+    )
+
+
+# ------------------------------------ FILES ------------------------------------
+
+
+def file_format(name):
+    """
+    Return the format of a file from its name: "parquet" for .parquet and .pq
+    files, "csv" for the others
+
+    >>> file_format('clients.pq'), file_format('clients.csv')
+    ('parquet', 'csv')
+    """
+    extension = os.path.splitext(str(name))[1].lower()
+    return "parquet" if extension in (".parquet", ".pq") else "csv"
+
+
+def _check_format(format):
+    if format not in FILE_FORMATS:
+        raise ValueError(f"format should be one of {FILE_FORMATS}, was {format!r}")
+
+
+def read_chunks(source, format="csv", chunk_size=None):
+    """
+    Yield the rows of a csv or parquet file (a path or a file object) as tables of
+    at most `chunk_size` rows, reading the file as they're asked for
+    """
+    _check_format(format)
+    chunk_size = chunk_size or DFLT_BATCH_CHUNK_SIZE
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        with pd.read_csv(source, chunksize=chunk_size) as reader:
+            yield from reader
+
+
+def count_rows(source, format="csv"):
+    """
+    Return the number of rows of a parquet file (read from its metadata), or None
+    for a csv file (which would have to be read through)
+    """
+    _check_format(format)
+    if format != "parquet":
+        return None
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(source).metadata.num_rows
+
+
+def write_chunks(chunks, target, format="csv"):
+    """
+    Write tables (with the same columns) to a csv or parquet file (a path or a file
+    object) as they come, returning the number of rows written
+
+    >>> import io
+    >>> chunks = [pd.DataFrame(dict(a=[]), dtype=int), pd.DataFrame(dict(a=[1, 2]))]
+    >>> target = io.StringIO()
+    >>> write_chunks(chunks, target)
+    2
+    >>> target.getvalue().split()
+    ['a', '1', '2']
+    """
+    _check_format(format)
+    if isinstance(target, (str, os.PathLike)):
+        mode = "wb" if format == "parquet" else "w"
+        with open(target, mode, newline="" if mode == "w" else None) as file:
+            return write_chunks(chunks, file, format)
+    rows = 0
+    if format == "csv":
+        header = True  # written once, even if the first chunks are empty
+        for chunk in chunks:
+            chunk.to_csv(target, header=header, index=False)
+            header = False
+            rows += len(chunk)
+        return rows
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            schema = None if writer is None else writer.schema
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(target, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def enrich(dag, chunk, nodes=None, **batch_kwargs):
+    """
+    Return the chunk table with the values of nodes (all the non-root nodes by
+    default) as additional columns, its columns named after roots of dag being
+    the inputs of the evaluation (see `batch_evaluate`, which `batch_kwargs` are
+    passed to), and its other columns kept as they are
+    """
+    index = dag if isinstance(dag, DagIndex) else dag_index(dag)
+    roots = [column for column in chunk.columns if column in index.roots]
+    results = batch_evaluate(index, chunk[roots], nodes, **batch_kwargs)
+    computed = [column for column in results.columns if column not in index.roots]
+    return chunk.assign(**{node: results[node] for node in computed})
+
+
+def evaluate_file(
+    dag,
+    source,
+    target,
+    nodes=None,
+    *,
+    format="csv",
+    output_format=None,
+    chunk_size=None,
+    progress=None,
+    **batch_kwargs,
+):
+    """
+    Evaluate dag on each row of a csv or parquet file, chunk by chunk, writing the
+    rows enriched with the values of the nodes (see `enrich`) to the target file as
+    they are computed, so that memory use is bounded by the chunk size whatever the
+    size of the file. Returns the number of rows written.
+
+    :param source: The path or file object of the file of scenarios
+    :param target: The path or file object of the file to write the results to
+    :param nodes: The nodes to output (all the non-root nodes by default)
+    :param format: The format of source, one of `FILE_FORMATS`
+    :param output_format: The format of target (that of source by default)
+    :param chunk_size: The number of rows evaluated at once
+    :param progress: A function called after each chunk with the number of rows
+        written so far and the number of seconds it took
+    :param batch_kwargs: The other arguments of `batch_evaluate` (`fixed`,
+        `modes`, `executor`, `check` and `profiler`)
+
+    >>> import io
+    >>> from meshed.dag import DAG
+    >>> def fees(hours, rate=100):
+    ...     return hours * rate
+    >>> def band(fees):
+    ...     return 'high' if fees > 1000 else 'low'
+    >>> source = io.StringIO("client,hours\\nann,5\\nbob,20\\ncy,8\\n")
+    >>> target = io.StringIO()
+    >>> evaluate_file(DAG((fees, band)), source, target, chunk_size=2)
+    3
+    >>> print(target.getvalue())
+    client,hours,fees,band
+    ann,5,500,low
+    bob,20,2000,high
+    cy,8,800,low
+    """
+    start = time.perf_counter()
+
+    def enriched_chunks():
+        rows = 0
+        for chunk in read_chunks(source, format, chunk_size):
+            yield enrich(dag, chunk, nodes, **batch_kwargs)
+            rows += len(chunk)  # once the chunk was written
+            if progress is not None:
+                progress(rows, time.perf_counter() - start)
+
+    return write_chunks(enriched_chunks(), target, output_format or format)
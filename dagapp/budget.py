@@ -0,0 +1,154 @@
+"""Bounding the time the computation of a node can take"""
+
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import partial
+from threading import BoundedSemaphore, Event, Lock
+
+from dagapp.cache import args_key
+
+DFLT_BUDGET_WORKERS = 8
+DFLT_MAX_LATE = 8  # overrunning calls whose results are kept, per node
+DFLT_MAX_OVERRUNS = 2  # overrunning calls still running, per node (and session)
+
+
+class OverBudget(TimeoutError):
+    """Raised when a node's function doesn't return within its time budget"""
+
+
+_executor = None
+_executor_lock = Lock()
+# a call only gets a worker if one is free, so none waits in the executor's queue
+_free_workers = BoundedSemaphore(DFLT_BUDGET_WORKERS)
+
+
+def budget_executor():
+    """Return the process-wide thread pool budgeted calls run on"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DFLT_BUDGET_WORKERS, thread_name_prefix="dagapp-budget"
+            )
+        return _executor
+
+
+class _Run:
+    """A call on a worker of the `budget_executor`, that records when it started"""
+
+    def __init__(self, func, args, kwargs):
+        self.func, self.args, self.kwargs = func, args, kwargs
+        self.started = Event()
+        self.start = None
+
+    def __call__(self):
+        self.start = time.perf_counter()
+        self.started.set()
+        try:
+            return self.func(*self.args, **self.kwargs)
+        finally:
+            _free_workers.release()
+
+
+class TimeBudget:
+    """
+    Calls functions on a worker thread, giving up waiting for them after they ran
+    for `seconds`.
+
+    A call that overruns its budget isn't interrupted: it goes on, and the next
+    call with the same arguments waits for it (for at most `seconds` again)
+    instead of starting over, so a slow result shows up as soon as it's ready.
+
+    Calls never wait for a worker: when all the workers (shared by all sessions)
+    are busy, or when `max_overruns` calls of this budget are still running past
+    theirs, a call is given up on right away, without being started.
+
+    >>> budget = TimeBudget(0.05, max_overruns=1)
+    >>> def slow(x):
+    ...     time.sleep(0.2)
+    ...     return x * 2
+    >>> budget.call(slow, (21,), {})
+    Traceback (most recent call last):
+      ...
+    dagapp.budget.OverBudget: slow took more than 0.05s
+    >>> time.sleep(0.3)
+    >>> budget.call(slow, (21,), {})  # the result of the first call
+    42
+    >>> budget.call(slow, (1,), {})
+    Traceback (most recent call last):
+      ...
+    dagapp.budget.OverBudget: slow took more than 0.05s
+    >>> budget.call(slow, (2,), {})  # not started while the last one overruns
+    Traceback (most recent call last):
+      ...
+    dagapp.budget.OverBudget: slow is still computing 1 earlier value(s)
+    """
+
+    def __init__(self, seconds, max_late=DFLT_MAX_LATE, max_overruns=DFLT_MAX_OVERRUNS):
+        self.seconds = seconds
+        self.max_late = max_late
+        self.max_overruns = max_overruns
+        self._late = OrderedDict()  # args key -> future of an overrunning call
+        self._lock = Lock()
+
+    def call(self, func, args, kwargs):
+        """Return func(*args, **kwargs), or raise `OverBudget` if it takes too long"""
+        name = getattr(func, "__name__", repr(func))
+        key = args_key(args, kwargs)
+        with self._lock:
+            future = self._late.pop(key, None) if key is not None else None
+            overruns = sum(not late.done() for late in self._late.values())
+        if future is not None:
+            timeout = self.seconds
+        else:
+            if overruns >= self.max_overruns:
+                raise OverBudget(
+                    f"{name} is still computing {overruns} earlier value(s)"
+                )
+            run = _Run(func, args, kwargs)
+            future = _submit(run, name)
+            run.started.wait()
+            timeout = max(0.0, run.start + self.seconds - time.perf_counter())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            if key is not None:
+                with self._lock:
+                    self._late[key] = future
+                    while len(self._late) > self.max_late:
+                        self._late.popitem(last=False)
+            raise OverBudget(f"{name} took more than {self.seconds:g}s") from None
+
+
+def _submit(run, name):
+    """Start run on a free worker, or raise `OverBudget` if there's none"""
+    if not _free_workers.acquire(blocking=False):
+        raise OverBudget(f"No worker was free to compute {name}")
+    try:
+        return budget_executor().submit(run)
+    except BaseException:
+        _free_workers.release()
+        raise
+
+
+class Budgeted:
+    """
+    Computes values within a `TimeBudget`, through a cache (anything with a
+    `call(func, args, kwargs)` method, such as a `dagapp.cache.CacheChain`) if
+    one is given, so that only values computed in time are cached.
+    """
+
+    def __init__(self, budget, cache=None):
+        self.budget = budget
+        self.cache = cache
+
+    def _compute(self, func, *args, **kwargs):
+        return self.budget.call(func, args, kwargs)
+
+    def call(self, func, args, kwargs):
+        compute = partial(self._compute, func)
+        if self.cache is None:
+            return compute(*args, **kwargs)
+        return self.cache.call(compute, args, kwargs)
@@ -0,0 +1,352 @@
+"""Caching node results, keyed by the values of their arguments"""
+
+import copy
+import hashlib
+import pickle
+import sys
+from collections import OrderedDict
+from threading import Lock
+
+from dagapp.plan import MISSING
+
+DFLT_MAX_ENTRIES = 128
+DFLT_SHARED_MAX_BYTES = 256 * 2**20
+
+
+def args_key(args, kwargs):
+    """
+    Return a key for the (bound) arguments of a call, or None if they can't be keyed.
+
+    Hashable arguments are used as is (with their types, down into nested
+    containers, so that `1` and `1.0` get different keys), others (lists, dicts,
+    arrays...) are hashed through pickle.
+
+    >>> args_key((1,), {'b': 2.0}) == args_key((1,), {'b': 2.0})
+    True
+    >>> args_key((1,), {'b': 2.0}) == args_key((1.0,), {'b': 2.0})
+    False
+    >>> args_key(((1,),), {}) == args_key(((1.0,),), {})
+    False
+    >>> args_key(([1, 2],), {}) == args_key(([1, 2],), {})
+    True
+    """
+    items = (*args, *kwargs.items())
+    key = (tuple(kwargs), items, tuple(map(_type_tag, args + tuple(kwargs.values()))))
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        pass
+    try:
+        data = pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _type_tag(value):
+    """The type of value, with those of its items if it's a builtin container"""
+    if isinstance(value, (tuple, list)):
+        return type(value), tuple(map(_type_tag, value))
+    if isinstance(value, (set, frozenset)):
+        # sorted, so that the key pickles the same way in every process
+        return type(value), tuple(sorted(set(map(_type_tag, value)), key=repr))
+    if isinstance(value, dict):
+        return type(value), tuple(
+            (_type_tag(k), _type_tag(v)) for k, v in value.items()
+        )
+    return type(value)
+
+
+def sizeof(value):
+    """
+    Return an estimate of the number of bytes value takes in memory
+
+    >>> sizeof(list(range(100))) > sizeof(list(range(10)))
+    True
+    """
+    nbytes = getattr(value, "nbytes", None)  # numpy arrays
+    if isinstance(nbytes, int):
+        return nbytes
+    memory_usage = getattr(value, "memory_usage", None)  # pandas objects
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(deep=True)
+            return int(getattr(usage, "sum", lambda: usage)())
+        except Exception:
+            pass
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(x) for x in value)
+    return size
+
+
+class ResultCache:
+    """
+    A thread-safe, least-recently-used store of computed values.
+
+    Entries are evicted, oldest first, when there are more than `max_entries` of
+    them or when their (estimated, see `sizeof`) size exceeds `max_bytes`. Values
+    bigger than `max_entry_bytes` are never stored, so that one huge value can't
+    flush everything else.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, max_entry_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        nbytes = sizeof(value)
+        if not self._admits(nbytes):
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self._over_budget():
+                self.nbytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def _admits(self, nbytes):
+        if self.max_entry_bytes is not None and nbytes > self.max_entry_bytes:
+            return False
+        # a value bigger than the whole budget would evict everything and not fit
+        return self.max_bytes is None or nbytes <= self.max_bytes
+
+    def _over_budget(self):
+        return (
+            self.max_entries is not None and len(self._entries) > self.max_entries
+        ) or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+
+    def call(self, func, args, kwargs):
+        """Return func(*args, **kwargs), from the cache if it was already computed"""
+        return CacheChain((self, ())).call(func, args, kwargs)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            entries=len(self._entries),
+            nbytes=self.nbytes,
+        )
+
+
+class NodeMemo(ResultCache):
+    """
+    A (per session) least-recently-used memo of the results of a node's function.
+
+    >>> memo = NodeMemo(max_entries=2)
+    >>> def square(x):
+    ...     print('computing', x)
+    ...     return x * x
+    >>> memo.call(square, (3,), {})
+    computing 3
+    9
+    >>> memo.call(square, (3,), {})
+    9
+    >>> memo.call(square, (4,), {}), memo.call(square, (5,), {})
+    computing 4
+    computing 5
+    (16, 25)
+    >>> memo.call(square, (3,), {})  # evicted
+    computing 3
+    9
+    >>> stats = memo.stats
+    >>> stats['hits'], stats['misses'], stats['evictions'], stats['entries']
+    (1, 4, 2, 2)
+    >>> stats['nbytes'] == sizeof(25) + sizeof(9)
+    True
+    """
+
+    def __init__(self, max_entries=DFLT_MAX_ENTRIES, max_bytes=None):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes)
+
+
+IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes, range)
+
+
+def is_immutable(value):
+    """
+    Return whether value (and everything it contains) is known to be immutable
+
+    >>> is_immutable((1, 'a', frozenset({2.0}))), is_immutable((1, [2]))
+    (True, False)
+    """
+    if isinstance(value, IMMUTABLE_TYPES):
+        return True
+    if type(value) in (tuple, frozenset):
+        return all(map(is_immutable, value))
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(value, numpy.generic)  # numpy scalars
+
+
+class _Copied:
+    """A stored value that is copied for each of its users"""
+
+    def __init__(self, value):
+        self.value = copy.deepcopy(value)
+        self.nbytes = sizeof(self.value)
+
+    def copy(self):
+        return copy.deepcopy(self.value)
+
+
+def shareable(value):
+    """
+    Return the version of value that can be handed to several users without any of
+    them seeing the changes another makes: value itself if it's immutable, a
+    read-only copy of it if it's a numpy array, and otherwise a wrapper giving a
+    copy of it to each user
+
+    >>> import numpy as np
+    >>> array = shareable(np.arange(3))
+    >>> array[0] = 1
+    Traceback (most recent call last):
+    ...
+    ValueError: assignment destination is read-only
+    """
+    if is_immutable(value):
+        return value
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and type(value) is numpy.ndarray and value.dtype != object:
+        frozen = value.copy()
+        frozen.flags.writeable = False
+        return frozen
+    return _Copied(value)
+
+
+class SharedResultStore(ResultCache):
+    """
+    The process-wide store of node results, shared by all sessions.
+
+    Keys are `(dag_fingerprint, node, args_key)` triples, so a value computed for
+    one user is reused by every user of the same dag. The store is bounded by a
+    total byte budget, and (by default) doesn't admit values bigger than a
+    sixteenth of it.
+
+    Since values are shared, no session gets an object another one can mutate
+    (see `shareable`): immutable values are shared as they are, numpy arrays as
+    read-only copies, and other values are stored as copies, a copy of which is
+    returned by each lookup.
+
+    >>> store = SharedResultStore(max_bytes=10_000)
+    >>> def add(a, b):
+    ...     return a + b
+    >>> cache = store.node_cache('some_dag', 'add')
+    >>> cache.call(add, (1, 2), {}), cache.call(add, (1, 2), {})
+    (3, 3)
+    >>> store.stats['hits'], store.stats['misses']
+    (1, 1)
+    >>> store.set('key', [1, 2])
+    >>> store.get('key').append(3)
+    >>> store.get('key')
+    [1, 2]
+    """
+
+    def __init__(self, max_bytes=DFLT_SHARED_MAX_BYTES, max_entry_bytes=None):
+        if max_entry_bytes is None and max_bytes is not None:
+            max_entry_bytes = max_bytes // 16
+        super().__init__(max_bytes=max_bytes, max_entry_bytes=max_entry_bytes)
+
+    def node_cache(self, dag_key, node):
+        """Return a `CacheChain` reading and writing the results of node of dag_key"""
+        return CacheChain((self, (dag_key, node)))
+
+    def get(self, key, default=MISSING):
+        value = super().get(key, default)
+        return value.copy() if isinstance(value, _Copied) else value
+
+    def set(self, key, value):
+        super().set(key, shareable(value))
+
+
+shared_results = SharedResultStore()
+
+
+class CacheChain:
+    """
+    Caches looked up in order, each with the prefix its keys are stored under.
+
+    The key of the arguments is computed once, values found in a later cache are
+    copied to the earlier ones, and computed values are stored in all of them.
+
+    >>> memo, store = NodeMemo(), SharedResultStore()
+    >>> chain = CacheChain((memo, ()), (store, ('dag', 'node')))
+    >>> chain.call(pow, (2, 10), {})
+    1024
+    >>> key = args_key((2, 10), {})
+    >>> memo.get(key), store.get(('dag', 'node', key))
+    (1024, 1024)
+    """
+
+    def __init__(self, *levels):
+        self.levels = levels
+
+    def call(self, func, args, kwargs):
+        key = args_key(args, kwargs)
+        if key is None:
+            return func(*args, **kwargs)
+        for i, (cache, prefix) in enumerate(self.levels):
+            value = cache.get((*prefix, key) if prefix else key)
+            if value is not MISSING:
+                self._set(self.levels[:i], key, value)
+                return value
+        value = func(*args, **kwargs)
+        self._set(self.levels, key, value)
+        return value
+
+    @staticmethod
+    def _set(levels, key, value):
+        for cache, prefix in levels:
+            cache.set((*prefix, key) if prefix else key, value)
+
+    def __add__(self, other):
+        return CacheChain(*self.levels, *other.levels)
+
+
+def mk_memos(memoize):
+    """
+    Make the `NodeMemo` of each node of a `memoize` config.
+
+    `memoize` maps node names to either `True` (default limits) or a dict of
+    `NodeMemo` arguments (`max_entries` and `max_bytes`).
+
+    >>> memos = mk_memos({'a': True, 'b': dict(max_entries=2), 'c': False})
+    >>> sorted(memos), memos['b'].max_entries
+    (['a', 'b'], 2)
+    """
+    return {
+        node: NodeMemo(**(spec if isinstance(spec, dict) else {}))
+        for node, spec in (memoize or {}).items()
+        if spec
+    }
@@ -0,0 +1,168 @@
+"""Downsampling large vectorized outputs before they are sent to charts"""
+
+import numpy as np
+import pandas as pd
+
+DFLT_MAX_CHART_POINTS = 2_000
+DFLT_MAX_HEATMAP_SHAPE = (100, 100)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Return the indices of the n_out points of (x, y) that the Largest-Triangle-
+    Three-Buckets algorithm keeps: the first and last points, and in each of the
+    n_out - 2 buckets in between, the point making the largest triangle with the
+    point kept in the previous bucket and the mean of the next bucket. Unlike
+    taking every k-th point, this keeps the peaks and troughs of the curve.
+
+    >>> x = np.arange(10)
+    >>> y = np.array([0, 1, 0, 9, 0, 1, 0, -7, 0, 1])
+    >>> lttb_indices(x, y, 4)
+    array([0, 3, 7, 9])
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)  # n_out - 2 inner buckets
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        if i + 2 < len(edges):
+            next_x, next_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        prev_x, prev_y = x[kept[i]], y[kept[i]]
+        areas = np.abs(
+            (prev_x - next_x) * (y[start:stop] - prev_y)
+            - (prev_x - x[start:stop]) * (next_y - prev_y)
+        )
+        kept[i + 1] = (
+            start + int(np.nanargmax(areas)) if np.any(areas == areas) else start
+        )
+    return kept
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Return the (sorted) indices of the minimum and maximum of y in each of
+    n_buckets buckets of consecutive points.
+
+    >>> minmax_indices(np.array([3, 1, 2, 5, 4, 0, 6, 7]), 2)
+    array([1, 3, 5, 7])
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    indices = set()
+    for start, stop in zip(edges[:-1], edges[1:]):
+        bucket = y[start:stop]
+        if np.all(np.isnan(bucket)):
+            indices.add(start)
+            continue
+        indices.update((start + np.nanargmin(bucket), start + np.nanargmax(bucket)))
+    return np.array(sorted(indices))
+
+
+def downsample(frame, max_points=DFLT_MAX_CHART_POINTS):
+    """
+    Return (at most about) max_points rows of a table of numeric columns, chosen
+    to preserve the shape of their curves: with `lttb_indices` for a single
+    column, and the union of each column's `minmax_indices` for several.
+
+    >>> frame = pd.DataFrame({'y': np.sin(np.linspace(0, 10, 10_000))})
+    >>> len(downsample(frame, 100))
+    100
+    """
+    if len(frame) <= max_points:
+        return frame
+    numeric = frame.select_dtypes("number")
+    if numeric.shape[1] == 1:
+        y = numeric.iloc[:, 0].to_numpy()
+        x = frame.index.to_numpy() if _is_numeric(frame.index) else np.arange(len(y))
+        return frame.iloc[lttb_indices(x, y, max_points)]
+    n_buckets = max(1, max_points // (2 * max(numeric.shape[1], 1)))
+    indices = set()
+    for column in numeric:
+        indices.update(minmax_indices(numeric[column].to_numpy(), n_buckets))
+    return frame.iloc[sorted(indices)] if indices else frame.iloc[:max_points]
+
+
+def _is_numeric(index):
+    return not isinstance(index, pd.MultiIndex) and pd.api.types.is_numeric_dtype(index)
+
+
+def _bucket_edges(n, n_buckets):
+    return np.unique(np.linspace(0, n, min(n, n_buckets) + 1).astype(int))
+
+
+def block_reduce(grid, max_shape=DFLT_MAX_HEATMAP_SHAPE, reducer=np.nanmean):
+    """
+    Reduce a 2d array to at most max_shape cells, each the `reducer` (mean by
+    default) of a block of neighboring cells. Also returns the (start) indices
+    of the blocks along both axes.
+
+    >>> reduced, (rows, cols) = block_reduce(np.arange(16.).reshape(4, 4), (2, 2))
+    >>> reduced
+    array([[ 2.5,  4.5],
+           [10.5, 12.5]])
+    >>> rows, cols
+    (array([0, 2]), array([0, 2]))
+    """
+    grid = np.asarray(grid, dtype=float)
+    row_edges = _bucket_edges(grid.shape[0], max_shape[0])
+    col_edges = _bucket_edges(grid.shape[1], max_shape[1])
+    reduced = np.array(
+        [
+            [
+                reducer(grid[r0:r1, c0:c1])
+                for c0, c1 in zip(col_edges[:-1], col_edges[1:])
+            ]
+            for r0, r1 in zip(row_edges[:-1], row_edges[1:])
+        ]
+    )
+    return reduced, (row_edges[:-1], col_edges[:-1])
+
+
+def heatmap_frame(table, column, shape, max_shape=DFLT_MAX_HEATMAP_SHAPE):
+    """
+    Return the long-form table of a heatmap of a column of a table indexed by the
+    values of two (swept) roots, in the order of their Cartesian product (of the
+    given shape), reduced to at most max_shape cells with `block_reduce` (each
+    cell keeps the root values where its block starts).
+
+    >>> index = pd.MultiIndex.from_product([[1, 2], [0, 1, 2]], names=['a', 'c'])
+    >>> table = pd.DataFrame({'r': [0, 1, 2, 3, 4, 5]}, index=index)
+    >>> heatmap_frame(table, 'r', (2, 3), (2, 2))
+       a  c    r
+    0  1  0  0.0
+    1  1  1  1.5
+    2  2  0  3.0
+    3  2  1  4.5
+    """
+    x_name, y_name = table.index.names
+    x_values = table.index.get_level_values(0).to_numpy()[:: shape[1]]
+    y_values = table.index.get_level_values(1).to_numpy()[: shape[1]]
+    grid = table[column].to_numpy().reshape(shape)
+    reduced, (rows, cols) = block_reduce(grid, max_shape)
+    xs, ys = np.meshgrid(x_values[rows], y_values[cols], indexing="ij")
+    return pd.DataFrame(
+        {x_name: xs.ravel(), y_name: ys.ravel(), column: reduced.ravel()}
+    )
+
+
+def page_of(frame, page, page_size):
+    """
+    Return the rows of page number page (starting at 1) of frame
+
+    >>> page_of(pd.DataFrame({'x': range(5)}), 2, 2)
+       x
+    2  2
+    3  3
+    """
+    start = (page - 1) * page_size
+    return frame.iloc[start : start + page_size]
@@ -0,0 +1,71 @@
+"""Coalescing bursts of widget changes into single propagations"""
+
+import time
+
+
+class ChangeCoalescer:
+    """
+    Collects the nodes changed in a burst of widget changes, so that they can be
+    propagated at once, when no change came for a while.
+
+    Each change gives how long (in seconds) to wait for more changes, and pushes
+    back the deadline of the pending ones: a change with no wait makes all the
+    pending changes due right away.
+
+    >>> changes = ChangeCoalescer()
+    >>> changes.add('a', wait=0.5, now=0.0)
+    >>> changes.add('a', wait=0.5, now=0.2)
+    >>> changes.add('c', wait=0.5, now=0.4)
+    >>> changes.due(now=0.6), changes.due(now=0.9)
+    (False, True)
+    >>> changes.pop()
+    ('a', 'c')
+    >>> changes.stats
+    {'changes': 3, 'propagations': 1, 'saved': 2}
+    """
+
+    def __init__(self):
+        self._pending = dict()  # insertion-ordered set of the changed nodes
+        self._deadline = None
+        self.changes = 0
+        self.propagations = 0
+
+    def add(self, node, wait=0.0, now=None):
+        """Record a change of node, to propagate if no other change comes in wait"""
+        now = time.monotonic() if now is None else now
+        self._pending.pop(node, None)
+        self._pending[node] = None
+        self._deadline = now + wait
+        self.changes += 1
+
+    @property
+    def pending(self):
+        return bool(self._pending)
+
+    def time_left(self, now=None):
+        """The number of seconds until the pending changes are due"""
+        if not self._pending:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._deadline - now)
+
+    def due(self, now=None):
+        """Whether there are pending changes that waited long enough"""
+        return self.pending and self.time_left(now) == 0
+
+    def pop(self):
+        """Return the pending changed nodes (in the order of their last change)"""
+        nodes = tuple(self._pending)
+        self._pending.clear()
+        self._deadline = None
+        if nodes:
+            self.propagations += 1
+        return nodes
+
+    @property
+    def stats(self):
+        return dict(
+            changes=self.changes,
+            propagations=self.propagations,
+            saved=self.changes - self.propagations,
+        )
@@ -0,0 +1,68 @@
+"""Process-wide cache of DAG diagrams"""
+
+from threading import Lock
+
+from dagapp.utils import dag_structure
+
+DFLT_HIGHLIGHT_COLOR = "#e8590c"
+
+
+class Diagram:
+    """
+    The DOT source of a dag's diagram, computed once.
+
+    Highlighting nodes doesn't change the diagram: it's an overlay of node
+    attributes added to the cached DOT source, so it never forces the graph to be
+    rebuilt, and the highlights of a diagram don't apply to any other.
+
+    >>> from meshed.dag import DAG
+    >>> def b(a):
+    ...     return 2 ** a
+    >>> diagram = Diagram(DAG([b]))
+    >>> print(diagram.highlighted_source(['b'], color='red').splitlines()[-2])
+    "b" [color="red" fontcolor="red" penwidth=2]
+    >>> print(diagram.highlighted_source(fills={'b_': '#ffc9c9'}).splitlines()[-2])
+    "b_" [style="filled" fillcolor="#ffc9c9"]
+    """
+
+    def __init__(self, dag):
+        self.source = dag.dot_digraph().source
+
+    def highlighted_source(self, nodes=(), color=DFLT_HIGHLIGHT_COLOR, fills=None):
+        """The DOT source, with nodes drawn in color, and filled with their fills"""
+        if not nodes and not fills:
+            return self.source
+        overlay = "".join(
+            f'"{node}" [color="{color}" fontcolor="{color}" penwidth=2]\n'
+            for node in nodes
+        ) + "".join(
+            f'"{node}" [style="filled" fillcolor="{fill}"]\n'
+            for node, fill in (fills or {}).items()
+        )
+        end = self.source.rindex("}")
+        return self.source[:end] + overlay + self.source[end:]
+
+
+_diagrams = dict()
+_diagrams_lock = Lock()
+
+
+def dag_diagram(dag):
+    """Return the `Diagram` of dag, built once per process for a given dag structure"""
+    key = dag_structure(dag)
+    diagram = _diagrams.get(key)
+    if diagram is None:
+        with _diagrams_lock:
+            diagram = _diagrams.get(key)
+            if diagram is None:
+                diagram = _diagrams[key] = Diagram(dag)
+    return diagram
+
+
+def display_diagram(dag, col, highlight=(), color=DFLT_HIGHLIGHT_COLOR, fills=None):
+    """
+    Displays the (cached) diagram of dag in col, with the highlight nodes in color,
+    and the nodes of fills (a dict of nodes to colors) filled with their color
+    """
+    source = dag_diagram(dag).highlighted_source(highlight, color, fills)
+    col.graphviz_chart(source)
@@ -0,0 +1,305 @@
+"""Persisting node results on disk, shared by the processes of a host"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import weakref
+from functools import lru_cache
+
+from dagapp.cache import CacheChain
+from dagapp.plan import MISSING
+
+DFLT_STORE_PATH = os.environ.get(
+    "DAGAPP_RESULT_STORE",
+    os.path.join(os.path.expanduser("~"), ".cache", "dagapp", "results.sqlite"),
+)
+DFLT_STORE_MAX_BYTES = 2 * 2**30
+DFLT_COMPACT_INTERVAL = 60.0  # seconds between two compactions
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    node TEXT,
+    value BLOB,
+    nbytes INTEGER,
+    created REAL,
+    accessed REAL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+
+def _digest(key):
+    """Return a process-independent digest of a cache key, or None if there's none"""
+    if isinstance(key, bytes):
+        return key.hex()
+    try:
+        data = pickle.dumps(key, protocol=4)
+    except Exception:
+        return None
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+_func_fingerprints = weakref.WeakKeyDictionary()
+
+
+def cached_func_fingerprint(func):
+    """
+    Return the `dagapp.utils.fingerprint` of func, a `(digest, sound)` pair,
+    computed once per func
+    """
+    from dagapp.utils import fingerprint
+
+    try:
+        return _func_fingerprints[func]
+    except (KeyError, TypeError):
+        result = fingerprint(func)
+    try:
+        _func_fingerprints[func] = result
+    except TypeError:  # not weak-referenceable
+        pass
+    return result
+
+
+class DiskResultStore:
+    """
+    A store of computed values in an SQLite file, that all the processes of a host
+    (typically, the workers serving an app) share, and that survives restarts.
+
+    Values are pickled. Entries older than `ttl` seconds are ignored, and removed
+    by `compact`, which also removes the least recently used entries until there
+    are at most `max_entries` of them, taking at most `max_bytes`. Unless
+    `compact_interval` is None, compactions run on a background thread.
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'results.sqlite')
+    >>> store = DiskResultStore(path, compact_interval=None)
+    >>> def add(a, b):
+    ...     print('computing')
+    ...     return a + b
+    >>> cache = store.node_cache('add', add)
+    >>> cache.call(add, (1, 2), {})
+    computing
+    3
+
+    Another store on the same file (in this process or another) gets the value:
+
+    >>> DiskResultStore(path).node_cache('add', add).call(add, (1, 2), {})
+    3
+    """
+
+    def __init__(
+        self,
+        path=DFLT_STORE_PATH,
+        *,
+        ttl=None,
+        max_bytes=DFLT_STORE_MAX_BYTES,
+        max_entries=None,
+        max_entry_bytes=None,
+        compact_interval=DFLT_COMPACT_INTERVAL,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        if max_entry_bytes is None and max_bytes is not None:
+            max_entry_bytes = max_bytes // 16
+        self.max_entry_bytes = max_entry_bytes
+        self.compact_interval = compact_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._compactor = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+
+    def node_cache(self, node, func):
+        """
+        Return a `dagapp.cache.CacheChain` reading and writing the results of node,
+        computed by func, keyed by its fingerprint (so that changing func's code, or
+        any of the values, globals and helper functions it depends on, invalidates
+        its results), or None if func has no process-independent fingerprint
+        """
+        digest, sound = cached_func_fingerprint(func)
+        if not sound:
+            return None
+        return CacheChain((self, (node, digest)))
+
+    def get(self, key, default=MISSING):
+        digest = _digest(key)
+        if digest is None:
+            return default
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created FROM results WHERE key = ?", (digest,)
+            ).fetchone()
+            if row is not None and self._expired(row[1], now):
+                self._connection.execute("DELETE FROM results WHERE key = ?", (digest,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return default
+            self._connection.execute(
+                "UPDATE results SET accessed = ? WHERE key = ?", (now, digest)
+            )
+        try:
+            value = pickle.loads(row[0])
+        except Exception:  # e.g. the class of the value changed since it was stored
+            self.discard(key)
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        digest = _digest(key)
+        if digest is None:
+            return
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        if self.max_entry_bytes is not None and len(data) > self.max_entry_bytes:
+            return
+        node = str(key[0]) if isinstance(key, tuple) and key else None
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, node, sqlite3.Binary(data), len(data), now, now),
+            )
+        self._start_compactor()
+
+    def discard(self, key):
+        digest = _digest(key)
+        if digest is not None:
+            with self._lock:
+                self._connection.execute("DELETE FROM results WHERE key = ?", (digest,))
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def compact(self):
+        """
+        Remove the expired entries, then the least recently used ones until the
+        store is within its limits, and return the number of entries removed
+        """
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                removed = 0
+                if self.ttl is not None:
+                    removed += connection.execute(
+                        "DELETE FROM results WHERE created < ?",
+                        (time.time() - self.ttl,),
+                    ).rowcount
+                removed += connection.execute(
+                    """
+                    DELETE FROM results WHERE key IN (
+                        SELECT key FROM (
+                            SELECT
+                                key,
+                                SUM(nbytes) OVER recent AS total,
+                                ROW_NUMBER() OVER recent AS n
+                            FROM results
+                            WINDOW recent AS (ORDER BY accessed DESC)
+                        )
+                        WHERE total > ? OR n > ?
+                    )
+                    """,
+                    (_or_max(self.max_bytes), _or_max(self.max_entries)),
+                ).rowcount
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            if removed:
+                connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def _start_compactor(self):
+        if self.compact_interval is None or self._compactor is not None:
+            return
+        with self._lock:
+            if self._compactor is None:
+                self._compactor = threading.Thread(
+                    target=_compact_periodically,
+                    args=(weakref.ref(self), self.compact_interval),
+                    name="dagapp-store-compaction",
+                    daemon=True,
+                )
+                self._compactor.start()
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM results")
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[
+                0
+            ]
+
+    @property
+    def stats(self):
+        with self._lock:
+            entries, nbytes = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results"
+            ).fetchone()
+        return dict(hits=self.hits, misses=self.misses, entries=entries, nbytes=nbytes)
+
+
+def _or_max(limit):
+    return 2**62 if limit is None else limit
+
+
+def _compact_periodically(store_ref, interval):
+    while True:
+        time.sleep(interval)
+        store = store_ref()
+        if store is None:
+            return
+        try:
+            store.compact()
+        except sqlite3.Error:
+            pass  # e.g. the database is locked by another process: next time
+        del store
+
+
+@lru_cache(maxsize=None)
+def _disk_store(path, ttl, max_bytes, max_entries, max_entry_bytes, compact_interval):
+    return DiskResultStore(
+        path,
+        ttl=ttl,
+        max_bytes=max_bytes,
+        max_entries=max_entries,
+        max_entry_bytes=max_entry_bytes,
+        compact_interval=compact_interval,
+    )
+
+
+def get_disk_store(
+    path=DFLT_STORE_PATH,
+    ttl=None,
+    max_bytes=DFLT_STORE_MAX_BYTES,
+    max_entries=None,
+    max_entry_bytes=None,
+    compact_interval=DFLT_COMPACT_INTERVAL,
+):
+    """Return the (process-wide) `DiskResultStore` with the given settings"""
+    return _disk_store(
+        path, ttl, max_bytes, max_entries, max_entry_bytes, compact_interval
+    )
@@ -0,0 +1,93 @@
+"""Folding the nodes of a DAG whose values are fixed for the life of an app"""
+
+from threading import Lock
+from types import MappingProxyType
+
+from dagapp.index import dag_index
+from dagapp.utils import dag_fingerprint, freeze
+
+
+def constant_nodes(index, fixed=()):
+    """
+    Return the non-root nodes all of whose inputs are fixed (directly, or through
+    other constant nodes), in topological order: nodes of functions without
+    arguments, and nodes depending only on fixed roots.
+
+    >>> from meshed.dag import DAG
+    >>> from dagapp.index import DagIndex
+    >>> def rate():
+    ...     return 0.05
+    >>> def growth(rate, years):
+    ...     return (1 + rate) ** years
+    >>> def value(growth, principal):
+    ...     return growth * principal
+    >>> index = DagIndex(DAG((rate, growth, value)))
+    >>> constant_nodes(index)
+    ('rate',)
+    >>> constant_nodes(index, fixed=['years'])
+    ('rate', 'growth')
+    """
+    constant = set(fixed)
+    nodes = []
+    for node in index.order:
+        if node not in index.roots and index.parents[node] <= constant:
+            constant.add(node)
+            nodes.append(node)
+    return tuple(nodes)
+
+
+class ConstantFolding:
+    """
+    The values of the nodes of a dag whose inputs are fixed for the life of an app,
+    computed once: the `fixed` roots (that aren't displayed as widgets) and the
+    `constant_nodes`.
+
+    `defaults` holds the values of all the nodes given the fixed roots, for the
+    widgets to start from.
+
+    >>> from meshed.dag import DAG
+    >>> def growth(rate, years):
+    ...     return (1 + rate) ** years
+    >>> def value(growth, principal=100):
+    ...     return growth * principal
+    >>> folding = ConstantFolding(DAG((growth, value)), dict(rate=1, years=3))
+    >>> folding.nodes
+    ('growth',)
+    >>> dict(folding.constants)
+    {'rate': 1, 'years': 3, 'growth': 8}
+    >>> folding.defaults['value']
+    800
+    """
+
+    def __init__(self, dag, fixed=None):
+        from dagapp.session import DagSession
+
+        fixed = dict(fixed or {})
+        index = dag_index(dag)
+        self.fixed = MappingProxyType(fixed)
+        self.nodes = constant_nodes(index, fixed)
+        session = DagSession(index)
+        session.set(fixed)
+        self.defaults = MappingProxyType(dict(session))
+        self.constants = MappingProxyType(
+            {node: self.defaults[node] for node in (*fixed, *self.nodes)}
+        )
+
+
+_foldings = dict()
+_foldings_lock = Lock()
+
+
+def constant_folding(dag, fixed=None):
+    """
+    Return the `ConstantFolding` of dag with the given fixed roots, computed once
+    per process
+    """
+    key = (dag_fingerprint(dag), freeze(fixed or {}))
+    folding = _foldings.get(key)
+    if folding is None:
+        with _foldings_lock:
+            folding = _foldings.get(key)
+            if folding is None:
+                folding = _foldings[key] = ConstantFolding(dag, fixed)
+    return folding
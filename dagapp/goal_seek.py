@@ -0,0 +1,302 @@
+"""Finding the value of a root of a DAG that gets one of its outputs to a target"""
+
+import math
+import time
+
+from dagapp.index import DagIndex, dag_index
+
+DFLT_MAX_ITER = 100
+DFLT_XTOL = 1e-9  # relative to the magnitude of the solution
+DFLT_MAX_EXPANSIONS = 60  # doublings of the search interval, around the base value
+
+
+class GoalSeekError(ValueError):
+    """Raised when the target can't be bracketed, or the output isn't defined"""
+
+
+def output_node(index, output):
+    """
+    Return the (node, key) of an output of a dag (given its `dagapp.index.DagIndex`):
+    the name of a node (key being None), or the `{node}_{key}` name of an item of
+    a node's dict value, as static pages show them
+    """
+    if output in index.position:
+        return output, None
+    nodes = sorted(index.non_roots, key=len, reverse=True)  # the longest match
+    for node in nodes:
+        if str(output).startswith(f"{node}_"):
+            return node, output[len(node) + 1 :]
+    raise KeyError(f"No such output: {output}")
+
+
+class PathEvaluator:
+    """
+    The value of an output of a dag as a function of one of its roots, the other
+    roots keeping their base values.
+
+    The nodes the output needs that don't depend on the root are computed once,
+    when the evaluator is made; for each value of the root, only the nodes on its
+    paths to the output are recomputed. Results are memoized by value of the root.
+
+    :param dag: The dag, or its `dagapp.index.DagIndex`
+    :param root: The root the output is a function of
+    :param output: The node (or `{node}_{key}` item of a node's dict value, see
+        `output_node`) whose value is returned
+    :param base: The base values of (some of) the roots (their defaults otherwise)
+    :param caches: A mapping of nodes to the caches to compute them through (see
+        `dagapp.utils.get_node_caches`)
+
+    >>> from meshed.dag import DAG
+    >>> def fees(days, day_rate=1000):
+    ...     return days * day_rate
+    >>> def travel(trips=2, trip_cost=300):
+    ...     return trips * trip_cost
+    >>> def total(fees, travel):
+    ...     return fees + travel
+    >>> total_of_days = PathEvaluator(DAG((fees, travel, total)), 'days', 'total')
+    >>> total_of_days.path
+    ('fees', 'total')
+    >>> total_of_days(10), total_of_days(10), total_of_days.evaluations
+    (10600, 10600, 1)
+    """
+
+    def __init__(self, dag, root, output, base=None, caches=None):
+        index = dag if isinstance(dag, DagIndex) else dag_index(dag)
+        if root not in index.roots:
+            raise ValueError(f"Not a root of the dag: {root}")
+        self.root, self.output = root, output
+        self.node, self.key = output_node(index, output)
+        self.plan = index.plan
+        self.caches = caches or {}
+        needed = {self.node}
+        for node in reversed(index.order):
+            if node in needed:
+                needed.update(index.parents[node])
+        if self.node not in index.successors[root]:
+            raise ValueError(f"{output} doesn't depend on {root}")
+        self.path = tuple(node for node in index.dirty(root) if node in needed)
+        self._values = self.plan.load({**index.defaults, **(base or {})})
+        for step in self.plan.steps:
+            if step.node in needed:
+                self.plan.compute(step.node, self._values, self.caches)
+        self.base_value = self._values[self.plan.slot[root]]
+        self.results = dict()
+        self.evaluations = 0
+
+    def __call__(self, x):
+        if x in self.results:
+            return self.results[x]
+        self._values[self.plan.slot[self.root]] = x
+        for node in self.path:
+            self.plan.compute(node, self._values, self.caches)
+        value = self._values[self.plan.slot[self.node]]
+        if self.key is not None:
+            value = value[self.key]
+        self.evaluations += 1
+        self.results[x] = value
+        return value
+
+
+def _sign(x):
+    return (x > 0) - (x < 0)
+
+
+def _defined(gap, x):
+    """
+    Return gap(x), or NaN if it can't be computed (e.g. x is out of domain) or
+    isn't finite
+    """
+    try:
+        value = float(gap(x))
+    except Exception:
+        return math.nan
+    return value if math.isfinite(value) else math.nan
+
+
+def _defined_between(gap, x, other, integer=False):
+    """
+    Return the first (x, gap(x)) pair, going from x towards other, where gap is
+    defined (see `_defined`), trying x first, then points 1/64, 1/16, 1/4 and 1/2 of
+    the way, or None if there's none
+    """
+    for fraction in (0, 1 / 64, 1 / 16, 1 / 4, 1 / 2):
+        point = x + (other - x) * fraction
+        if integer:
+            point = round(point)
+        value = _defined(gap, point)
+        if not math.isnan(value):
+            return point, value
+    return None
+
+
+def bracket(gap, x0, integer=False, max_expansions=DFLT_MAX_EXPANSIONS):
+    """
+    Return an interval (low, high), around x0, over which gap changes sign, found by
+    doubling the distance to x0 on both sides until it does
+
+    >>> bracket(lambda x: x - 1000, 10, integer=True)
+    (522, 1034)
+    """
+    g0 = _defined(gap, x0)
+    if math.isnan(g0):
+        raise GoalSeekError(f"The output isn't defined at the base value {x0}")
+    if g0 == 0:
+        return x0, x0
+    step = abs(x0) * 0.1 or 1.0
+    if integer:
+        step = max(1, round(step))
+    inner = [x0, x0]  # the closest points on each side, where gap has g0's sign
+    for _ in range(max_expansions):
+        for side, direction in enumerate((-1, 1)):
+            x = x0 + direction * step
+            gx = _defined(gap, x)
+            if math.isnan(gx):
+                continue
+            if _sign(gx) != _sign(g0):
+                return tuple(sorted((inner[side], x)))
+            inner[side] = x
+        step *= 2
+    raise GoalSeekError(f"No value found around {x0} to bracket the target")
+
+
+def goal_seek(
+    dag,
+    output,
+    target,
+    root,
+    *,
+    base=None,
+    bounds=None,
+    xtol=DFLT_XTOL,
+    ftol=0.0,
+    max_iter=DFLT_MAX_ITER,
+    caches=None,
+    check=None,
+):
+    """
+    Find the value of root for which output (see `output_node`) is target, the other
+    roots keeping their base values, by bisection.
+
+    The target is first bracketed: between `bounds` if given, and otherwise by
+    searching around the base value of root (see `bracket`). Each iteration only
+    recomputes the nodes on the paths from root to output (see `PathEvaluator`).
+    Integer roots (whose base value is an int) are only given integer values, the
+    solution being the one getting output the closest to target.
+
+    Returns a dict of the `solution`, the `value` output takes there (and its
+    `error`, the difference to target), the number of `iterations` of the
+    bisection, the number of `evaluations` of the path, the `seconds` it all
+    took, whether it `converged` (to `xtol`, relative to the solution, or to
+    `ftol` of target), the `message` saying why it didn't (None if it did), and
+    the `bracket` it started from.
+
+    Where output isn't defined (its computation fails, or gives NaN or an infinite
+    value), its sign is unknown: the ends of `bounds` are moved inwards until it's
+    defined, and so is the middle of the bracket, within the bracket, the search
+    stopping (not converged) if it can't be.
+
+    :param check: A function called before each iteration (that can raise to
+        abandon the search)
+
+    >>> from meshed.dag import DAG
+    >>> def fees(days=20, day_rate=1000.0):
+    ...     return days * day_rate
+    >>> def total_incl_vat(fees, vat_rate=0.08):
+    ...     return fees * (1 + vat_rate)
+    >>> dag = DAG((fees, total_incl_vat))
+    >>> result = goal_seek(dag, 'total_incl_vat', 27000, 'day_rate')
+    >>> round(result['solution'], 6), result['converged']
+    (1250.0, True)
+
+    Integer roots stay integers:
+
+    >>> result = goal_seek(dag, 'total_incl_vat', 20000, 'days')
+    >>> result['solution'], result['value'], result['iterations']
+    (19, 20520.0, 1)
+
+    Outputs undefined on part of the interval:
+
+    >>> def side(area=1.0):
+    ...     return math.sqrt(area) if area >= 0 else math.nan
+    >>> result = goal_seek(DAG([side]), 'side', 2, 'area', bounds=(-10, 10))
+    >>> round(result['solution'], 6), result['converged'], result['bracket']
+    (4.0, True, (0.0, 10))
+    >>> def spiky(x=1.0):
+    ...     return x if abs(x) == 10 else math.nan
+    >>> result = goal_seek(DAG([spiky]), 'spiky', 0, 'x', bounds=(-10, 10))
+    >>> result['converged'], result['message']
+    (False, "The output isn't defined at x=0")
+    """
+    start = time.perf_counter()
+    evaluate = PathEvaluator(dag, root, output, base, caches)
+    x0 = evaluate.base_value
+    integer = isinstance(x0, int) and not isinstance(x0, bool)
+
+    def gap(x):
+        return evaluate(x) - target
+
+    message = None
+    if bounds is None:
+        low, high = bracket(gap, x0, integer)
+    else:
+        low, high = sorted(bounds)
+        # the ends where the output isn't defined are moved inwards
+        ends = _defined_between(gap, low, high, integer), _defined_between(
+            gap, high, low, integer
+        )
+        if None in ends:
+            raise GoalSeekError(f"The output isn't defined between {bounds}")
+        (low, g_low), (high, g_high) = ends
+        if _sign(g_low) == _sign(g_high) != 0:
+            raise GoalSeekError(f"The target isn't between the outputs at {bounds}")
+    initial = (low, high)
+    g_low = _defined(gap, low)
+    iterations, converged = 0, g_low == 0 or low == high
+    while not converged and iterations < max_iter:
+        if check is not None:
+            check()
+        if integer and high - low <= 1:
+            converged = True
+            break
+        middle = (low + high) // 2 if integer else (low + high) / 2
+        g_middle = _defined(gap, middle)
+        iterations += 1
+        if math.isnan(g_middle):  # try around it, within the bracket
+            around = _defined_between(gap, middle, low, integer)
+            around = around or _defined_between(gap, middle, high, integer)
+            if around is None or around[0] in (low, high):
+                message = f"The output isn't defined at {root}={middle:g}"
+                break
+            middle, g_middle = around
+        if _sign(g_middle) == _sign(g_low):
+            low, g_low = middle, g_middle
+        else:
+            high = middle
+        converged = (
+            g_middle == 0
+            or abs(g_middle) <= ftol
+            or (not integer and high - low <= xtol * max(1.0, abs(middle)))
+        )
+    if not converged and message is None:
+        message = f"No convergence in {max_iter} iterations"
+    candidates = [
+        x
+        for x in (low, high)
+        if x in evaluate.results and not math.isnan(_defined(gap, x))
+    ]
+    solution = min(candidates, key=lambda x: abs(evaluate.results[x] - target))
+    value = evaluate(solution)
+    return dict(
+        root=root,
+        output=output,
+        target=target,
+        solution=solution,
+        value=value,
+        error=value - target,
+        iterations=iterations,
+        evaluations=evaluate.evaluations,
+        seconds=time.perf_counter() - start,
+        converged=bool(converged),
+        message=message,
+        bracket=initial,
+    )
@@ -0,0 +1,116 @@
+"""A precomputed layout of a DAG, shared by all the pages showing it"""
+
+from functools import cached_property
+from threading import Lock
+from types import MappingProxyType
+
+from meshed.itools import topological_sort
+from dagapp.plan import ExecutionPlan
+from dagapp.utils import dag_fingerprint, get_funcs, get_nodes, get_values
+
+
+class DagIndex:
+    """
+    Everything the page functions need to know about a dag, computed once.
+
+    >>> from meshed.dag import DAG
+    >>> def b(a):
+    ...     return 2 ** a
+    >>> def d(c):
+    ...     return 10 - (5 ** c)
+    >>> def result(b, d):
+    ...     return b * d
+    >>> index = DagIndex(DAG((b, d, result)))
+    >>> index.nodes
+    ('a', 'c', 'b', 'd', 'result')
+    >>> sorted(index.roots)
+    ['a', 'c']
+    >>> sorted(index.parents['result'])
+    ['b', 'd']
+    >>> sorted(index.successors['a'])
+    ['b', 'result']
+    >>> index.dirty(['c', 'a'])
+    ('b', 'd', 'result')
+    >>> index.dirty(['a', 'b'])
+    ('result',)
+    >>> dict(index.defaults)
+    {'a': 0.0, 'c': 0.0, 'b': 1.0, 'd': 9.0, 'result': 9.0}
+    """
+
+    def __init__(self, dag):
+        self.dag = dag
+        self.funcs = MappingProxyType(get_funcs(dag))
+        self.nodes = tuple(get_nodes(dag))
+        self.roots = frozenset(dag.roots)
+        self.non_roots = tuple(node for node in self.nodes if node not in self.roots)
+        self.order = tuple(
+            node for node in topological_sort(dag.graph) if isinstance(node, str)
+        )
+        self.position = MappingProxyType({node: i for i, node in enumerate(self.order)})
+        self.children = MappingProxyType(
+            {
+                node: frozenset(
+                    fn.out for fn in dag.graph.get(node, ()) if fn.out in self.position
+                )
+                for node in self.order
+            }
+        )
+        self.parents = MappingProxyType(self._parents())
+        self.successors = MappingProxyType(self._successors())
+        self.defaults = MappingProxyType(get_values(dag, dict(self.funcs)))
+
+    def _parents(self):
+        parents = {node: set() for node in self.order}
+        for node in self.order:
+            for child in self.children[node]:
+                parents[child].add(node)
+        return {node: frozenset(nodes) for node, nodes in parents.items()}
+
+    def _successors(self):
+        successors = dict()
+        # walking backwards, the successors of a node's children are already known
+        for node in reversed(self.order):
+            successors[node] = frozenset(self.children[node]).union(
+                *(successors[child] for child in self.children[node])
+            )
+        return successors
+
+    @cached_property
+    def plan(self):
+        """The `dagapp.plan.ExecutionPlan` of the dag, compiled on first use"""
+        return ExecutionPlan(self)
+
+    def dirty(self, changed):
+        """
+        Return the nodes downstream of the changed nodes, in topological order.
+
+        Each node appears once, however many of the changed nodes it depends on,
+        and the changed nodes keep the values they were set to (so aren't dirty,
+        even when downstream of other changed nodes).
+        """
+        if isinstance(changed, str):
+            changed = (changed,)
+        dirty = set().union(*(self.successors[node] for node in changed))
+        dirty.difference_update(changed)
+        return tuple(sorted(dirty, key=self.position.__getitem__))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.dag!r})"
+
+
+_indexes = dict()
+_indexes_lock = Lock()
+
+
+def dag_index(dag):
+    """
+    Return the `DagIndex` of dag, built once per process for a given dag fingerprint
+    """
+    fingerprint = dag_fingerprint(dag)
+    index = _indexes.get(fingerprint)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(fingerprint)
+            if index is None:
+                index = _indexes[fingerprint] = DagIndex(dag)
+    return index
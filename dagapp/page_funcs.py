@@ -2,13 +2,21 @@
 
 import streamlit as st
 from i2 import Sig
+from dagapp.diagram import display_diagram
+from dagapp.folding import constant_folding
+from dagapp.index import dag_index
 from dagapp.utils import (
-    get_values,
-    get_funcs,
-    get_nodes,
+    batch_factory,
     display_factory,
+    display_profile,
     get_from_configs,
+    get_caching_from_configs,
+    get_session_root_values,
+    goal_seek_factory,
+    profile_overlay,
+    sensitivity_factory,
     static_factory,
+    upload_factory,
     vector_factory,
 )
 
@@ -19,11 +27,22 @@ class BasePageFunc:
         self.page_title = page_title
         self.sig = Sig(dag)
         self.configs = config
+        self.index = dag_index(dag)
+        # the nodes the config fixes for the life of the app, computed once
+        self.folding = constant_folding(dag, config.get("fixed"))
+
+    def display_diagram(self, col):
+        """Displays the dag, overlaid with its profile if the configs ask for it"""
+        if self.configs.get("profile"):
+            display_diagram(self.dag, col, **profile_overlay(self.dag))
+            display_profile(self.dag, col)
+        else:
+            display_diagram(self.dag, col)
 
     def __call__(self):
         if self.page_title:
             st.markdown(f"""## **{self.page_title}**""")
-        st.write(Sig(self.dag))
+        st.write(self.sig)
 
 
 class SimplePageFunc(BasePageFunc):
@@ -33,14 +52,23 @@ class SimplePageFunc(BasePageFunc):
 
         c1, c2 = st.columns(2)
 
-        c2.graphviz_chart(self.dag.dot_digraph())
-
-        funcs = get_funcs(self.dag)
-        nodes = get_nodes(self.dag)
-        values = get_values(self.dag, funcs)
+        index = self.index
         arg_types, ranges = get_from_configs(self.configs)
 
-        display_factory(self.dag, nodes, funcs, values, arg_types, ranges, c1)
+        display_factory(
+            self.dag,
+            index.nodes,
+            index.funcs,
+            self.folding.defaults,
+            arg_types,
+            ranges,
+            c1,
+            caching=get_caching_from_configs(self.configs),
+            background=self.configs.get("background"),
+            debounce=self.configs.get("debounce"),
+        )
+        # after the factory, so that the profile includes the latest computations
+        self.display_diagram(c2)
 
 
 class StaticPageFunc(BasePageFunc):
@@ -50,13 +78,21 @@ class StaticPageFunc(BasePageFunc):
 
         c1, c2 = st.columns(2)
 
-        c2.graphviz_chart(self.dag.dot_digraph())
-        funcs = get_funcs(self.dag)
-        nodes = get_nodes(self.dag)
-        values = get_values(self.dag, funcs)
+        index = self.index
         arg_types, ranges = get_from_configs(self.configs)
 
-        static_factory(self.dag, nodes, funcs, values, arg_types, ranges, c1)
+        static_factory(
+            self.dag,
+            index.nodes,
+            index.funcs,
+            self.folding.defaults,
+            arg_types,
+            ranges,
+            c1,
+            caching=get_caching_from_configs(self.configs),
+            background=self.configs.get("background"),
+        )
+        self.display_diagram(c2)
 
 
 class VectorizePageFunc(BasePageFunc):
@@ -66,10 +102,104 @@ class VectorizePageFunc(BasePageFunc):
 
         c1, c2 = st.columns(2)
 
-        c2.graphviz_chart(self.dag.dot_digraph())
-        funcs = get_funcs(self.dag)
-        nodes = get_nodes(self.dag)
-        # values = get_values(self.dag, funcs)
         # arg_types, ranges = get_from_configs(self.configs)
 
-        vector_factory(self.dag, nodes, funcs, c1)
+        vector_factory(
+            self.dag,
+            self.index.nodes,
+            self.index.funcs,
+            c1,
+            vec_modes=self.configs.get("vec_modes"),
+            sweep=self.configs.get("sweep", "zip"),
+            parallel=self.configs.get("parallel"),
+            max_points=self.configs.get("max_chart_points"),
+            background=self.configs.get("background"),
+            profile=self.configs.get("profile"),
+        )
+        self.display_diagram(c2)
+
+
+class BatchPageFunc(BasePageFunc):
+    def __call__(self):
+        if self.page_title:
+            st.markdown(f"""## **{self.page_title}**""")
+
+        c1, c2 = st.columns(2)
+
+        batch_factory(
+            self.dag,
+            c1,
+            fixed=self.folding.fixed,
+            vec_modes=self.configs.get("vec_modes"),
+            parallel=self.configs.get("parallel"),
+            background=self.configs.get("background"),
+            profile=self.configs.get("profile"),
+        )
+        self.display_diagram(c2)
+
+
+class UploadPageFunc(BasePageFunc):
+    def __call__(self):
+        if self.page_title:
+            st.markdown(f"""## **{self.page_title}**""")
+
+        c1, c2 = st.columns(2)
+
+        upload_factory(
+            self.dag,
+            c1,
+            fixed=self.folding.fixed,
+            chunk_size=self.configs.get("chunk_size"),
+            vec_modes=self.configs.get("vec_modes"),
+            parallel=self.configs.get("parallel"),
+            profile=self.configs.get("profile"),
+        )
+        self.display_diagram(c2)
+
+
+class SensitivityPageFunc(BasePageFunc):
+    def __call__(self):
+        if self.page_title:
+            st.markdown(f"""## **{self.page_title}**""")
+
+        c1, c2 = st.columns(2)
+
+        index = self.index
+        defaults = self.folding.defaults
+        # the fixed roots keep their values
+        roots = [root for root in index.order if root in index.roots]
+        sensitivity_factory(
+            self.dag,
+            c1,
+            base=get_session_root_values(
+                {root: defaults[root] for root in roots if root in defaults}
+            ),
+            roots=[root for root in roots if root not in self.folding.fixed],
+            outputs=self.configs.get("outputs"),
+            delta=self.configs.get("delta"),
+            caching=get_caching_from_configs(self.configs),
+            background=self.configs.get("background"),
+        )
+        self.display_diagram(c2)
+
+
+class GoalSeekPageFunc(BasePageFunc):
+    def __call__(self):
+        if self.page_title:
+            st.markdown(f"""## **{self.page_title}**""")
+
+        c1, c2 = st.columns(2)
+
+        index = self.index
+        roots = [root for root in index.order if root in index.roots]
+        goal_seek_factory(
+            self.dag,
+            c1,
+            base=self.folding.defaults,
+            # the fixed roots keep their values
+            roots=[root for root in roots if root not in self.folding.fixed],
+            outputs=self.configs.get("outputs"),
+            caching=get_caching_from_configs(self.configs),
+            background=self.configs.get("background"),
+        )
+        self.display_diagram(c2)
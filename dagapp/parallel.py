@@ -0,0 +1,250 @@
+"""Spreading the points of parameter sweeps over a pool of processes"""
+
+import multiprocessing
+import os
+import pickle
+import queue
+import subprocess
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import chain, repeat
+from threading import Lock
+
+import numpy as np
+
+from dagapp._worker import receive, send
+
+DFLT_PARALLEL_CHUNK_SIZE = 256
+DFLT_MP_CONTEXT = None  # `WorkerPool` processes (see `SweepExecutor`)
+
+
+class _Pickled:
+    """A function pickled by value, for functions workers can't import"""
+
+    def __init__(self, data):
+        self.data = data
+
+
+@lru_cache(maxsize=32)
+def _load(data):
+    return pickle.loads(data)
+
+
+def _call_chunk(func, columns):
+    if isinstance(func, _Pickled):
+        func = _load(func.data)
+    return [func(*xs) for xs in zip(*columns)]
+
+
+class _Worker:
+    """A `dagapp._worker` process, and the pipes its calls go through"""
+
+    def __init__(self):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "dagapp._worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+
+    def call(self, func, args, kwargs):
+        data = pickle.dumps((func, args, kwargs), pickle.HIGHEST_PROTOCOL)
+        try:
+            send(self.process.stdin, data)
+            ok, value = pickle.loads(receive(self.process.stdout))
+        except (EOFError, OSError) as error:
+            raise BrokenProcessPool("A sweep worker process died") from error
+        if not ok:
+            raise value
+        return value
+
+    def close(self, wait=True):
+        try:
+            self.process.stdin.close()  # workers exit when their input is closed
+        except OSError:
+            pass
+        if wait:
+            self.process.wait()
+            self.process.stdout.close()
+
+
+class WorkerPool(Executor):
+    """
+    An executor running calls in (at most `max_workers`) processes started as
+    `python -m dagapp._worker`.
+
+    Unlike the processes of a multiprocessing "spawn" context, these don't run the
+    parent's main script: the main module of a streamlit app is the app's script,
+    which isn't guarded by `if __name__ == "__main__"`, so every worker would run the
+    app. This works the same on Windows. Functions of the script are sent by value
+    (see `portable`), those of other modules by reference.
+
+    >>> from operator import add
+    >>> pool = WorkerPool(max_workers=2)
+    >>> list(pool.map(add, [1, 2, 3], [10, 20, 30]))
+    [11, 22, 33]
+    >>> pool.shutdown()
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._threads = ThreadPoolExecutor(self.max_workers, "dagapp-worker")
+        self._idle = queue.SimpleQueue()
+        self._lock = Lock()
+        self._closed = False
+
+    def submit(self, fn, /, *args, **kwargs):
+        return self._threads.submit(self._call, fn, args, kwargs)
+
+    def _call(self, func, args, kwargs):
+        # there are as many threads as workers can be, so a call gets an idle worker
+        # if there is one, and starts one otherwise
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            worker = _Worker()
+        try:
+            result = worker.call(func, args, kwargs)
+        except BrokenProcessPool:
+            worker.close(wait=False)
+            raise
+        except BaseException:
+            self._release(worker)
+            raise
+        self._release(worker)
+        return result
+
+    def _release(self, worker):
+        with self._lock:
+            if not self._closed:
+                self._idle.put(worker)
+                return
+        worker.close(wait=False)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self._threads.shutdown(wait=wait, cancel_futures=cancel_futures)
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.close(wait=wait)
+
+
+def portable(func):
+    """
+    Return func in a form that can be sent to worker processes, or None if it can't.
+
+    Functions (and callable objects) that only refer to importable modules are
+    pickled by reference. Those referring to the script streamlit runs (whose
+    module is `__main__`, which workers can't import) are pickled by value with
+    `cloudpickle`, if it's installed.
+    """
+    try:
+        data = pickle.dumps(func)
+    except Exception:
+        data = None
+    if data is not None and b"__main__" not in data:
+        return func
+    try:
+        import cloudpickle
+    except ImportError:
+        return None
+    try:
+        return _Pickled(cloudpickle.dumps(func))
+    except Exception:
+        return None
+
+
+class SweepExecutor:
+    """
+    Calls a function on each point of a sweep, with the points split in chunks of
+    `chunk_size` spread over a pool of `max_workers` processes.
+
+    The pool is created on first use and kept, so reruns don't pay for starting
+    processes again (use `get_sweep_executor` to share executors).
+    Sweeps smaller than a chunk, or of functions that can't be sent to other
+    processes (see `portable`), are computed in the current process.
+
+    The processes are those of a `WorkerPool` by default, or of a multiprocessing
+    context, if `mp_context` names a start method (under streamlit, "spawn" and
+    "forkserver" processes run the app's script, and forking its multi-threaded
+    server isn't safe).
+
+    >>> from operator import mul
+    >>> executor = SweepExecutor(max_workers=2, chunk_size=2)
+    >>> executor.map(mul, [np.arange(5), np.arange(5)])
+    array([ 0,  1,  4,  9, 16])
+    >>> executor.shutdown()
+    """
+
+    def __init__(
+        self,
+        max_workers=None,
+        chunk_size=DFLT_PARALLEL_CHUNK_SIZE,
+        mp_context=DFLT_MP_CONTEXT,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.mp_context = mp_context
+        self._pool = None
+        self._lock = Lock()
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.mp_context is None:
+                    self._pool = WorkerPool(self.max_workers)
+                else:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context(self.mp_context),
+                    )
+            return self._pool
+
+    def map(self, func, args):
+        """Return the array of func's results on the (broadcast) points of args"""
+        from dagapp.vectorize import _from_objects, elementwise_call
+
+        arrays = np.broadcast_arrays(*map(np.asarray, args))
+        shape = arrays[0].shape if arrays else ()
+        columns = [array.reshape(-1).tolist() for array in arrays]
+        n_points = len(columns[0]) if columns else 1
+        payload = portable(func) if n_points > self.chunk_size else None
+        if payload is None:
+            return elementwise_call(func, args)
+        chunks = [
+            [column[i : i + self.chunk_size] for column in columns]
+            for i in range(0, n_points, self.chunk_size)
+        ]
+        results = self.pool.map(_call_chunk, repeat(payload), chunks)
+        objects = np.empty(n_points, dtype=object)
+        objects[:] = list(chain.from_iterable(results))
+        return _from_objects(objects.reshape(shape))
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+
+_executors = dict()
+_executors_lock = Lock()
+
+
+def get_sweep_executor(
+    max_workers=None, chunk_size=DFLT_PARALLEL_CHUNK_SIZE, mp_context=DFLT_MP_CONTEXT
+):
+    """Return the process-wide `SweepExecutor` with these settings"""
+    key = (max_workers, chunk_size, mp_context)
+    with _executors_lock:
+        if key not in _executors:
+            _executors[key] = SweepExecutor(max_workers, chunk_size, mp_context)
+        return _executors[key]
@@ -0,0 +1,231 @@
+"""Compiled execution plans: evaluating a DAG without any per-call reflection"""
+
+import inspect
+import weakref
+from inspect import Parameter
+
+
+class _Missing:
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()  # marks the slots of values that aren't known
+
+
+def _lookup(values, slot):
+    try:
+        return values[slot]
+    except KeyError:
+        return MISSING
+
+
+class NodeStep:
+    """
+    The pre-resolved argument binding of a FuncNode.
+
+    Each argument is read from a slot of a values container. With the default
+    `slot_of=None` the slots are the names of the source nodes (so the step can be
+    called on any mapping of node values), but an `ExecutionPlan` maps them to the
+    integer positions of a flat values list.
+
+    >>> from meshed.base import FuncNode
+    >>> def f(x, /, y, z=10, **kw):
+    ...     return x + y + z + sum(kw.values())
+    >>> step = NodeStep(FuncNode(f, bind={'y': 'w'}))
+    >>> step.node, step.sources
+    ('f', ('x', 'w', 'z', 'kw'))
+    >>> step(dict(x=1, w=2, kw=dict(u=3)))
+    16
+    """
+
+    __slots__ = (
+        "node",
+        "func",
+        "out",
+        "sources",
+        "args",
+        "kwargs",
+        "var_args",
+        "var_kwargs",
+        "optional",
+    )
+
+    def __init__(self, func_node, slot_of=None):
+        self.node = func_node.out
+        self.func = func_node.func
+        slot_of = slot_of or {}
+        self.out = slot_of.get(self.node, self.node)
+        sources, args, kwargs, optional = [], [], [], []
+        self.var_args = self.var_kwargs = None
+        for name, param in inspect.signature(self.func).parameters.items():
+            source = func_node.bind.get(name, name)
+            slot = slot_of.get(source, source)
+            sources.append(source)
+            if param.default is not Parameter.empty:
+                # omitted when its value is missing, so the function's default is used
+                optional.append(slot)
+            if param.kind == Parameter.POSITIONAL_ONLY:
+                args.append(slot)
+            elif param.kind == Parameter.VAR_POSITIONAL:
+                self.var_args = slot
+            elif param.kind == Parameter.VAR_KEYWORD:
+                self.var_kwargs = slot
+            else:
+                kwargs.append((name, slot))
+        self.sources = tuple(sources)
+        self.args = tuple(args)
+        self.kwargs = tuple(kwargs)
+        self.optional = frozenset(optional)
+
+    def bind(self, values):
+        """Return the (args, kwargs) to call the node's function with"""
+        if self.optional:
+            return self._bind_skipping_missing(values)
+        args = [values[slot] for slot in self.args]
+        kwargs = {name: values[slot] for name, slot in self.kwargs}
+        if self.var_args is not None:
+            args.extend(values[self.var_args])
+        if self.var_kwargs is not None:
+            kwargs.update(values[self.var_kwargs])
+        return args, kwargs
+
+    def _bind_skipping_missing(self, values):
+        args, kwargs = [], {}
+        for slot in self.args:
+            value = _lookup(values, slot)
+            if value is MISSING and slot in self.optional:
+                continue
+            args.append(values[slot] if value is MISSING else value)
+        for name, slot in self.kwargs:
+            value = _lookup(values, slot)
+            if value is MISSING and slot in self.optional:
+                continue
+            kwargs[name] = values[slot] if value is MISSING else value
+        if self.var_args is not None:
+            args.extend(values[self.var_args])
+        if self.var_kwargs is not None:
+            kwargs.update(values[self.var_kwargs])
+        return args, kwargs
+
+    def __call__(self, values, memo=None):
+        """Call the node's function on values, through memo if one is given"""
+        args, kwargs = self.bind(values)
+        if memo is not None:
+            return memo.call(self.func, tuple(args), kwargs)
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.node!r})"
+
+
+class ExecutionPlan:
+    """
+    A DAG compiled into steps that read and write the slots of a flat values list.
+
+    Slots follow the topological order of the dag's var nodes (`DagIndex.order`), so
+    running all the steps in order evaluates the whole dag.
+
+    >>> from meshed.dag import DAG
+    >>> from dagapp.index import DagIndex
+    >>> def b(a):
+    ...     return 2 ** a
+    >>> def d(c):
+    ...     return 10 - (5 ** c)
+    >>> def result(b, d):
+    ...     return b * d
+    >>> plan = ExecutionPlan(DagIndex(DAG((b, d, result))))
+    >>> values = plan.load(dict(a=2, c=1))
+    >>> values
+    [2, 1, MISSING, MISSING, MISSING]
+    >>> plan.run(values)
+    [2, 1, 4, 5, 20]
+    >>> plan(a=3, c=0)
+    {'a': 3, 'c': 0, 'b': 8, 'd': 9, 'result': 72}
+    """
+
+    def __init__(self, index):
+        self.nodes = index.order
+        self.slot = index.position
+        self.steps = tuple(
+            NodeStep(index.funcs[node], self.slot)
+            for node in self.nodes
+            if node not in index.roots
+        )
+        self._steps = {step.node: step for step in self.steps}
+        self._required = {
+            step.node: tuple(
+                (source, self.slot[source])
+                for source in step.sources
+                if self.slot[source] not in step.optional
+            )
+            for step in self.steps
+        }
+
+    def load(self, values):
+        """Return the flat values list holding the node values found in values"""
+        return [values.get(node, MISSING) for node in self.nodes]
+
+    def store(self, values, target, nodes=None):
+        """Write the values (of nodes, or of all nodes) to the target mapping"""
+        for node in self.nodes if nodes is None else nodes:
+            target[node] = values[self.slot[node]]
+
+    def compute(self, node, values, memos=None):
+        """
+        Compute the value of node, storing it in values, and return it.
+
+        If `memos` (a mapping of nodes to `dagapp.cache.NodeMemo`s) has a memo for
+        node, the value is taken from it when the node's inputs were already seen.
+        """
+        step = self._steps[node]
+        for source, slot in self._required[node]:
+            if values[slot] is MISSING:
+                raise KeyError(source)
+        memo = memos.get(node) if memos else None
+        values[step.out] = value = step(values, memo)
+        return value
+
+    def run(self, values, nodes=None, memos=None):
+        """Compute the nodes (all non-root nodes by default), in topological order"""
+        if nodes is None:
+            steps = self.steps
+        else:
+            steps = [self._steps[node] for node in nodes]
+        self._check_inputs(values, steps)
+        if memos:
+            for step in steps:
+                values[step.out] = step(values, memos.get(step.node))
+        else:
+            for step in steps:
+                values[step.out] = step(values)
+        return values
+
+    def __call__(self, **root_values):
+        """Evaluate the whole dag and return the values of all its nodes"""
+        values = self.run(self.load(root_values))
+        return dict(zip(self.nodes, values))
+
+    def _check_inputs(self, values, steps):
+        if not any(value is MISSING for value in values):
+            return
+        computed = {step.node for step in steps}
+        for step in steps:
+            for source, slot in self._required[step.node]:
+                if values[slot] is MISSING and source not in computed:
+                    # same error as reading a missing key of st.session_state
+                    raise KeyError(source)
+
+
+_node_steps = dict()
+
+
+def node_step(func_node):
+    """Return the `NodeStep` of func_node (reading values by node name), built once"""
+    entry = _node_steps.get(id(func_node))
+    if entry is not None and entry[0]() is func_node:
+        return entry[1]
+    step = NodeStep(func_node)
+    _node_steps[id(func_node)] = (weakref.ref(func_node), step)
+    weakref.finalize(func_node, _node_steps.pop, id(func_node), None)
+    return step
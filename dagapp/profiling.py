@@ -0,0 +1,131 @@
+"""Timing the computations of DAG nodes"""
+
+import time
+from threading import Lock
+
+DFLT_LOW_COST_COLOR = "#ffffff"
+DFLT_HIGH_COST_COLOR = "#fa5252"
+
+
+class NodeProfiler:
+    """
+    Records the wall time, number of calls and last duration of the computations
+    of each node.
+
+    >>> profiler = NodeProfiler()
+    >>> profiler.record('b', 0.5)
+    >>> profiler.record('b', 1.5)
+    >>> profiler.stats['b']
+    {'calls': 2, 'total': 2.0, 'last': 1.5, 'mean': 1.0}
+    """
+
+    def __init__(self):
+        self._timings = dict()  # node -> [calls, total, last]
+        self._lock = Lock()
+
+    def record(self, node, seconds):
+        with self._lock:
+            timing = self._timings.setdefault(node, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = seconds
+
+    def call(self, node, func, args, kwargs):
+        """Return func(*args, **kwargs), recording how long it took as node's"""
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.record(node, time.perf_counter() - start)
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                node: dict(calls=calls, total=total, last=last, mean=total / calls)
+                for node, (calls, total, last) in self._timings.items()
+            }
+
+    def costs(self, stat="total"):
+        """Return the dict of the given stat of each node"""
+        return {node: stats[stat] for node, stats in self.stats.items()}
+
+    def clear(self):
+        with self._lock:
+            self._timings.clear()
+
+
+class Profiled:
+    """
+    Computes the values of a node through a cache (anything with a
+    `call(func, args, kwargs)` method) if one is given, recording how long it
+    took in profiler (so cache hits show up as fast calls).
+    """
+
+    def __init__(self, profiler, node, cache=None):
+        self.profiler = profiler
+        self.node = node
+        self.cache = cache
+
+    def call(self, func, args, kwargs):
+        if self.cache is None:
+            return self.profiler.call(self.node, func, args, kwargs)
+        return self.profiler.call(self.node, self.cache.call, (func, args, kwargs), {})
+
+
+def critical_path(index, costs):
+    """
+    Return the path of nodes, from a root to a leaf, with the largest total cost.
+
+    :param index: The `dagapp.index.DagIndex` of the dag
+    :param costs: A mapping of (some) nodes to their cost (0 for the others)
+
+    >>> from meshed.dag import DAG
+    >>> from dagapp.index import DagIndex
+    >>> def b(a):
+    ...     return 2 ** a
+    >>> def d(c):
+    ...     return 10 - (5 ** c)
+    >>> def result(b, d):
+    ...     return b * d
+    >>> index = DagIndex(DAG((b, d, result)))
+    >>> critical_path(index, {'b': 1.0, 'd': 3.0, 'result': 0.5})
+    ['c', 'd', 'result']
+    """
+    cost_to, previous = dict(), dict()
+    for node in index.order:
+        parents = sorted(index.parents[node], key=index.position.__getitem__)
+        parent = max(parents, key=cost_to.__getitem__, default=None)
+        previous[node] = parent
+        cost_to[node] = costs.get(node, 0) + (0 if parent is None else cost_to[parent])
+    if not cost_to:
+        return []
+    node = max(index.order, key=cost_to.__getitem__)
+    path = []
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+    return path[::-1]
+
+
+def _rgb(color):
+    return tuple(int(color[i : i + 2], 16) for i in (1, 3, 5))
+
+
+def cost_colors(costs, low=DFLT_LOW_COST_COLOR, high=DFLT_HIGH_COST_COLOR):
+    """
+    Return a dict of nodes to colors going from low to high with their cost
+
+    >>> cost_colors({'a': 0.0, 'b': 1.0, 'c': 2.0}, low='#000000', high='#ff0000')
+    {'a': '#000000', 'b': '#800000', 'c': '#ff0000'}
+    """
+    top = max(costs.values(), default=0) or 1
+    low_rgb, high_rgb = _rgb(low), _rgb(high)
+    return {
+        node: "#"
+        + "".join(
+            f"{round(lo + (hi - lo) * cost / top):02x}"
+            for lo, hi in zip(low_rgb, high_rgb)
+        )
+        for node, cost in costs.items()
+    }
@@ -0,0 +1,164 @@
+"""Propagating changed node values through a DAG"""
+
+from collections.abc import Mapping
+from numbers import Number
+
+from dagapp.plan import MISSING
+
+CUTOFF_POLICIES = ("identity", "equality", "never")  # or a (number) tolerance
+DFLT_CUTOFF = "equality"
+
+
+def propagate(index, changed, compute, cutoff=False):
+    """
+    Recompute the nodes downstream of the changed nodes, each exactly once and in
+    topological order, so that every node is computed after all its inputs.
+
+    With `cutoff`, `compute` returns whether the value of the node changed, and the
+    nodes none of whose parents changed are skipped (and so are their successors,
+    unless another path reaches them from a node that changed).
+
+    :param index: The `dagapp.index.DagIndex` of the dag
+    :param changed: A node, or an iterable of nodes, whose values changed
+    :param compute: A `compute(node)` function computing (and storing) node's value
+    :param cutoff: Whether to stop propagating from the nodes that didn't change
+    :return: The nodes that were recomputed, in the order they were recomputed
+
+    >>> from meshed.dag import DAG
+    >>> from dagapp.index import DagIndex
+    >>> def b(a):
+    ...     return a + 1
+    >>> def c(a, b):
+    ...     return a * b
+    >>> index = DagIndex(DAG([b, c]))
+    >>> values = index.plan.load(dict(a=3, b=2, c=2))
+    >>> def compute(node):
+    ...     print('computing', node)
+    ...     index.plan.compute(node, values)
+    >>> propagate(index, 'a', compute)
+    computing b
+    computing c
+    ('b', 'c')
+    >>> values
+    [3, 4, 12]
+
+    With `cutoff`, a node whose value didn't change stops the propagation:
+
+    >>> def sign(x):
+    ...     return x > 0
+    >>> def label(sign):
+    ...     return 'positive' if sign else 'negative'
+    >>> index = DagIndex(DAG([sign, label]))
+    >>> values = index.plan.load(dict(x=3, sign=True, label='positive'))
+    >>> def compute(node):
+    ...     slot = index.plan.slot[node]
+    ...     previous = values[slot]
+    ...     print('computing', node)
+    ...     return not same_value(previous, index.plan.compute(node, values))
+    >>> values[index.plan.slot['x']] = 5
+    >>> propagate(index, 'x', compute, cutoff=True)
+    computing sign
+    ('sign',)
+    """
+    dirty = index.dirty(changed)
+    if not cutoff:
+        for node in dirty:
+            compute(node)
+        return dirty
+    modified = {changed} if isinstance(changed, str) else set(changed)
+    computed = []
+    for node in dirty:
+        if modified.isdisjoint(index.parents[node]):
+            continue
+        computed.append(node)
+        if compute(node):
+            modified.add(node)
+    return tuple(computed)
+
+
+def cutoff_policy(cutoff, node):
+    """
+    Returns the policy comparing the new and previous values of node, according to
+    a `cutoff` config: a policy for all the nodes, or a dict of them for some nodes
+    (the others using the default, `DFLT_CUTOFF`)
+    """
+    if isinstance(cutoff, Mapping):
+        return cutoff.get(node, DFLT_CUTOFF)
+    return DFLT_CUTOFF if cutoff is None else cutoff
+
+
+def same_value(previous, new, policy=DFLT_CUTOFF):
+    """
+    Returns whether new is the same value as previous, according to policy:
+
+    - "identity": if it's the same object
+    - "equality": if it's equal (element-wise for arrays and tables)
+    - a number: if it's within that (absolute) tolerance of previous
+    - "never": values are never considered to be the same
+
+    Values of different types (or dtypes, or containing values of different types)
+    are considered different, as are values that can't be compared.
+
+    >>> same_value(3, 3), same_value([1], [1], 'identity'), same_value(1.0, 1.05, 0.1)
+    (True, False, True)
+    >>> same_value(3, 3.0), same_value(True, 1), same_value([1, 2], [1, 2.0])
+    (False, False, False)
+    >>> import numpy as np
+    >>> same_value(np.arange(3), np.arange(3)), same_value(np.zeros(2), np.zeros(3))
+    (True, False)
+    >>> same_value(2, 2, 'never')
+    False
+    """
+    if policy == "never" or previous is MISSING:
+        return False
+    if previous is new:
+        return True
+    if policy == "identity":
+        return False
+    try:
+        if not _same_types(previous, new):
+            return False
+        if policy == "equality":
+            return _equal(previous, new)
+        return _close(previous, new, policy)
+    except Exception:  # values that can't be compared (or are ambiguous)
+        return False
+
+
+def _same_types(previous, new):
+    """Whether previous and new (and the items they contain) have the same types"""
+    if type(previous) is not type(new):
+        return False
+    if getattr(previous, "dtype", None) != getattr(new, "dtype", None):
+        return False
+    if isinstance(previous, (list, tuple)):
+        return len(previous) == len(new) and all(map(_same_types, previous, new))
+    if isinstance(previous, dict):
+        return previous.keys() == new.keys() and all(
+            _same_types(value, new[key]) for key, value in previous.items()
+        )
+    return True
+
+
+def _equal(previous, new):
+    if type(previous) is type(new) and callable(getattr(new, "equals", None)):
+        return bool(new.equals(previous))  # pandas objects
+    if hasattr(previous, "shape") or hasattr(new, "shape"):
+        import numpy as np
+
+        try:
+            return bool(np.array_equal(previous, new, equal_nan=True))
+        except TypeError:  # arrays of values that can't be NaN
+            return bool(np.array_equal(previous, new))
+    return bool(previous == new)
+
+
+def _close(previous, new, tolerance):
+    if isinstance(previous, Number) and isinstance(new, Number):
+        return abs(new - previous) <= tolerance
+    import numpy as np
+
+    previous, new = np.asarray(previous, dtype=float), np.asarray(new, dtype=float)
+    return previous.shape == new.shape and bool(
+        np.allclose(previous, new, rtol=0, atol=tolerance, equal_nan=True)
+    )
@@ -0,0 +1,240 @@
+"""Measuring how much the outputs of a DAG change when each of its roots does"""
+
+import math
+from numbers import Real
+
+from dagapp.index import DagIndex, dag_index
+from dagapp.utils import LazyModule
+
+pd = LazyModule("pandas")
+
+DFLT_DELTA = 0.1  # perturbation of the roots: ±10% of their base values
+
+
+def is_number(value):
+    """
+    Return whether value is a (real, non-bool) number
+
+    >>> is_number(2.5), is_number(True), is_number('2')
+    (True, False, False)
+    """
+    return isinstance(value, Real) and not isinstance(value, bool)
+
+
+def numeric_values(values, nodes):
+    """
+    Return a dict of the numeric values of nodes, the (numeric) items of the dict
+    values being expanded into `{node}_{key}` entries, as static pages show them
+
+    >>> numeric_values(dict(a=1, b='x', c=dict(low=2, note='y')), 'abc')
+    {'a': 1, 'c_low': 2}
+    """
+    numeric = dict()
+    for node in nodes:
+        value = values[node]
+        if is_number(value):
+            numeric[node] = value
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                if is_number(item):
+                    numeric[f"{node}_{key}"] = item
+    return numeric
+
+
+def perturbations(value, delta=DFLT_DELTA, relative=True):
+    """
+    Return the (low, high) values of a root of the given base value: `value`
+    times `1 ± delta` if relative (and value isn't zero), `value ± delta`
+    otherwise. Integers stay integers, moving by at least one.
+
+    >>> perturbations(200.0)
+    (180.0, 220.0)
+    >>> perturbations(0.0), perturbations(30), perturbations(3)
+    ((-0.1, 0.1), (27, 33), (2, 4))
+    """
+    step = abs(value) * delta if relative and value != 0 else delta
+    if isinstance(value, int):
+        step = max(1, round(step))
+    return value - step, value + step
+
+
+def elasticity(base_input, low_input, high_input, base, low, high):
+    """
+    Return the (arc) elasticity of an output to an input: the relative change of
+    the output over the relative change of the input, or NaN if either base
+    value is zero
+    """
+    if not base or not base_input:
+        return math.nan
+    return ((high - low) / base) / ((high_input - low_input) / base_input)
+
+
+def sensitivity_table(
+    dag,
+    outputs=None,
+    *,
+    base=None,
+    roots=None,
+    delta=DFLT_DELTA,
+    relative=True,
+    caches=None,
+    check=None,
+):
+    """
+    Perturb each numeric root of dag by ±delta (see `perturbations`), returning a
+    table, indexed by output and root, of the values the (numeric) outputs take,
+    their swing (the absolute difference of the two) and their `elasticity`. The
+    rows of each output are sorted by decreasing swing, as in a tornado chart.
+
+    The dag is evaluated once with the base values of the roots. Then, for each
+    perturbation, only the nodes downstream of the perturbed root that lead to an
+    output are recomputed, the values of the others being those of the base run,
+    so the cost grows with the subgraphs the roots affect, not with the number of
+    roots times the size of the dag.
+
+    :param dag: The dag, or its `dagapp.index.DagIndex`
+    :param outputs: The nodes whose changes are measured (the leaves by default);
+        the numeric items of the nodes whose values are dicts are outputs too (see
+        `numeric_values`)
+    :param base: The base values of (some of) the roots (their defaults otherwise)
+    :param roots: The roots to perturb (all the roots with numeric base values by
+        default)
+    :param delta: The relative (or absolute, if not `relative`) perturbation
+    :param caches: A mapping of nodes to the caches to compute them through (see
+        `dagapp.utils.get_node_caches`)
+    :param check: A function called before each perturbation (that can raise to
+        abandon the analysis)
+
+    A perturbation failing (e.g. a root going out of the domain of a function)
+    gives NaN values, and doesn't stop the analysis.
+
+    >>> from meshed.dag import DAG
+    >>> calls = []
+    >>> def fees(days, day_rate=1000):
+    ...     calls.append('fees')
+    ...     return days * day_rate
+    >>> def travel(trips=2, trip_cost=300):
+    ...     calls.append('travel')
+    ...     return trips * trip_cost
+    >>> def total(fees, travel):
+    ...     calls.append('total')
+    ...     return fees + travel
+    >>> index = DagIndex(DAG((fees, travel, total)))
+    >>> calls.clear()
+    >>> table = sensitivity_table(index, base=dict(days=10))
+    >>> table[['low', 'high', 'swing', 'elasticity']].round(3)
+                        low   high  swing  elasticity
+    output root
+    total  day_rate    9600  11600   2000       0.943
+           days        9600  11600   2000       0.943
+           trips      10300  10900    600       0.057
+           trip_cost  10540  10660    120       0.057
+
+    After the base run, perturbing `days` or `day_rate` didn't recompute `travel`,
+    and perturbing `trips` or `trip_cost` didn't recompute `fees`:
+
+    >>> calls.count('fees'), calls.count('travel'), calls.count('total')
+    (5, 5, 9)
+    """
+    index = dag if isinstance(dag, DagIndex) else dag_index(dag)
+    plan = index.plan
+    caches = caches or {}
+    if outputs is None:
+        outputs = [node for node in index.non_roots if not index.children[node]]
+    outputs = list(outputs)
+
+    # the base run
+    values = plan.load({**index.defaults, **(base or {})})
+    for step in plan.steps:
+        plan.compute(step.node, values, caches)
+    base_values = {node: values[plan.slot[node]] for node in plan.nodes}
+    base_outputs = numeric_values(base_values, outputs)
+    if roots is None:
+        roots = [root for root in index.order if root in index.roots]
+    roots = [root for root in roots if is_number(base_values[root])]
+
+    leading_to_outputs = set(outputs)
+    for node in reversed(index.order):
+        if node in leading_to_outputs:
+            leading_to_outputs.update(index.parents[node])
+    rows = []
+    for root in roots:
+        recomputed = [node for node in index.dirty(root) if node in leading_to_outputs]
+        touched = [plan.slot[node] for node in (root, *recomputed)]
+        saved = [values[slot] for slot in touched]
+        base_input = base_values[root]
+        low_input, high_input = perturbations(base_input, delta, relative)
+        changed = [node for node in outputs if node in recomputed]
+        ends = []
+        for input_value in (low_input, high_input):
+            if check is not None:
+                check()
+            values[plan.slot[root]] = input_value
+            try:
+                for node in recomputed:
+                    plan.compute(node, values, caches)
+                current = {node: values[plan.slot[node]] for node in changed}
+                ends.append({**base_outputs, **numeric_values(current, changed)})
+            except Exception:
+                ends.append({})
+        for slot, value in zip(touched, saved):
+            values[slot] = value
+        for output, base_output in base_outputs.items():
+            low = ends[0].get(output, math.nan)
+            high = ends[1].get(output, math.nan)
+            rows.append(
+                dict(
+                    output=output,
+                    root=root,
+                    low_input=low_input,
+                    high_input=high_input,
+                    base=base_output,
+                    low=low,
+                    high=high,
+                    swing=abs(high - low),
+                    elasticity=elasticity(
+                        base_input, low_input, high_input, base_output, low, high
+                    ),
+                )
+            )
+
+    table = pd.DataFrame(
+        rows,
+        columns=[
+            "output",
+            "root",
+            "low_input",
+            "high_input",
+            "base",
+            "low",
+            "high",
+            "swing",
+            "elasticity",
+        ],
+    )
+    table = table.sort_values(
+        ["output", "swing", "root"], ascending=[True, False, True], kind="stable"
+    )
+    return table.set_index(["output", "root"])
+
+
+def tornado_frame(table, output):
+    """
+    Return the long table a tornado chart of output is drawn from (given the
+    `sensitivity_table`): for each root, the change of output when the root is at
+    its low, then its high value
+    """
+    rows = table.loc[output]
+    return pd.concat(
+        [
+            pd.DataFrame(
+                dict(
+                    root=rows.index,
+                    input=f"{end} input",
+                    change=rows[end] - rows["base"],
+                )
+            )
+            for end in ("low", "high")
+        ],
+        ignore_index=True,
+    )
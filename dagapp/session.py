@@ -0,0 +1,204 @@
+"""Evaluating a DAG, keeping track of which of its node values are up to date"""
+
+from collections.abc import Mapping
+from functools import partial
+
+from dagapp.budget import OverBudget
+from dagapp.index import DagIndex, dag_index
+from dagapp.plan import MISSING
+from dagapp.propagation import cutoff_policy, propagate, same_value
+
+
+class DagSession(Mapping):
+    """
+    The values of the nodes of a dag, kept up to date as some of them are set.
+
+    Values are stored in a flat list, in the slots of the dag's
+    `dagapp.plan.ExecutionPlan`. Setting values only records which nodes changed:
+    the nodes downstream of them are recomputed by `evaluate` (or when a value is
+    read), each exactly once and in topological order, so setting several values
+    costs a single propagation. A recomputed node whose value is the same as before
+    (see `dagapp.propagation.same_value`) doesn't propagate any further.
+
+    :param dag: The dag, or its `dagapp.index.DagIndex`
+    :param values: The current values of (some of) the nodes, taken to be
+        consistent with each other (the defaults of the dag if not given)
+    :param caches: A mapping of nodes to the caches to compute them through
+        (anything with a `call(func, args, kwargs)` method, see
+        `dagapp.utils.get_node_caches`)
+    :param placeholders: The values to give the nodes that go over their time
+        budget before they were ever computed
+    :param late: The nodes that went over their time budget (or depend on a node
+        that did) when they were last computed, to retry on the next `evaluate`
+    :param constants: The values of the nodes that are fixed for the life of the
+        session (see `dagapp.folding`), which are never recomputed
+    :param cutoff: The policy deciding whether a recomputed value is the same as
+        the previous one (see `dagapp.propagation.same_value`), or a dict of
+        them for some nodes ("equality" by default)
+
+    >>> from meshed.dag import DAG
+    >>> def b(a):
+    ...     return 2 ** a
+    >>> def d(c):
+    ...     return 10 - (5 ** c)
+    >>> def result(b, d):
+    ...     return b * d
+    >>> session = DagSession(DAG((b, d, result)))
+    >>> dict(session)
+    {'a': 0.0, 'c': 0.0, 'b': 1.0, 'd': 9.0, 'result': 9.0}
+    >>> session.set(a=3, c=1)
+    >>> session.dirty
+    ('b', 'd', 'result')
+    >>> session.evaluate()
+    ('b', 'd', 'result')
+    >>> session['result']
+    40
+
+    Setting `c` to 1 again leaves `d` as it was, so `result` isn't recomputed:
+
+    >>> session.set(c=1)
+    >>> session.evaluate()
+    ('d',)
+    """
+
+    def __init__(
+        self,
+        dag,
+        values=None,
+        *,
+        caches=None,
+        placeholders=None,
+        late=(),
+        constants=None,
+        cutoff=None,
+    ):
+        self.index = dag if isinstance(dag, DagIndex) else dag_index(dag)
+        self.plan = self.index.plan
+        self._values = self.plan.load(self.index.defaults if values is None else values)
+        self.constants = frozenset(constants or ())
+        for node in self.constants:
+            self._values[self.plan.slot[node]] = constants[node]
+        self.caches = caches or {}
+        self.placeholders = placeholders or {}
+        self.late = set(late)
+        self.cutoff = cutoff
+        self._changed = dict()  # insertion-ordered set of the nodes set since evaluated
+
+    @property
+    def dag(self):
+        return self.index.dag
+
+    def set(self, values=(), /, **node_values):
+        """Set the values of nodes (their successors are recomputed by `evaluate`)"""
+        slot = self.plan.slot
+        for node, value in dict(values, **node_values).items():
+            self._values[slot[node]] = value
+            self._changed.pop(node, None)
+            self._changed[node] = None
+
+    @property
+    def changed(self):
+        """The nodes set since the last evaluation"""
+        return tuple(self._changed)
+
+    @property
+    def dirty(self):
+        """The nodes whose values are outdated, in topological order"""
+        return self.index.dirty(self.changed) if self._changed else ()
+
+    def compute(self, node, check=None):
+        """
+        Compute the value of node, returning whether it did. It doesn't if one of
+        its parents is late (went over its time budget, or depends on a node that
+        did), or if it goes over its own budget: then it's late too, and keeps its
+        last value (or gets its placeholder, if it had none).
+
+        :param check: A function called before computing (that can raise to abandon)
+        """
+        if check is not None:
+            check()
+        if self.late & self.index.parents[node]:
+            self.late.add(node)
+            return False
+        try:
+            self.plan.compute(node, self._values, self.caches)
+            return True
+        except OverBudget:
+            self.late.add(node)
+            slot = self.plan.slot[node]
+            if self._values[slot] is MISSING and node in self.placeholders:
+                self._values[slot] = self.placeholders[node]
+            return False
+
+    def _update(self, node, check=None):
+        """Compute node, returning whether its value (possibly) changed"""
+        slot = self.plan.slot[node]
+        previous = self._values[slot]
+        if not self.compute(node, check):
+            return True  # late: so are its successors, which must be told so
+        policy = cutoff_policy(self.cutoff, node)
+        return not same_value(previous, self._values[slot], policy)
+
+    def evaluate(self, check=None):
+        """
+        Recompute the nodes downstream of the changed ones, and retry the late ones,
+        returning the nodes that were recomputed (in the order they were).
+
+        :param check: A function called before computing each node (that can raise
+            to abandon the evaluation)
+        """
+        index, changed = self.index, self.changed
+        previous_late, self.late = self.late, set()
+        # the nodes left late by previous evaluations are retried (getting the
+        # results of their overrunning calls if they're ready), and propagated if
+        # they recover
+        dirty = set(index.dirty(changed)).union(changed)
+        retry = sorted(previous_late - dirty, key=index.position.__getitem__)
+        recovered = [node for node in retry if self.compute(node, check)]
+        update = partial(self._update, check=check)
+        propagated = propagate(index, [*changed, *recovered], update, cutoff=True)
+        self._changed.clear()
+        return (*recovered, *propagated)
+
+    def reload(self, check=None):
+        """
+        Recompute all the non-root nodes (but the constant ones), returning them (in
+        topological order)
+        """
+        self.late = set()
+        steps = self.plan.steps
+        nodes = tuple(step.node for step in steps if step.node not in self.constants)
+        for node in nodes:
+            self.compute(node, check)
+        self._changed.clear()
+        return nodes
+
+    def snapshot(self, nodes=None):
+        """
+        Return a dict of the values of nodes (of all the nodes with a value by
+        default), as they are: without evaluating the changes
+        """
+        slot = self.plan.slot
+        if nodes is None:
+            nodes = self.plan.nodes
+        values = ((node, self._values[slot[node]]) for node in nodes)
+        return {node: value for node, value in values if value is not MISSING}
+
+    def __getitem__(self, node):
+        if self._changed:
+            self.evaluate()
+        value = self._values[self.plan.slot[node]]
+        if value is MISSING:
+            raise KeyError(node)
+        return value
+
+    def __iter__(self):
+        if self._changed:
+            self.evaluate()
+        return iter(self.snapshot())
+
+    def __len__(self):
+        return sum(value is not MISSING for value in self._values)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.dag!r})"
@@ -0,0 +1,137 @@
+"""Tests of dagapp.background, and of pages computing in the background"""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import pytest
+
+from dagapp.background import Abandoned, BackgroundRunner
+
+TIMEOUT = 10  # seconds: only reached if a test fails
+
+# what the `b` node of the page of `test_page_shows_stale_values_until_recomputed`
+# waits for
+release = Event()
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def blocked_job(started, gate, results, checked=None):
+    def job(check):
+        started.set()
+        assert gate.wait(TIMEOUT)
+        if checked is not None:
+            check()
+            checked.set()
+        return results
+
+    return job
+
+
+def test_newer_job_abandons_the_running_one(executor):
+    runner = BackgroundRunner(executor)
+    started, gate, checked = Event(), Event(), Event()
+    runner.submit(blocked_job(started, gate, {"x": "old"}, checked), stale=["x"])
+    assert started.wait(TIMEOUT)
+    runner.submit(lambda check: {"x": "new"}, stale=["x", "y"])
+    runner.wait(TIMEOUT)
+    assert runner.stale == {"x", "y"}
+    gate.set()
+    executor.shutdown(wait=True)  # the old job is done too
+    assert not checked.is_set()  # its check raised `Abandoned`
+    assert runner.pop_results() == {"x": "new"}
+    assert runner.stale == frozenset()
+
+
+def test_results_of_a_superseded_job_are_dropped(executor):
+    runner = BackgroundRunner(executor)
+    started, gate = Event(), Event()
+    runner.submit(blocked_job(started, gate, {"x": "old"}))  # never checks
+    assert started.wait(TIMEOUT)
+    runner.submit(lambda check: {"x": "new"})
+    runner.wait(TIMEOUT)
+    gate.set()
+    executor.shutdown(wait=True)
+    assert runner.pop_results() == {"x": "new"}
+
+
+def test_pop_results_hands_results_over_once(executor):
+    runner = BackgroundRunner(executor)
+    runner.submit(lambda check: {"x": 1}, stale=["x"])
+    runner.wait(TIMEOUT)
+    assert runner.pending and not runner.running
+    assert runner.pop_results() == {"x": 1}
+    assert runner.pop_results() is None
+    assert not runner.pending
+
+
+def test_failed_job_records_its_error(executor):
+    runner = BackgroundRunner(executor)
+
+    def failing(check):
+        raise ValueError("boom")
+
+    runner.submit(failing, stale=["x"])
+    runner.wait(TIMEOUT)
+    assert isinstance(runner.error, ValueError)
+    assert runner.stale == frozenset()
+    assert runner.pop_results() is None
+    runner.submit(lambda check: {"x": 1})
+    assert runner.error is None
+
+
+def test_check_raises_once_superseded():
+    runner = BackgroundRunner()
+    runner.generation = 2
+    runner.check(2)
+    with pytest.raises(Abandoned):
+        runner.check(1)
+
+
+PAGE = """
+from meshed.dag import DAG
+from dagapp.base import dag_app
+from dagapp.tests.test_background import TIMEOUT, release
+from dagapp.utils import get_default_configs
+
+def b(a: float = 1.0):
+    release.wait(TIMEOUT)
+    return a + 1
+
+def c(b, a: float = 1.0):
+    return a * b
+
+dags = [DAG([b, c])]
+configs = get_default_configs(dags)
+configs[0]["background"] = dict(poll_interval=0.01)
+dag_app(dags, configs=configs)
+"""
+
+
+def test_page_shows_stale_values_until_recomputed():
+    from streamlit.testing.v1 import AppTest
+
+    from dagapp.utils import BACKGROUND_KEY
+
+    release.set()
+    at = AppTest.from_string(PAGE, default_timeout=TIMEOUT).run()
+    assert [n.value for n in at.number_input] == [1.0, 2.0, 2.0]
+    release.clear()
+    try:
+        at.number_input(key="a").set_value(2.0).run()
+        # the change returned before b was recomputed: the outputs are stale
+        assert [n.value for n in at.number_input] == [2.0, 2.0, 2.0]
+        assert "Recomputing in the background..." in [c.value for c in at.caption]
+    finally:
+        release.set()
+    for runner in at.session_state[BACKGROUND_KEY].values():
+        runner.wait(TIMEOUT)
+    at.run()
+    assert not at.exception
+    assert [n.value for n in at.number_input] == [2.0, 3.0, 6.0]
+    assert not at.caption
@@ -0,0 +1,121 @@
+"""Tests of dagapp.budget, and of pages with time budgets"""
+
+from threading import Event
+
+import pytest
+
+from dagapp.budget import Budgeted, OverBudget, TimeBudget
+from dagapp.cache import NodeMemo
+
+TIMEOUT = 10  # seconds: only reached if a test fails
+BUDGET = 0.5  # seconds: how long calls of gated functions wait for them
+
+
+class Gated:
+    """A function returning twice its argument once its gate is open"""
+
+    __fingerprint__ = 1  # (its state doesn't change the page's fingerprints)
+
+    def __init__(self):
+        self.gate, self.finished, self.calls = Event(), Event(), []
+
+    def __call__(self, x):
+        self.calls.append(x)
+        assert self.gate.wait(TIMEOUT)
+        self.finished.set()
+        return 2 * x
+
+
+def test_overrunning_call_is_reused_once_it_finishes():
+    budget, double = TimeBudget(BUDGET), Gated()
+    with pytest.raises(OverBudget, match="took more than"):
+        budget.call(double, (21,), {})
+    double.gate.set()
+    assert double.finished.wait(TIMEOUT)
+    assert budget.call(double, (21,), {}) == 42
+    assert double.calls == [21]  # the late call wasn't started over
+    assert budget.call(double, (21,), {}) == 42  # computed anew, in time
+    assert double.calls == [21, 21]
+
+
+def test_calls_are_given_up_on_while_too_many_overrun():
+    budget, double = TimeBudget(BUDGET, max_overruns=1), Gated()
+    with pytest.raises(OverBudget, match="took more than"):
+        budget.call(double, (1,), {})
+    with pytest.raises(OverBudget, match="still computing 1 earlier value"):
+        budget.call(double, (2,), {})
+    assert double.calls == [1]  # the second call wasn't started
+    double.gate.set()
+    assert double.finished.wait(TIMEOUT)
+    assert budget.call(double, (2,), {}) == 4
+
+
+def test_only_values_computed_in_time_are_cached():
+    double = Gated()
+    budgeted = Budgeted(TimeBudget(BUDGET), NodeMemo())
+    with pytest.raises(OverBudget):
+        budgeted.call(double, (1,), {})
+    double.gate.set()
+    assert double.finished.wait(TIMEOUT)
+    assert budgeted.call(double, (1,), {}) == 2  # the late result...
+    assert budgeted.call(double, (1,), {}) == 2  # ... is now cached
+    assert double.calls == [1]
+
+
+PAGE = """
+from meshed.dag import DAG
+from dagapp.base import dag_app
+from dagapp.tests.test_budget import BUDGET, page_b
+from dagapp.utils import get_default_configs
+
+def b(a: float = 1.0):
+    return page_b(a)
+
+def c(e: float = 1.0):
+    return 10 * e
+
+def d(b, c):
+    return b + c
+
+dags = [DAG([b, c, d])]
+configs = get_default_configs(dags)
+configs[0].update(time_budgets=dict(b=BUDGET), placeholders=dict(b=-1.0))
+dag_app(dags, configs=configs)
+"""
+
+page_b = Gated()
+
+
+def values(at):
+    return {n.key: n.value for n in at.number_input}
+
+
+def stale_captions(at):
+    return [c.value.split(" ")[0] for c in at.caption if "stale" in c.value]
+
+
+def test_page_keeps_late_values_until_they_are_computed():
+    from streamlit.testing.v1 import AppTest
+
+    page_b.gate.set()
+    at = AppTest.from_string(PAGE, default_timeout=TIMEOUT).run()
+    assert values(at) == dict(a=1.0, b=2.0, e=1.0, c=10.0, d=12.0)
+    page_b.gate.clear()
+    page_b.finished.clear()
+    page_b.calls.clear()
+    try:
+        at.number_input(key="a").set_value(3.0).run()
+        # b went over its budget: it keeps its value, as d, which depends on it
+        assert values(at) == dict(a=3.0, b=2.0, e=1.0, c=10.0, d=12.0)
+        assert stale_captions(at) == ["b", "d"]
+        at.number_input(key="e").set_value(2.0).run()  # b is still computing...
+        assert values(at) == dict(a=3.0, b=2.0, e=2.0, c=20.0, d=12.0)
+        assert stale_captions(at) == ["b", "d"]
+    finally:
+        page_b.gate.set()
+    assert page_b.finished.wait(TIMEOUT)  # ... until now
+    at.number_input(key="e").set_value(3.0).run()
+    assert not at.exception
+    assert values(at) == dict(a=3.0, b=6.0, e=3.0, c=30.0, d=36.0)
+    assert stale_captions(at) == []
+    assert page_b.calls == [3.0]  # the late computation was reused
@@ -0,0 +1,87 @@
+"""Tests of dagapp.debounce, and of pages coalescing changes"""
+
+from dagapp.debounce import ChangeCoalescer
+
+
+def test_changes_are_due_once_none_came_for_their_wait():
+    changes = ChangeCoalescer()
+    assert not changes.due(now=0.0) and changes.time_left(now=0.0) is None
+    changes.add("a", wait=1.0, now=0.0)
+    assert changes.time_left(now=0.25) == 0.75
+    changes.add("b", wait=1.0, now=0.5)  # pushes the deadline back
+    assert not changes.due(now=1.25)
+    assert changes.due(now=1.5)
+    assert changes.pop() == ("a", "b")
+    assert not changes.pending and not changes.due(now=2.0)
+
+
+def test_a_change_without_wait_flushes_the_pending_ones():
+    changes = ChangeCoalescer()
+    changes.add("a", wait=60.0, now=0.0)
+    assert not changes.due(now=1.0)
+    changes.add("b", wait=0.0, now=1.0)
+    assert changes.due(now=1.0)
+
+
+def test_nodes_are_popped_in_the_order_of_their_last_change():
+    changes = ChangeCoalescer()
+    for node in "abca":
+        changes.add(node, wait=0.0, now=0.0)
+    assert changes.pop() == ("b", "c", "a")
+    assert changes.pop() == ()
+    assert changes.stats == dict(changes=4, propagations=1, saved=3)
+
+
+PAGE = """
+from meshed.dag import DAG
+from dagapp.base import dag_app
+from dagapp.tests.test_debounce import computed
+from dagapp.utils import get_default_configs
+
+def b(a: float = 1.0):
+    computed.append(a)
+    return a + 1
+
+def d(c: float = 1.0):
+    return 10 * c
+
+def result(b, d):
+    return b + d
+
+dags = [DAG([b, d, result])]
+configs = get_default_configs(dags)
+configs[0]["debounce"] = dict(a=3600.0)  # changes of c are propagated right away
+dag_app(dags, configs=configs)
+"""
+
+
+class Log(list):
+    """A list whose items don't change the fingerprint of the functions using it"""
+
+    __fingerprint__ = 1
+
+
+computed = Log()  # the values of `a` the page computed `b` for
+
+
+def test_page_propagates_a_burst_of_changes_at_once():
+    from streamlit.testing.v1 import AppTest
+
+    from dagapp.utils import CHANGES_KEY
+
+    at = AppTest.from_string(PAGE, default_timeout=10).run()
+    computed.clear()
+    for value in (2.0, 3.0, 4.0):
+        at.number_input(key="a").set_value(value).run()
+    assert computed == []
+    assert at.number_input(key="result").value == 12.0
+    assert "Waiting for more changes..." in [c.value for c in at.caption]
+    at.number_input(key="c").set_value(2.0).run()
+    assert not at.exception
+    # b was computed for the last value of a only
+    assert computed == [4.0]
+    assert at.number_input(key="b").value == 5.0
+    assert at.number_input(key="result").value == 25.0
+    assert "Waiting for more changes..." not in [c.value for c in at.caption]
+    [changes] = at.session_state[CHANGES_KEY].values()
+    assert changes.stats == dict(changes=4, propagations=1, saved=3)
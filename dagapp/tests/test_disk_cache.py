@@ -0,0 +1,145 @@
+"""Tests of dagapp.disk_cache, and of pages persisting their results"""
+
+import threading
+
+import pytest
+
+from dagapp import disk_cache
+from dagapp.disk_cache import DiskResultStore
+
+
+class Clock:
+    """Stands for the time module in dagapp.disk_cache, telling the time it's set to"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(disk_cache, "time", clock)
+    return clock
+
+
+def mk_store(tmp_path, **kwargs):
+    return DiskResultStore(
+        str(tmp_path / "results.sqlite"), compact_interval=None, **kwargs
+    )
+
+
+def test_entries_expire_after_their_ttl(tmp_path, clock):
+    store = mk_store(tmp_path, ttl=100)
+    store.set("key", "value")
+    clock.now += 100
+    assert store.get("key") == "value"
+    clock.now += 1
+    assert store.get("key", None) is None
+    assert len(store) == 0
+    assert store.stats["hits"] == 1 and store.stats["misses"] == 1
+
+
+def test_compact_removes_expired_then_least_recently_used_entries(tmp_path, clock):
+    store = mk_store(tmp_path, ttl=100, max_entries=2)
+    for key in "abcd":
+        store.set(key, key)
+        clock.now += 10
+    store.get("b")  # more recently used than c and d
+    clock.now = 1000 + 100.5  # a expired
+    assert store.compact() == 2
+    assert [store.get(key, None) for key in "abcd"] == [None, "b", None, "d"]
+
+
+def test_compact_keeps_the_store_within_max_bytes(tmp_path, clock):
+    store = mk_store(tmp_path, max_bytes=3000, max_entry_bytes=2000)
+    for key in "abc":
+        store.set(key, bytes(1000))
+        clock.now += 1
+    assert store.compact() == 1
+    assert store.get("a", None) is None and len(store) == 2
+    assert store.stats["nbytes"] <= 3000
+
+
+def test_values_over_max_entry_bytes_are_not_stored(tmp_path):
+    store = mk_store(tmp_path, max_entry_bytes=100)
+    store.set("small", 1)
+    store.set("big", bytes(1000))
+    assert store.get("small") == 1 and store.get("big", None) is None
+
+
+def test_node_results_are_keyed_on_the_function_and_what_it_depends_on(tmp_path):
+    store = mk_store(tmp_path)
+    source = "RATE = {rate}\ndef vat(x):\n    return x * RATE\n"
+    results = []
+    for rate in (1.5, 2.0, 2.0):
+        namespace = {}
+        exec(source.format(rate=rate), namespace)
+        vat = namespace["vat"]
+        results.append(store.node_cache("vat", vat).call(vat, (10,), {}))
+    assert results == [15.0, 20.0, 20.0]
+    assert store.stats["hits"] == 1  # the third function is the second one's twin
+    # stores on the same file (e.g. after a restart) get the results too
+    assert mk_store(tmp_path).node_cache("vat", vat).call(vat, (10,), {}) == 20.0
+
+
+def test_functions_without_a_sound_fingerprint_are_not_persisted(tmp_path):
+    lock = threading.Lock()  # can't be identified across processes
+
+    def locked(x):
+        with lock:
+            return x
+
+    assert mk_store(tmp_path).node_cache("locked", locked) is None
+
+
+PAGE = """
+import threading
+from meshed.dag import DAG
+from dagapp.base import dag_app
+from dagapp.tests.test_disk_cache import calls
+from dagapp.utils import get_default_configs
+
+lock = threading.Lock()
+
+def b(a: float = 1.0):
+    calls.append(("b", a))
+    return a + 1
+
+def c(b):
+    calls.append(("c", b))
+    with lock:  # so c can't be persisted
+        return 2 * b
+
+dags = [DAG([b, c])]
+configs = get_default_configs(dags)
+configs[0].update(
+    persist_results=True, result_store=dict(path={path!r}, compact_interval=None)
+)
+dag_app(dags, configs=configs)
+"""
+
+
+class Log(list):
+    """A list whose items don't change the fingerprint of the functions using it"""
+
+    __fingerprint__ = 1
+
+
+calls = Log()  # the (node, argument) pairs the page computed
+
+
+def test_page_gets_results_computed_by_an_earlier_session(tmp_path):
+    from streamlit.testing.v1 import AppTest
+
+    page = PAGE.format(path=str(tmp_path / "results.sqlite"))
+    calls.clear()
+    for _ in range(2):  # a session, then one of a restarted app
+        at = AppTest.from_string(page, default_timeout=10).run()
+        at.number_input(key="a").set_value(3.0).run()
+        assert not at.exception
+        assert at.number_input(key="c").value == 8.0
+    assert calls.count(("b", 3.0)) == 1  # read from disk by the second session
+    assert calls.count(("c", 4.0)) == 2  # not persisted: computed by both
@@ -1,14 +1,51 @@
 """Utils"""
 
-import numpy as np
-import pandas as pd
-import streamlit as st
+from collections import ChainMap
 from collections.abc import Mapping, Iterable
-from meshed.itools import successors
-from lined import iterize
 
+import hashlib
+import importlib
 import inspect
-from inspect import Parameter
+import os
+import pickle
+import site
+import sys
+import sysconfig
+import tempfile
+import threading
+import time
+import weakref
+from functools import lru_cache, partial
+from itertools import count
+
+
+class LazyModule:
+    """
+    A stand-in for a module, importing it when one of its attributes is first used,
+    so that the parts of dagapp that don't display anything can be imported (in
+    worker processes, scripts, tests...) without the heavy UI dependencies.
+
+    >>> json = LazyModule('json')
+    >>> json.dumps([1, 2])
+    '[1, 2]'
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._name!r})"
+
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+st = LazyModule("streamlit")
 
 DFLT_VALS = {
     int: 0,
@@ -27,18 +64,24 @@ DFLT_ANNOT_ARGTYPE_MAP = {
     dict: "dict",
 }
 
+# the names of the streamlit functions displaying each arg type
 ARG_TYPE_WIDGET_MAP = {
-    "num": st.number_input,
-    "slider": st.slider,
-    "double_slider": st.expander,
-    "text": st.text_input,
-    "list": st.text_input,
-    "dict": st.expander,
+    "num": "number_input",
+    "slider": "slider",
+    "double_slider": "expander",
+    "text": "text_input",
+    "list": "text_input",
+    "dict": "expander",
 }
 
 
 # ------------------------------------ VECTORIZATION  ------------------------------------
 
+VEC_RESULTS_KEY = "_dagapp_vec_results"
+DFLT_PAGE_SIZE = 1_000  # rows of the pages of full data tables
+DFLT_PREVIEW_SIZE = 20  # values of the vectorized inputs shown as is
+DFLT_MIN_CHART_POINTS = 100  # shorter vectorized outputs are shown as tables
+
 
 def get_vec_input(node):
     """
@@ -52,36 +95,99 @@ def get_vec_input(node):
     )
 
 
-def get_args(dag, node, funcs):
+def get_args(dag, node, funcs, values=None):
     """
-    Returns the arguments for a vectorized FuncNode
+    Returns the arguments (ndarrays) for a vectorized FuncNode, taken from values
+    (a mapping of the root ranges and computed nodes) if given, and from the
+    session state otherwise
     """
     args = list()
     for arg in list(funcs[node].sig.names):
         if arg in dag.roots:
-            vec_input = get_vec_input(arg)
+            vec_input = get_vec_input(arg) if values is None else values[arg]
             if arg in funcs[node].sig.annotations:
                 arg_type = str(funcs[node].sig.annotations[arg])
                 if arg_type == "int":
-                    args.append(list(vec_input.astype(int)))
+                    args.append(vec_input.astype(int))
                 else:
-                    args.append(list(vec_input))
+                    args.append(vec_input)
             else:
-                args.append(list(vec_input))
+                args.append(vec_input)
         else:
-            args.append(st.session_state[arg])
+            args.append((st.session_state if values is None else values)[arg])
     return args
 
 
-def display_vec_node(node, funcs, args):
+def compute_vec_node(node, funcs, args, mode="auto", parallel=None, profiler=None):
+    """
+    Computes the values of a non-root-node for vectorized input.
+
+    With the default "auto" mode, the node's function is called once on the whole
+    arrays if it supports numpy broadcasting, and on each element otherwise (see
+    `dagapp.vectorize.vectorized_call`). The "parallel" mode uses the executor of
+    the `parallel` spec (see `get_executor`). The computation is timed by
+    `profiler` if one is given (see `dagapp.profiling.NodeProfiler`).
+    """
+    from dagapp.vectorize import vectorized_call
+
+    executor = get_executor(parallel) if mode == "parallel" else None
+    kwargs = dict(key=funcs[node], executor=executor)
+    if profiler is not None:
+        args = (funcs[node].func, args, mode)
+        return profiler.call(node, vectorized_call, args, kwargs)
+    return vectorized_call(funcs[node].func, args, mode, **kwargs)
+
+
+def display_vec_node(node, values, x=None, max_points=None):
     """
-    Displays a non-root-node for vectorized input
+    Displays the values of a non-root-node for vectorized input: as a table if
+    there are fewer than `DFLT_MIN_CHART_POINTS` (building a chart costs more), and
+    otherwise as a line chart, downsampled (see `dagapp.charts.downsample`) to at
+    most `max_points` points, the full data being shown on demand (see
+    `display_data`).
     """
-    func = iterize(funcs[node].func)
-    val = list(func(*args))
-    st.session_state[node] = val
+    from dagapp.charts import DFLT_MAX_CHART_POINTS, downsample
+
+    values = np.asarray(values)
     st.write(f"{node}: ")
-    st.write(pd.DataFrame(st.session_state[node]))
+    if values.ndim != 1 or values.dtype.kind not in "biuf":
+        display_data(node, pd.DataFrame(values))
+        return
+    index = None if x is None else pd.Index(x[1], name=x[0])
+    frame = pd.DataFrame({node: values}, index=index)
+    if len(frame) < DFLT_MIN_CHART_POINTS:
+        st.write(frame)
+        return
+    chart = downsample(frame, max_points or DFLT_MAX_CHART_POINTS)
+    st.line_chart(chart)
+    if len(chart) < len(frame):
+        st.caption(f"{len(chart)} of {len(frame)} points shown")
+    display_data(node, frame)
+
+
+def display_data(key, frame, page_size=DFLT_PAGE_SIZE):
+    """
+    Displays a table on demand, a page of `page_size` rows at a time, with a
+    button to download it as a csv
+    """
+    if not st.checkbox(f"Show all {len(frame)} rows", key=f"{key}_data"):
+        return
+    n_pages = max(1, -(-len(frame) // page_size))
+    page = 1
+    if n_pages > 1:
+        page = st.number_input(
+            f"page (of {n_pages})", 1, n_pages, value=1, key=f"{key}_page"
+        )
+    from dagapp.charts import page_of
+
+    st.dataframe(page_of(frame, int(page), page_size))
+    st.download_button(
+        "Download csv",
+        data=frame.to_csv().encode(),
+        file_name=f"{key}.csv",
+        mime="text/csv",
+        key=f"{key}_download",
+    )
 
 
 def mk_double_slider(node, st_kwargs, col):
@@ -101,94 +207,866 @@ def mk_double_slider(node, st_kwargs, col):
             st.number_input(
                 "num values", min_value=1, value=5, key=f"{node}_num", **st_kwargs
             )
-            st.write(pd.DataFrame(get_vec_input(node)).transpose())
+            values = get_vec_input(node)
+            if len(values) <= DFLT_PREVIEW_SIZE:
+                st.write(pd.DataFrame(values).transpose())
+            else:
+                st.caption(f"{len(values)} values from {values[0]:g} to {values[-1]:g}")
+
+
+def vector_factory(
+    dag,
+    nodes,
+    funcs,
+    col,
+    vec_modes=None,
+    sweep="zip",
+    parallel=None,
+    max_points=None,
+    background=None,
+    profile=None,
+):
+    """
+    Displays the root nodes of a vectorized DAG as double sliders, and the
+    results of the last update as charts of at most `max_points` points.
+
+    With `sweep="zip"` the i-th values of the roots' ranges are evaluated together
+    (so ranges must have the same length), with `sweep="grid"` all their
+    combinations are (see `update_grid_nodes`).
+    """
+    sync_background(dag)
+    if sweep == "grid":
+        on_change = update_grid_nodes
+        args = (dag, vec_modes, None, parallel, background, profile)
+    else:
+        on_change = update_vec_nodes
+        args = (dag, nodes, funcs, vec_modes, parallel, background, profile)
+    with col:
+        for node in dag.sig.names:
+            st_kwargs = dict(on_change=on_change, args=args)
+            mk_double_slider(node, st_kwargs, col)
+        if sweep != "grid":
+            warn_unzipped_ranges(dag)
+        display_vec_results(dag, max_points)
+        display_background_status(dag, background)
+
+
+def warn_unzipped_ranges(dag):
+    """
+    Warns that a zip sweep stops at the first node combining roots whose ranges
+    have different numbers of values, naming the shortest range
+    """
+    nums = {root: int(st.session_state[f"{root}_num"]) for root in dag.sig.names}
+    if len(set(nums.values())) > 1:
+        shortest = min(nums, key=nums.get)
+        st.warning(
+            f"The ranges of {', '.join(nums)} don't have the same number of values "
+            f"(`{shortest}` has the fewest, {nums[shortest]}), so the nodes from the "
+            "first one combining them on aren't computed: give them the same number "
+            'of values, or use `sweep="grid"` to evaluate all their combinations.'
+        )
+
+
+def vec_results_key(dag):
+    """
+    Returns the session state key of the results of the last update of the
+    vectorized DAG factory of dag
+    """
+    return f"{VEC_RESULTS_KEY}_{dag_fingerprint(dag)}"
+
+
+def update_vec_nodes(
+    dag, nodes, funcs, vec_modes=None, parallel=None, background=None, profile=None
+):
+    """
+    Update non root-nodes for vectorized DAG factory.
+
+    `vec_modes` maps node names to the `dagapp.vectorize.VEC_MODES` their
+    functions should be called with ("auto" for the nodes it doesn't mention),
+    and `parallel` specifies the executor of the "parallel" ones. With
+    `background`, they are computed on a worker thread (see `run_job`), and with
+    `profile`, their computations are timed (see `display_profile`).
+    """
+    profiler = get_profiler(dag) if profile else None
+    ranges = get_grid_ranges(dag)
+    job = partial(_vec_job, dag, nodes, funcs, ranges, vec_modes, parallel, profiler)
+    run_job(dag, job, [vec_results_key(dag)], background)
+
+
+def _vec_job(dag, nodes, funcs, ranges, vec_modes, parallel, profiler, check):
+    vec_modes = vec_modes or {}
+    values, results = dict(ranges), dict()
+    for node in [node for node in nodes if node not in dag.roots]:
+        check()
+        args = get_args(dag, node, funcs, values)
+        if len(set(map(len, [arg for arg in args]))) == 1:
+            mode = vec_modes.get(node, "auto")
+            values[node] = compute_vec_node(node, funcs, args, mode, parallel, profiler)
+            results[node] = values[node]
+        else:
+            break
+    roots = dag.sig.names
+    x = (roots[0], ranges[roots[0]]) if len(roots) == 1 else None
+    return {**results, vec_results_key(dag): dict(values=results, x=x)}
+
+
+def get_grid_ranges(dag):
+    """
+    Returns the ranges set (with `mk_double_slider`) for the roots of dag, as arrays
+    """
+    return {root: get_vec_input(root) for root in dag.sig.names}
+
+
+def get_executor(parallel=None):
+    """
+    Returns the (process-wide) `dagapp.parallel.SweepExecutor` of a `parallel` spec:
+    `None` or `True` for the default one, or a dict of its arguments (`max_workers`,
+    `chunk_size` and `mp_context`)
+    """
+    from dagapp.parallel import get_sweep_executor
+
+    return get_sweep_executor(**(parallel if isinstance(parallel, dict) else {}))
+
+
+def update_grid_nodes(
+    dag, vec_modes=None, chunk_size=None, parallel=None, background=None, profile=None
+):
+    """
+    Evaluates the non-root nodes of a vectorized DAG factory over all the
+    combinations of the root ranges (the table of results is displayed by
+    `display_grid_results`), on a worker thread with `background`, timing the
+    computations with `profile`
+    """
+    executor = None
+    if "parallel" in (vec_modes or {}).values():
+        executor = get_executor(parallel)
+    profiler = get_profiler(dag) if profile else None
+    ranges = get_grid_ranges(dag)
+    job = partial(_grid_job, dag, ranges, vec_modes, chunk_size, executor, profiler)
+    run_job(dag, job, [vec_results_key(dag)], background)
+
+
+def _grid_job(dag, ranges, vec_modes, chunk_size, executor, profiler, check):
+    from dagapp.index import dag_index
+    from dagapp.vectorize import grid_sweep
+
+    table = grid_sweep(
+        dag_index(dag),
+        ranges,
+        modes=vec_modes,
+        chunk_size=chunk_size,
+        executor=executor,
+        check=check,
+        profiler=profiler,
+    )
+    shape = tuple(len(values) for values in ranges.values())
+    return {vec_results_key(dag): dict(grid=table, shape=shape)}
+
+
+def display_vec_results(dag, max_points=None):
+    """
+    Displays the results of the last update of the vectorized DAG factory of dag
+    """
+    results = st.session_state.get(vec_results_key(dag), {})
+    if vec_results_key(dag) in get_stale(dag):
+        st.caption("Recomputing, the results below are stale")
+    if "grid" in results:
+        display_grid_results(results["grid"], results["shape"], max_points)
+    for node, values in results.get("values", {}).items():
+        display_vec_node(node, values, results.get("x"), max_points)
+
+
+def display_grid_results(table, shape, max_points=None):
+    """
+    Displays the table of a grid sweep as a line chart when one root is swept, and
+    as a heatmap when two are, downsampled (see `dagapp.charts`) to at most
+    `max_points` points or cells; the full table is shown on demand.
+    """
+    from dagapp.charts import DFLT_MAX_CHART_POINTS, downsample, heatmap_frame
+
+    max_points = max_points or DFLT_MAX_CHART_POINTS
+    st.write(f"{len(table)} combinations: ")
+    numeric = [c for c in table.columns if pd.api.types.is_numeric_dtype(table[c])]
+    if len(shape) == 1 and numeric:
+        chart = downsample(table[numeric], max_points)
+        st.line_chart(chart)
+        if len(chart) < len(table):
+            st.caption(f"{len(chart)} of {len(table)} points shown")
+    elif len(shape) == 2 and numeric:
+        import altair as alt
+
+        node = st.selectbox("heatmap of", numeric, key="grid_heatmap")
+        side = max(1, int(max_points**0.5))
+        heatmap = heatmap_frame(table, node, shape, (side, side))
+        x, y = table.index.names
+        axis = alt.Axis(format=".4g", labelOverlap=True)
+        st.altair_chart(
+            alt.Chart(heatmap)
+            .mark_rect()
+            .encode(
+                x=alt.X(f"{x}:O", axis=axis),
+                y=alt.Y(f"{y}:O", axis=axis, sort="descending"),
+                color=alt.Color(f"{node}:Q"),
+                tooltip=[x, y, node],
+            )
+        )
+        if len(heatmap) < len(table):
+            st.caption(f"{len(heatmap)} of {len(table)} cells shown (block means)")
+    display_data("grid", table)
+
 
+# ----------------------------------- BATCH SCENARIOS -----------------------------------
 
-def vector_factory(dag, nodes, funcs, col):
+BATCH_RESULTS_KEY = "_dagapp_batch_results"
+
+
+def batch_results_key(dag):
     """
-    Displays the root nodes of a vectorized DAG as double sliders
+    Returns the session state key of the results of the last evaluation of the
+    scenarios of the batch factory of dag
     """
+    return f"{BATCH_RESULTS_KEY}_{dag_fingerprint(dag)}"
+
+
+def default_scenarios(dag, fixed=None):
+    """
+    Returns a table of a single scenario: the default values of the roots of dag
+    that aren't fixed
+    """
+    fixed = fixed or {}
+    root_values = get_root_values(dag)
+    return pd.DataFrame(
+        {root: [value] for root, value in root_values.items() if root not in fixed}
+    )
+
+
+def batch_factory(
+    dag,
+    col,
+    fixed=None,
+    vec_modes=None,
+    parallel=None,
+    background=None,
+    profile=None,
+):
+    """
+    Displays an editable table of scenarios (rows of values of the roots of dag,
+    that can be pasted from a spreadsheet), and the table of the values of all the
+    nodes for each of them, recomputed when the scenarios change (see
+    `update_batch_results`).
+    """
+    sync_background(dag)
+    key = batch_results_key(dag)
     with col:
-        for node in dag.sig.names:
-            st_kwargs = dict(
-                on_change=update_vec_nodes,
-                args=(dag, nodes, funcs, col),
+        st.caption(
+            "One scenario per row: edit the cells, add rows, or paste them from a "
+            "spreadsheet"
+        )
+        scenarios = st.data_editor(
+            default_scenarios(dag, fixed), num_rows="dynamic", key=f"{key}_editor"
+        )
+        scenarios = scenarios.dropna(how="all")
+        submitted = st.session_state.get(f"{key}_submitted")
+        if submitted is None or not submitted.equals(scenarios):
+            update_batch_results(
+                dag, scenarios, fixed, vec_modes, parallel, background, profile
             )
-            mk_double_slider(node, st_kwargs, col)
+            st.session_state[f"{key}_submitted"] = scenarios.copy()
+        display_batch_results(dag)
+        display_background_status(dag, background)
+
+
+def update_batch_results(
+    dag,
+    scenarios,
+    fixed=None,
+    vec_modes=None,
+    parallel=None,
+    background=None,
+    profile=None,
+):
+    """
+    Evaluates dag for each row of the scenarios table (see
+    `dagapp.batch.batch_evaluate`), on a worker thread with `background`, timing
+    the computations with `profile`
+    """
+    executor = None
+    if "parallel" in (vec_modes or {}).values():
+        executor = get_executor(parallel)
+    profiler = get_profiler(dag) if profile else None
+    job = partial(_batch_job, dag, scenarios, fixed, vec_modes, executor, profiler)
+    run_job(dag, job, [batch_results_key(dag)], background)
+
+
+def _batch_job(dag, scenarios, fixed, vec_modes, executor, profiler, check):
+    from dagapp.batch import batch_evaluate
+
+    results = batch_evaluate(
+        dag,
+        scenarios,
+        fixed=fixed,
+        modes=vec_modes,
+        executor=executor,
+        check=check,
+        profiler=profiler,
+    )
+    return {batch_results_key(dag): results}
+
+
+def display_batch_results(dag, page_size=DFLT_PAGE_SIZE):
+    """
+    Displays the table of the results of the last evaluation of the scenarios of
+    the batch factory of dag (its first `page_size` rows, the others on demand)
+    """
+    results = st.session_state.get(batch_results_key(dag))
+    if results is None:
+        return
+    if batch_results_key(dag) in get_stale(dag):
+        st.caption("Recomputing, the results below are stale")
+    st.write(f"{len(results)} scenarios: ")
+    st.dataframe(results.head(page_size))
+    display_data("batch", results, page_size)
+
+
+UPLOAD_RESULTS_KEY = "_dagapp_upload_results"
+SESSION_DIR_KEY = "_dagapp_session_dir"
+FILE_MIME_TYPES = dict(csv="text/csv", parquet="application/vnd.apache.parquet")
+
+
+def session_dir():
+    """
+    Returns the path of the current session's temporary directory, which is
+    deleted, with the files in it, when the session's state is (or at exit)
+    """
+    directory = st.session_state.get(SESSION_DIR_KEY)
+    if directory is None:
+        directory = tempfile.TemporaryDirectory(prefix="dagapp_")
+        st.session_state[SESSION_DIR_KEY] = directory
+    return directory.name
 
 
-def update_vec_nodes(dag, nodes, funcs, col):
+def upload_results_key(dag):
     """
-    Update non root-nodes for vectorized DAG factory
+    Returns the session state key of the output file of the last evaluation of an
+    uploaded file of scenarios of dag
     """
+    return f"{UPLOAD_RESULTS_KEY}_{dag_fingerprint(dag)}"
+
+
+def upload_factory(
+    dag,
+    col,
+    fixed=None,
+    chunk_size=None,
+    vec_modes=None,
+    parallel=None,
+    profile=None,
+):
+    """
+    Displays an uploader of csv or parquet files of scenarios (one per row, in
+    columns named after the roots of dag), evaluated chunk by chunk when asked to
+    (see `evaluate_upload`), and a button to download the results
+    """
+    from dagapp.batch import FILE_FORMATS, file_format
+
+    key = upload_results_key(dag)
     with col:
-        for node in [node for node in nodes if node not in dag.roots]:
-            args = get_args(dag, node, funcs)
-            if len(set(map(len, [arg for arg in args]))) == 1:
-                display_vec_node(node, funcs, args)
-            else:
-                break
+        uploaded = st.file_uploader(
+            "scenarios (csv or parquet)",
+            type=["csv", "parquet", "pq"],
+            key=f"{key}_file",
+        )
+        if uploaded is not None:
+            output_format = st.selectbox(
+                "output format",
+                FILE_FORMATS,
+                index=FILE_FORMATS.index(file_format(uploaded.name)),
+                key=f"{key}_format",
+            )
+            if st.button("Evaluate", key=f"{key}_evaluate"):
+                evaluate_upload(
+                    dag,
+                    uploaded,
+                    output_format,
+                    fixed,
+                    chunk_size,
+                    vec_modes,
+                    parallel,
+                    profile,
+                )
+        display_upload_results(dag)
+
+
+def evaluate_upload(
+    dag,
+    uploaded,
+    output_format=None,
+    fixed=None,
+    chunk_size=None,
+    vec_modes=None,
+    parallel=None,
+    profile=None,
+):
+    """
+    Evaluates dag on the rows of an uploaded file, chunk by chunk (see
+    `dagapp.batch.evaluate_file`), writing the results to a file of the session's
+    temporary directory (see `session_dir`) as they are computed, replacing those
+    of the previous evaluation, and showing the progress and the rows evaluated
+    per second
+    """
+    from dagapp.batch import count_rows, evaluate_file, file_format
+
+    executor = None
+    if "parallel" in (vec_modes or {}).values():
+        executor = get_executor(parallel)
+    profiler = get_profiler(dag) if profile else None
+    key = upload_results_key(dag)
+    input_format = file_format(uploaded.name)
+    output_format = output_format or input_format
+    total = count_rows(uploaded, input_format)
+    uploaded.seek(0)
+    bar = st.progress(0.0, text="Evaluating...")
+
+    def progress(rows, seconds):
+        if total:
+            done = rows / total
+        else:  # the position in the csv file (which is read ahead a little)
+            done = uploaded.tell() / max(uploaded.size, 1)
+        rate = rows / max(seconds, 1e-9)
+        bar.progress(min(done, 1.0), text=f"{rows:,} rows, {rate:,.0f} rows/s")
+
+    previous = st.session_state.pop(key, None)
+    if previous is not None and os.path.exists(previous["path"]):
+        os.remove(previous["path"])
+    fd, path = tempfile.mkstemp(suffix=f".{output_format}", dir=session_dir())
+    os.close(fd)
+    start = time.perf_counter()
+    rows = evaluate_file(
+        dag,
+        uploaded,
+        path,
+        format=input_format,
+        output_format=output_format,
+        chunk_size=chunk_size,
+        progress=progress,
+        fixed=fixed,
+        modes=vec_modes,
+        executor=executor,
+        profiler=profiler,
+    )
+    stem = os.path.splitext(uploaded.name)[0]
+    st.session_state[key] = dict(
+        path=path,
+        file_name=f"{stem}_results.{output_format}",
+        mime=FILE_MIME_TYPES[output_format],
+        rows=rows,
+        seconds=time.perf_counter() - start,
+    )
 
 
-# ------------------------------------ STATIC NODES ------------------------------------
+def display_upload_results(dag):
+    """
+    Displays a button to download the results of the last evaluation of an
+    uploaded file of scenarios of dag
+    """
+    results = st.session_state.get(upload_results_key(dag))
+    if results is None or not os.path.exists(results["path"]):
+        return
+    rate = results["rows"] / max(results["seconds"], 1e-9)
+    st.caption(
+        f"{results['rows']:,} rows evaluated in {results['seconds']:.1f}s "
+        f"({rate:,.0f} rows/s)"
+    )
+    with open(results["path"], "rb") as file:
+        st.download_button(
+            "Download results",
+            data=file,
+            file_name=results["file_name"],
+            mime=results["mime"],
+            key=f"{upload_results_key(dag)}_download",
+        )
+
+
+# ------------------------------------ SENSITIVITY ------------------------------------
 
+SENSITIVITY_KEY = "_dagapp_sensitivity"
 
-def get_kwargs(node, funcs):
+
+def sensitivity_key(dag):
     """
-    Get keyword arguments for a FuncNode
+    Returns the session state key of the `dagapp.sensitivity.sensitivity_table` of
+    dag last computed by its sensitivity factory
     """
-    kwargs = dict()
-    for arg in list(funcs[node].sig.names):
-        if arg in funcs[node].sig.annotations:
-            arg_type = str(funcs[node].sig.annotations[arg])
-        else:
-            arg_type = str(float)
-        if "typing.Iterable" in arg_type:
-            kwargs[arg] = [int(num) for num in st.session_state[arg].split(",")]
-        elif "typing.Mapping" in arg_type:
-            kwargs[arg] = dict(
-                tp=st.session_state[f"{arg}_tp"],
-                fn=st.session_state[f"{arg}_fn"],
-                fp=st.session_state[f"{arg}_fp"],
-                tn=st.session_state[f"{arg}_tn"],
+    return f"{SENSITIVITY_KEY}_{dag_fingerprint(dag)}"
+
+
+def sensitivity_factory(
+    dag,
+    col,
+    base=None,
+    roots=None,
+    outputs=None,
+    delta=None,
+    caching=None,
+    background=None,
+):
+    """
+    Displays the perturbation applied to the roots of dag, the base values of those
+    of the perturbed roots that are numbers (in widgets keyed by root name, as on
+    the other pages, so a session's values carry over), and how much each root
+    moves the outputs (see `display_sensitivity`), recomputed when the perturbation
+    or the base values change (see `update_sensitivity`)
+    """
+    from dagapp.sensitivity import DFLT_DELTA, is_number
+
+    sync_background(dag)
+    key = sensitivity_key(dag)
+    base = dict(base or {})
+    with col:
+        with st.expander("base values"):
+            for root in roots or base:
+                if is_number(base.get(root)):
+                    base[root] = st.number_input(root, value=base[root], key=root)
+        delta = st.number_input(
+            "perturbation (±)",
+            min_value=0.0,
+            value=float(delta or DFLT_DELTA),
+            step=0.01,
+            format="%g",
+            key=f"{key}_delta",
+        )
+        relative = st.checkbox(
+            "relative to the base values", value=True, key=f"{key}_relative"
+        )
+        request = (delta, relative, freeze(base))
+        if st.session_state.get(f"{key}_request") != request:
+            update_sensitivity(
+                dag, base, roots, outputs, delta, relative, caching, background
             )
-        else:
-            kwargs[arg] = st.session_state[arg]
-    return kwargs
+            st.session_state[f"{key}_request"] = request
+        display_sensitivity(dag)
+        display_background_status(dag, background)
+
+
+def update_sensitivity(
+    dag,
+    base=None,
+    roots=None,
+    outputs=None,
+    delta=None,
+    relative=True,
+    caching=None,
+    background=None,
+):
+    """
+    Computes the sensitivity of the outputs of dag to each of its roots (see
+    `dagapp.sensitivity.sensitivity_table`), through the caches of the nodes (see
+    `get_node_caches`), on a worker thread with `background`
+    """
+    caches = get_node_caches(dag, caching)
+    job = partial(_sensitivity_job, dag, base, roots, outputs, delta, relative, caches)
+    run_job(dag, job, [sensitivity_key(dag)], background)
+
+
+def _sensitivity_job(dag, base, roots, outputs, delta, relative, caches, check):
+    from dagapp.sensitivity import DFLT_DELTA, sensitivity_table
+
+    table = sensitivity_table(
+        dag,
+        outputs,
+        base=base,
+        roots=roots,
+        delta=DFLT_DELTA if delta is None else delta,
+        relative=relative,
+        caches=caches,
+        check=check,
+    )
+    return {sensitivity_key(dag): table}
+
+
+def display_sensitivity(dag):
+    """
+    Displays the last computed sensitivity of the outputs of dag: the tornado chart
+    of an output, and the table of the elasticities of all of them
+    """
+    key = sensitivity_key(dag)
+    table = st.session_state.get(key)
+    if table is None:
+        return
+    if key in get_stale(dag):
+        st.caption("Recomputing, the results below are stale")
+    outputs = list(table.index.get_level_values("output").unique())
+    if not outputs:
+        st.caption("No numeric outputs to analyse")
+        return
+    output = st.selectbox("output", outputs, key=f"{key}_output")
+    display_tornado(table, output)
+    st.write(
+        "elasticities (relative change of an output per relative change of a root):"
+    )
+    st.dataframe(table["elasticity"].unstack("output"))
+    display_data("sensitivity", table.reset_index())
+
+
+def display_tornado(table, output):
+    """
+    Displays the tornado chart of output (given a
+    `dagapp.sensitivity.sensitivity_table`): the changes of output when each root
+    is at its low and high values, the roots with the largest swings on top
+    """
+    import altair as alt
+
+    from dagapp.sensitivity import tornado_frame
+
+    order = list(table.loc[output].index)
+    st.altair_chart(
+        alt.Chart(tornado_frame(table, output))
+        .mark_bar(opacity=0.8)
+        .encode(
+            x=alt.X("change:Q", stack=None, title=f"change of {output}"),
+            y=alt.Y("root:N", sort=order, title=None),
+            color=alt.Color("input:N", title=None),
+            tooltip=["root", "input", "change"],
+        )
+    )
+
+
+# ------------------------------------ GOAL SEEK ------------------------------------
 
+GOAL_SEEK_KEY = "_dagapp_goal_seek"
 
-def update_static_nodes(dag, nodes, funcs, col):
+
+def goal_seek_key(dag):
+    """
+    Returns the session state key of the result of the last goal seek of dag
+    """
+    return f"{GOAL_SEEK_KEY}_{dag_fingerprint(dag)}"
+
+
+def goal_seek_factory(
+    dag,
+    col,
+    base=None,
+    roots=None,
+    outputs=None,
+    caching=None,
+    background=None,
+):
     """
-    Updates the non-root nodes for a static DAG factory
+    Displays the base values of the roots of dag that can be solved for (in
+    widgets keyed by root name, as on the other pages, so a session's values carry
+    over), the choice of an output, of a target value for it and of the root to
+    solve for, and the value of the root getting the output to the target when
+    asked (see `update_goal_seek`), the other roots keeping their base values
+
+    :param base: The values of all the nodes for the default values of the roots
+    :param roots: The roots that can be solved for (all of them by default), of
+        which only the ones with numeric base values are proposed
+    :param outputs: The outputs that can be targeted (the numeric ones by default)
     """
+    from dagapp.sensitivity import is_number, numeric_values
+
+    sync_background(dag)
+    key = goal_seek_key(dag)
+    base = dict(base or {})
+    current = numeric_values(base, [node for node in base if node not in dag.roots])
+    outputs = list(current) if outputs is None else list(outputs)
+    roots = [root for root in roots or dag.roots if is_number(base.get(root))]
     with col:
-        for node in [node for node in nodes if node not in dag.roots]:
-            kwargs = get_kwargs(node, funcs)
-            val = funcs[node].func(**kwargs)
-            if isinstance(val, dict):
-                for key in val.keys():
-                    st.session_state[f"{node}_{key}"] = val[key]
-                with st.expander(node):
-                    for key in val.keys():
-                        st.write(f"{key}: {st.session_state[f'{node}_{key}']}")
-            else:
-                st.session_state[node] = val
-                st.write(f"{node}: {st.session_state[node]}")
+        with st.expander("base values"):
+            for root in roots:
+                base[root] = st.number_input(root, value=base[root], key=root)
+        output = st.selectbox("output", outputs, key=f"{key}_output")
+        target = st.number_input(
+            f"target {output}",
+            value=float(current.get(output, 0.0)),
+            key=f"{key}_target_{output}",
+        )
+        root = st.selectbox("by changing", roots, key=f"{key}_root")
+        if st.button("Solve", key=f"{key}_solve"):
+            update_goal_seek(dag, output, target, root, base, caching, background)
+        display_goal_seek(dag)
+        display_background_status(dag, background)
+
+
+def update_goal_seek(
+    dag, output, target, root, base=None, caching=None, background=None
+):
+    """
+    Solves for the value of root getting output to target (see
+    `dagapp.goal_seek.goal_seek`), through the caches of the nodes (see
+    `get_node_caches`), on a worker thread with `background`
+    """
+    roots = {node: value for node, value in (base or {}).items() if node in dag.roots}
+    caches = get_node_caches(dag, caching)
+    job = partial(_goal_seek_job, dag, output, target, root, roots, caches)
+    run_job(dag, job, [goal_seek_key(dag)], background)
+
+
+def _goal_seek_job(dag, output, target, root, base, caches, check):
+    from dagapp.goal_seek import GoalSeekError, goal_seek
+
+    try:
+        result = goal_seek(
+            dag, output, target, root, base=base, caches=caches, check=check
+        )
+    except (GoalSeekError, ValueError) as error:
+        result = dict(root=root, output=output, target=target, error=str(error))
+    return {goal_seek_key(dag): result}
+
+
+def display_goal_seek(dag):
+    """
+    Displays the result of the last goal seek of dag: the solution, the number of
+    iterations and the time it took
+    """
+    key = goal_seek_key(dag)
+    result = st.session_state.get(key)
+    if result is None:
+        return
+    if key in get_stale(dag):
+        st.caption("Solving, the result below is stale")
+    if "solution" not in result:
+        st.warning(f"No {result['root']} found: {result['error']}")
+        return
+    message = f"{result['root']} = {result['solution']:g} gives {result['output']} = "
+    message += f"{result['value']:g} (target {result['target']:g})"
+    if result["converged"]:
+        st.success(message)
+    else:
+        reason = result.get("message")
+        st.warning(f"{message}, not converged" + (f": {reason}" if reason else ""))
+    st.caption(
+        f"{result['iterations']} iterations ({result['evaluations']} evaluations) "
+        f"in {result['seconds'] * 1e3:.1f} ms, from the bracket "
+        f"[{result['bracket'][0]:g}, {result['bracket'][1]:g}]"
+    )
+
+
+# ------------------------------------ STATIC NODES ------------------------------------
 
 
-def static_factory(dag, nodes, funcs, values, arg_types, ranges, col):
+def get_arg_value(arg, func_node, values=None):
+    """
+    Get the value of an argument of a FuncNode from values if given, and from the
+    session state otherwise, converting the widget values of the (comma separated)
+    `Iterable` and (confusion matrix) `Mapping` arguments
     """
-    Displays the root nodes of a dag
+    if values is None:
+        values = st.session_state
+    if arg in func_node.sig.annotations:
+        arg_type = str(func_node.sig.annotations[arg])
+    else:
+        arg_type = str(float)
+    if "typing.Iterable" in arg_type:
+        return [int(num) for num in values[arg].split(",")]
+    elif "typing.Mapping" in arg_type:
+        return dict(
+            tp=values[f"{arg}_tp"],
+            fn=values[f"{arg}_fn"],
+            fp=values[f"{arg}_fp"],
+            tn=values[f"{arg}_tn"],
+        )
+    return values[arg]
+
+
+def get_kwargs(node, funcs, values=None):
+    """
+    Get keyword arguments for a FuncNode, from values if given, and from the
+    session state otherwise
+    """
+    return {
+        arg: get_arg_value(arg, funcs[node], values) for arg in funcs[node].sig.names
+    }
+
+
+def get_root_inputs(dag, funcs, values=None, skip=()):
+    """
+    Get the values of the root nodes of dag (but the ones in skip) from values if
+    given, and from the session state otherwise (see `get_arg_value`)
+    """
+    inputs = dict()
+    for func_node in funcs.values():
+        for arg in func_node.sig.names:
+            if arg in dag.roots and arg not in inputs and arg not in skip:
+                inputs[arg] = get_arg_value(arg, func_node, values)
+    return inputs
+
+
+def update_static_nodes(dag, nodes, funcs, caching=None, background=None):
+    """
+    Updates the non-root nodes for a static DAG factory, on a worker thread with
+    `background` (see `run_job`)
+    """
+    constants = get_constants(dag, caching)
+    inputs = get_root_inputs(dag, funcs, skip=constants)
+    session = get_dag_session(dag, caching, ChainMap(inputs, st.session_state))
+    job = partial(_static_job, session)
+    run_job(dag, job, [node for node in nodes if node not in dag.roots], background)
+
+
+def _static_job(session, check):
+    updates = _evaluation_job(session, check, reload=True)
+    for node, val in list(updates.items()):
+        if isinstance(val, dict):
+            for key in val.keys():
+                updates[f"{node}_{key}"] = val[key]
+    return updates
+
+
+def display_static_nodes(dag, nodes, constants=None):
+    """
+    Displays the (last computed, or constant) values of the non-root nodes of a
+    static DAG factory
+    """
+    stale = get_stale(dag) | get_late(dag)
+    constants = constants or {}
+    for node in [node for node in nodes if node not in dag.roots]:
+        if node in constants:
+            val = constants[node]
+        elif node in st.session_state:
+            val = st.session_state[node]
+        else:
+            continue
+        label = f"{node} (stale)" if node in stale else node
+        if isinstance(val, dict):
+            with st.expander(label):
+                for key in val.keys():
+                    st.write(f"{key}: {val[key]}")
+        else:
+            st.write(f"{label}: {val}")
+
+
+def static_factory(
+    dag,
+    nodes,
+    funcs,
+    values,
+    arg_types,
+    ranges,
+    col,
+    caching=None,
+    background=None,
+):
     """
+    Displays the root nodes of a dag, and the values of its other nodes
+    """
+    sync_background(dag)
+    constants = get_constants(dag, caching)
     with col:
         for node in dag.sig.names:
+            if node in constants:
+                display_constant(node, constants[node])
+                continue
             st_kwargs = dict(
                 value=values[node],
                 on_change=update_static_nodes,
-                args=(dag, nodes, funcs, col),
+                args=(dag, nodes, funcs, caching, background),
                 key=node,
             )
             display_node(node, arg_types, ranges, values, st_kwargs)
+        display_static_nodes(dag, nodes, constants)
+        display_background_status(dag, background)
 
 
 # ------------------------------------ INTERMEDIATE NODES ------------------------------------
@@ -200,7 +1078,7 @@ def display_node(node, arg_types, ranges, values, st_kwargs):
     """
     if node in arg_types:
         if arg_types[node] == "dict":
-            with ARG_TYPE_WIDGET_MAP["dict"](node):
+            with getattr(st, ARG_TYPE_WIDGET_MAP["dict"])(node):
                 for condition in values[node].keys():
                     st_kwargs["value"] = values[node][condition]
                     st_kwargs["key"] = f"{node}_{condition}"
@@ -221,89 +1099,333 @@ def display_node(node, arg_types, ranges, values, st_kwargs):
                 args=st_kwargs.get("args"),
             )
         else:
-            widget = ARG_TYPE_WIDGET_MAP[arg_types[node]]
+            widget = getattr(st, ARG_TYPE_WIDGET_MAP[arg_types[node]])
             widget(node, **st_kwargs)
     else:
         st.number_input(node, **st_kwargs)
 
 
-def display_factory(dag, nodes, funcs, values, arg_types, ranges, col):
+def display_factory(
+    dag,
+    nodes,
+    funcs,
+    values,
+    arg_types,
+    ranges,
+    col,
+    caching=None,
+    background=None,
+    debounce=None,
+):
     """
-    Display the nodes of a dag with number of slider inputs
+    Display the nodes of a dag with number of slider inputs.
+
+    With `debounce` (a number of seconds, or a dict of them for some nodes), the
+    changes of the nodes are propagated together once no change came for that
+    long (see `queue_change`).
     """
+    sync_background(dag)
+    if debounce:
+        flush_changes(dag, funcs, caching, background)
+    stale, late = get_stale(dag), get_late(dag)
+    constants = get_constants(dag, caching)
     with col:
         for node in nodes:
+            if node in constants:
+                display_constant(node, constants[node])
+                continue
+            if debounce:
+                on_change = queue_change
+                args = (dag, node, funcs, caching, background, debounce)
+            else:
+                on_change, args = update_nodes, (dag, node, funcs, caching, background)
             st_kwargs = dict(
                 value=values[node],
-                on_change=update_nodes,
-                args=(dag, node, funcs),
+                on_change=on_change,
+                args=args,
                 key=node,
             )
             display_node(node, arg_types, ranges, values, st_kwargs)
+            if node in stale:
+                st.caption(f"{node} is stale, it's being recomputed")
+            elif node in late:
+                st.caption(
+                    f"{node} is stale: it, or a node it depends on, went over its"
+                    " time budget"
+                )
         st.button(
-            "Reload DAG from root nodes", on_click=reload_nodes, args=(dag, funcs)
+            "Reload DAG from root nodes",
+            on_click=reload_nodes,
+            args=(dag, funcs, caching, background),
         )
+        if debounce:
+            display_pending_changes(dag)
+        display_background_status(dag, background)
 
 
-def reload_nodes(dag, funcs):
+def reload_nodes(dag, funcs, caching=None, background=None):
     """
     Updates all nodes based on the values of the root nodes
     """
-    for node in dag.var_nodes:
-        if node not in dag.roots:
-            st.session_state[node] = _compute_node_value(node, funcs)
+    if CHANGES_KEY in st.session_state:
+        get_coalescer(dag).pop()  # the pending changes are covered by the reload
+    session = get_dag_session(dag, caching)
+    steps = session.plan.steps
+    nodes = [step.node for step in steps if step.node not in session.constants]
+    run_job(dag, partial(_evaluation_job, session, reload=True), nodes, background)
 
 
-def update_nodes(dag, node_ch, funcs):
+def update_nodes(dag, node_ch, funcs, caching=None, background=None):
     """
-    Updates successors of a changed node
+    Updates successors of a changed node (or of an iterable of changed nodes),
+    each exactly once and in topological order (on a worker thread with
+    `background`, see `run_job`)
     """
-    sub_nodes = [
-        node for node in list(successors(dag.graph, node_ch)) if isinstance(node, str)
-    ]
+    if isinstance(node_ch, str):
+        node_ch = (node_ch,)
+    session = get_dag_session(dag, caching)
+    session.set({node: st.session_state[node] for node in node_ch})
+    dirty = session.dirty
+    run_job(dag, partial(_evaluation_job, session), dirty, background)
+    return dirty
 
-    for node in sub_nodes:
-        st.session_state[node] = _compute_node_value(node, funcs)
 
+def get_dag_session(dag, caching=None, values=None):
+    """
+    Returns a `dagapp.session.DagSession` of dag, holding the values of its nodes
+    in values if given, and in the session state otherwise, and computing them
+    with the caches and placeholders of `caching` (see `get_caching_from_configs`)
+    """
+    from dagapp.session import DagSession
+
+    return DagSession(
+        dag,
+        st.session_state if values is None else values,
+        caches=get_node_caches(dag, caching),
+        placeholders=(caching or {}).get("placeholders"),
+        late=get_late(dag),
+        constants=get_constants(dag, caching),
+        cutoff=(caching or {}).get("cutoff"),
+    )
 
-def _compute_node_value(node, funcs):
+
+def get_constants(dag, caching=None):
     """
-    Compute the value for `node` by calling its function using positional
-    arguments for POSITIONAL_ONLY parameters and keyword arguments for the
-    remaining parameters. Values are taken from `st.session_state`.
+    Returns the values of the nodes of dag that are fixed for the life of the app:
+    the roots `caching["fixed"]` pins, and the nodes only depending on constants
+    (see `dagapp.folding.ConstantFolding`)
     """
-    func_node = funcs[node]
-    func = func_node.func
-    sig = inspect.signature(func)
-    args = []
-    kwargs = {}
-    for name, param in sig.parameters.items():
-        # If the parameter isn't present in session state but has a default,
-        # omit it so the function can use its default value.
-        if name not in st.session_state:
-            if param.default is not inspect._empty:
-                continue
-            # preserve previous behaviour: accessing missing keys will raise
-            # the same KeyError as before
-            _ = st.session_state[name]
-
-        if param.kind == Parameter.POSITIONAL_ONLY:
-            args.append(st.session_state[name])
-        elif param.kind == Parameter.VAR_POSITIONAL:
-            # expect an iterable in session_state[name]
-            args.extend(st.session_state.get(name, ()))
-        elif param.kind == Parameter.VAR_KEYWORD:
-            # expect a mapping in session_state[name]
-            kwargs.update(st.session_state.get(name, {}))
-        else:
-            kwargs[name] = st.session_state[name]
+    from dagapp.folding import constant_folding
+
+    return constant_folding(dag, (caching or {}).get("fixed")).constants
+
+
+def display_constant(node, value):
+    """
+    Displays the value of a node that is fixed for the life of the app (read-only)
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        st.number_input(node, value=value, disabled=True)
+    else:
+        st.text_input(node, value=str(value), disabled=True)
+
+
+def _evaluation_job(session, check, reload=False):
+    updated = session.reload(check) if reload else session.evaluate(check)
+    return {**session.snapshot(updated), late_key(session.dag): frozenset(session.late)}
+
+
+# ------------------------------------ DEBOUNCING ------------------------------------
+
+CHANGES_KEY = "_dagapp_changes"
+
+
+def get_coalescer(dag):
+    """
+    Returns the current session's `dagapp.debounce.ChangeCoalescer` of dag
+    """
+    from dagapp.debounce import ChangeCoalescer
+
+    coalescers = st.session_state.setdefault(CHANGES_KEY, {})
+    return coalescers.setdefault(dag_fingerprint(dag), ChangeCoalescer())
+
+
+def debounce_wait(debounce, node):
+    """
+    Returns how long (in seconds) to wait for other changes after a change of node,
+    according to a `debounce` config: a number of seconds for all the nodes, or a
+    dict of them for some nodes (the others being propagated right away)
+    """
+    if isinstance(debounce, Mapping):
+        return debounce.get(node, 0.0)
+    return debounce or 0.0
+
+
+def queue_change(dag, node, funcs, caching=None, background=None, debounce=None):
+    """
+    Records the change of a node, and updates the successors of all the changed
+    nodes (with a single `update_nodes`) if it's time to
+    """
+    get_coalescer(dag).add(node, debounce_wait(debounce, node))
+    flush_changes(dag, funcs, caching, background)
+
+
+def flush_changes(dag, funcs, caching=None, background=None):
+    """
+    Updates the successors of the nodes changed since the last update, if no
+    change came for long enough
+    """
+    coalescer = get_coalescer(dag)
+    if coalescer.due():
+        return update_nodes(dag, coalescer.pop(), funcs, caching, background)
+
+
+def display_pending_changes(dag):
+    """
+    Shows that changes are waiting to be propagated, and reruns the app when
+    they are due (so that `flush_changes` propagates them)
+    """
+    coalescer = get_coalescer(dag)
+    if not coalescer.pending:
+        return
+    st.caption("Waiting for more changes...")
+    interval = max(coalescer.time_left(), 0.05)
+    fragment = getattr(st, "fragment", None)
+    if fragment is None:  # streamlit < 1.37: block this script run instead
+        time.sleep(interval)
+        st.rerun()
+
+    @fragment(run_every=interval)
+    def poll():
+        if coalescer.due():
+            st.rerun()
+
+    poll()
+
 
-    return func(*args, **kwargs)
+def change_stats(dag):
+    """
+    Returns the numbers of changes, propagations and saved propagations of the
+    current session's debounced changes of dag
+    """
+    return get_coalescer(dag).stats
+
+
+# ------------------------------------ BACKGROUND RUNS ------------------------------------
+
+BACKGROUND_KEY = "_dagapp_background"
+
+
+def get_runner(dag):
+    """
+    Returns the current session's `dagapp.background.BackgroundRunner` of dag
+    """
+    from dagapp.background import BackgroundRunner
+
+    runners = st.session_state.setdefault(BACKGROUND_KEY, {})
+    return runners.setdefault(dag_fingerprint(dag), BackgroundRunner())
+
+
+def run_job(dag, job, stale=(), background=None):
+    """
+    Runs a job (a function of a `check` function returning a dict of session state
+    updates, see `dagapp.background.BackgroundRunner`) and applies its updates.
+
+    Without `background`, the job runs right away. With it (`True`, or a dict with
+    a `poll_interval`), it runs on a worker thread, superseding the job that is
+    still running (which is abandoned at its next check), and the keys in `stale`
+    keep their last values, marked as stale, until `sync_background` applies
+    the updates of the last job.
+    """
+    if background:
+        get_runner(dag).submit(job, stale)
+    else:
+        st.session_state.update(job(lambda: None))
+
+
+def sync_background(dag):
+    """
+    Applies the updates of the last background job of dag, if it finished since
+    they were last applied (so must be called before the widgets are displayed)
+    """
+    runners = st.session_state.get(BACKGROUND_KEY, {})
+    runner = runners.get(dag_fingerprint(dag))
+    results = runner.pop_results() if runner is not None else None
+    if results:
+        st.session_state.update(results)
+
+
+def late_key(dag):
+    """
+    Returns the session state key of the nodes of dag that are late: whose last
+    computation went over its time budget, or that depend on such a node
+    """
+    return f"_dagapp_late_{dag_fingerprint(dag)}"
+
+
+def get_late(dag):
+    """
+    Returns the nodes of dag whose displayed values are stale because their last
+    computation went over its time budget (an empty frozenset if there are none)
+    """
+    return st.session_state.get(late_key(dag), frozenset())
+
+
+def get_stale(dag):
+    """
+    Returns the session state keys of dag whose values a background job is
+    recomputing
+    """
+    runner = st.session_state.get(BACKGROUND_KEY, {}).get(dag_fingerprint(dag))
+    return runner.stale if runner is not None else frozenset()
+
+
+def display_background_status(dag, background=None):
+    """
+    Displays the status of the background job of dag, rerunning the app once it
+    finishes so that its results are shown
+    """
+    runner = st.session_state.get(BACKGROUND_KEY, {}).get(dag_fingerprint(dag))
+    if runner is None:
+        return
+    if runner.error is not None:
+        st.error(f"Recomputing failed: {runner.error!r}")
+    if not (runner.running or runner.pending):
+        return
+    from dagapp.background import DFLT_POLL_INTERVAL
+
+    interval = DFLT_POLL_INTERVAL
+    if isinstance(background, dict):
+        interval = background.get("poll_interval", interval)
+    st.caption("Recomputing in the background...")
+    fragment = getattr(st, "fragment", None)
+    if fragment is None:  # streamlit < 1.37: block this script run instead
+        time.sleep(interval)
+        st.rerun()
+
+    @fragment(run_every=interval)
+    def poll():
+        if not runner.running:
+            st.rerun()
+
+    poll()
 
 
 # ------------------------------------ STANDARD UTILS ------------------------------------
 
 
+def get_session_root_values(defaults):
+    """
+    Returns the current session's values of the roots of defaults (a dict of roots
+    to their default values), those that have none in the session keeping their
+    default
+    """
+    return {
+        root: st.session_state[root] if root in st.session_state else default
+        for root, default in defaults.items()
+    }
+
+
 def get_root_values(dag):
     """
     Returns the default values for all the root nodes found in dag
@@ -349,9 +1471,11 @@ def get_nodes(dag):
     """
     Returns the names of all nodes found in dag
     """
-    nodes = dag.sig.names
+    nodes = list(dag.sig.names)
+    seen = set(nodes)
     for node in dag.nodes:
-        if node not in nodes and isinstance(node, str):
+        if node not in seen and isinstance(node, str):
+            seen.add(node)
             nodes.append(node)
     return nodes
 
@@ -366,6 +1490,288 @@ def get_funcs(dag):
     return funcs
 
 
+def freeze(obj):
+    """
+    Returns a hashable version of `obj`, turning (nested) dicts, lists and sets
+    into tuples and frozensets, so that configs can be used as cache keys
+
+    >>> freeze({'arg_types': {'a': 'num'}, 'ranges': {'a': [0, 1]}})
+    (('arg_types', (('a', 'num'),)), ('ranges', (('a', (0, 1)),)))
+    """
+    if isinstance(obj, Mapping):
+        return tuple(sorted(((k, freeze(v)) for k, v in obj.items()), key=repr))
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(x) for x in obj)
+    if isinstance(obj, (set, frozenset)):
+        return frozenset(freeze(x) for x in obj)
+    try:
+        hash(obj)
+    except TypeError:
+        return repr(obj)
+    return obj
+
+
+def _code_fingerprint(code):
+    """
+    Returns a process-independent description of a code object (nested code
+    objects, such as those of inner functions, are described recursively)
+    """
+    consts = tuple(
+        _code_fingerprint(c) if inspect.iscode(c) else repr(c) for c in code.co_consts
+    )
+    return (code.co_code, consts, code.co_names, code.co_varnames)
+
+
+def _code_names(code):
+    """Returns the names a code object, and the code objects nested in it, use"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+@lru_cache(maxsize=None)
+def _library_paths():
+    paths = {sysconfig.get_path(name) for name in ("stdlib", "platstdlib")}
+    paths |= {sysconfig.get_path(name) for name in ("purelib", "platlib")}
+    paths |= set(site.getsitepackages() + [site.getusersitepackages()])
+    return tuple(os.path.join(path, "") for path in paths if path)
+
+
+def _is_library(module_name):
+    """
+    Returns whether a module is installed (part of the standard library or of a
+    site-packages directory) rather than being the code of the app, in which case
+    its functions are identified by name, and not by their code and dependencies
+    """
+    module = sys.modules.get(module_name or "")
+    if module is None:
+        return False  # e.g. code run by exec
+    file = getattr(module, "__file__", None)
+    if file is None:
+        return True  # built in
+    return os.path.abspath(file).startswith(_library_paths())
+
+
+_identities = dict()
+_identity_count = count()
+_identity_lock = threading.Lock()
+
+
+def _identity(obj):
+    """
+    Returns a number identifying obj among the objects given to `_identity` in
+    this process (unlike `id`, it isn't reused once obj is garbage collected)
+    """
+    with _identity_lock:
+        entry = _identities.get(id(obj))
+        if entry is not None and entry[0]() is obj:
+            return entry[1]
+        number = next(_identity_count)
+        try:
+            ref = weakref.ref(obj)
+            weakref.finalize(obj, _identities.pop, id(obj), None)
+        except TypeError:  # not weak-referenceable: kept alive instead
+            ref = partial(_identity_of, obj)
+        _identities[id(obj)] = (ref, number)
+        return number
+
+
+def _identity_of(obj):
+    return obj
+
+
+class _Fingerprinter:
+    """
+    Describes values, functions (with their code, defaults, closures, and the
+    globals they refer to), classes and dags in a process-independent way, or,
+    when a value can't be (e.g. it can't be pickled), by its identity in the
+    process, in which case `sound` is set to False.
+    """
+
+    def __init__(self):
+        self.sound = True
+        self._seen = set()
+
+    def describe(self, value):
+        if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+            return repr(value)
+        version = getattr(value, "__fingerprint__", None)
+        if version is not None and not inspect.isclass(value):
+            return ("version", _qualname(type(value)), repr(version))
+        if isinstance(value, (tuple, list)):
+            return (type(value).__name__, tuple(map(self.describe, value)))
+        if isinstance(value, (set, frozenset)):
+            items = sorted(map(self.describe, value), key=repr)
+            return (type(value).__name__, tuple(items))
+        if isinstance(value, dict):
+            items = ((self.describe(k), self.describe(v)) for k, v in value.items())
+            return ("dict", tuple(sorted(items, key=repr)))
+        if inspect.ismodule(value):
+            return ("module", value.__name__)
+        if isinstance(value, LazyModule):
+            return ("module", value._name)
+        if hasattr(value, "func_nodes"):
+            return ("dag", dag_structure(value), self.describe(value.func_nodes))
+        if hasattr(value, "func") and hasattr(value, "bind"):  # a FuncNode
+            return ("func_node", value.name, value.out, self.describe(value.func))
+        if isinstance(value, partial):
+            return (
+                "partial",
+                self.describe(value.func),
+                self.describe(value.args),
+                self.describe(value.keywords),
+            )
+        if inspect.ismethod(value):
+            return (
+                "method",
+                self.describe(value.__func__),
+                self.describe(value.__self__),
+            )
+        if inspect.isfunction(value):
+            return self._function(value)
+        if inspect.isclass(value):
+            return self._class(value)
+        if inspect.isbuiltin(value) or isinstance(value, type(len)):
+            return ("builtin", getattr(value, "__module__", None), _qualname(value))
+        return self._object(value)
+
+    def _function(self, func):
+        name = (func.__module__, func.__qualname__)
+        if _is_library(func.__module__):
+            return ("function", *name, _version(func.__module__))
+        if id(func) in self._seen:  # recursion
+            return ("function", *name)
+        self._seen.add(id(func))
+        closure = tuple(self._cell(cell) for cell in func.__closure__ or ())
+        globals_ = func.__globals__
+        referenced = tuple(
+            (name, self.describe(globals_[name]))
+            for name in sorted(_code_names(func.__code__))
+            if name in globals_
+        )
+        return (
+            "function",
+            *name,
+            _code_fingerprint(func.__code__),
+            self.describe(func.__defaults__),
+            self.describe(func.__kwdefaults__),
+            closure,
+            referenced,
+        )
+
+    def _cell(self, cell):
+        try:
+            contents = cell.cell_contents
+        except ValueError:  # an empty cell
+            return "<empty cell>"
+        return self.describe(contents)
+
+    def _class(self, cls):
+        name = (cls.__module__, cls.__qualname__)
+        if _is_library(cls.__module__):
+            return ("class", *name, _version(cls.__module__))
+        if id(cls) in self._seen:
+            return ("class", *name)
+        self._seen.add(id(cls))
+        methods = tuple(
+            (attr, self.describe(getattr(value, "__func__", value)))
+            for attr, value in sorted(vars(cls).items())
+            if inspect.isfunction(getattr(value, "__func__", value))
+        )
+        bases = tuple(map(self.describe, cls.__bases__))
+        return ("class", *name, bases, methods)
+
+    def _object(self, obj):
+        kind = self.describe(type(obj))  # covers the code of its methods
+        try:
+            data = pickle.dumps(obj, protocol=4)
+        except Exception:
+            self.sound = False
+            return ("identity", kind, _identity(obj))
+        return ("object", kind, hashlib.blake2b(data, digest_size=16).hexdigest())
+
+
+def _qualname(obj):
+    return (getattr(obj, "__module__", None), getattr(obj, "__qualname__", repr(obj)))
+
+
+def _version(module_name):
+    package = sys.modules.get((module_name or "").partition(".")[0])
+    return getattr(package, "__version__", None)
+
+
+def fingerprint(obj):
+    """
+    Returns a `(digest, sound)` pair, the hex digest identifying obj (a function,
+    a dag, or any value) and whether it's process-independent.
+
+    The digest of a function covers its code and defaults, the values its closure
+    holds and the globals it refers to, the functions and classes among those
+    being described the same way (unless they come from installed libraries,
+    that are identified by name and version), so that editing a helper function
+    or changing a constant changes the fingerprint of the functions using it.
+
+    Values are described by their pickled data. Those that can't be pickled are
+    identified by the object they are in this process (`sound` being False, as the
+    digest then can't identify obj in another process), unless they have a
+    `__fingerprint__` attribute, the version of their behavior.
+    """
+    fingerprinter = _Fingerprinter()
+    desc = fingerprinter.describe(obj)
+    digest = hashlib.blake2b(repr(desc).encode(), digest_size=16).hexdigest()
+    return digest, fingerprinter.sound
+
+
+def func_fingerprint(func):
+    """
+    Returns a hex digest identifying the code and defaults of `func`, the values
+    its closure holds and the globals (functions included) it refers to (see
+    `fingerprint`), so that changing any of those changes its fingerprint
+
+    >>> def mk(rate):
+    ...     def fee(amount):
+    ...         return amount * rate
+    ...     return fee
+    >>> func_fingerprint(mk(1.1)) == func_fingerprint(mk(1.1))
+    True
+    >>> func_fingerprint(mk(1.1)) == func_fingerprint(mk(2.0))
+    False
+    """
+    if hasattr(func, "func_nodes"):
+        return dag_fingerprint(func)
+    return fingerprint(func)[0]
+
+
+def dag_structure(dag):
+    """
+    Returns a hashable description of the nodes and edges of dag
+    """
+    return tuple((fn.name, fn.out, tuple(fn.bind.items())) for fn in dag.func_nodes)
+
+
+_fingerprints = dict()
+
+
+def dag_fingerprint(dag):
+    """
+    Returns a hex digest identifying the structure of dag and its functions (see
+    `func_fingerprint`).
+
+    Two DAGs built from the same functions get the same fingerprint, which is what
+    lets caches survive streamlit reruns (that rebuild the DAG objects each time).
+    The fingerprint of a given DAG object is computed once.
+    """
+    entry = _fingerprints.get(id(dag))
+    if entry is not None and entry[0]() is dag:
+        return entry[1]
+    fingerprint_ = fingerprint(dag)[0]
+    _fingerprints[id(dag)] = (weakref.ref(dag), fingerprint_)
+    weakref.finalize(dag, _fingerprints.pop, id(dag), None)
+    return fingerprint_
+
+
 def get_from_configs(configs):
     """
     Obtains information from user defined configs
@@ -375,6 +1781,204 @@ def get_from_configs(configs):
     return arg_types, ranges
 
 
+def get_caching_from_configs(configs):
+    """
+    Obtains how node results should be computed and cached from user defined configs:
+
+    - `configs["memoize"]` maps node names to `True` or to a dict of
+      `dagapp.cache.NodeMemo` arguments, e.g. `dict(max_entries=64, max_bytes=2**20)`,
+      to memoize them in each session
+    - `configs["share_results"]`, `True` or an iterable of node names, shares the
+      results of those (or all) nodes between sessions, through
+      `dagapp.cache.shared_results`
+    - `configs["time_budgets"]` maps node names to the number of seconds their
+      computation can take (see `dagapp.budget.TimeBudget`): a node that takes
+      longer keeps its last value (or its `configs["placeholders"]` value, if it
+      has none), and is shown as stale, as are the nodes depending on it, while
+      the rest of the dag is computed
+    - `configs["profile"]`, if true, records how long the computations of each
+      node take (see `display_profile`)
+    - `configs["fixed"]` maps roots to values they keep for the life of the app:
+      they aren't displayed as widgets, and the nodes that only depend on them
+      are computed once (see `dagapp.folding`)
+    - `configs["cutoff"]` decides when a recomputed node kept its value, so that
+      its successors aren't recomputed: "identity", "equality" (the default), a
+      (number) tolerance or "never", or a dict of them for some nodes (see
+      `dagapp.propagation.same_value`)
+    - `configs["persist_results"]`, `True` or an iterable of node names, keeps the
+      results of those (or all) nodes on disk, where they survive restarts and
+      are shared by all the processes of the host (see
+      `dagapp.disk_cache.DiskResultStore`), configured by the
+      `configs["result_store"]` dict of `dagapp.disk_cache.get_disk_store`
+      arguments, e.g. `dict(path="results.sqlite", ttl=86400, max_bytes=2**30,
+      max_entry_bytes=2**26)`. Results are keyed by the fingerprint of the node's
+      function (see `fingerprint`): nodes whose function depends on values that
+      can't be identified across processes aren't persisted
+    """
+    keys = (
+        "memoize",
+        "share_results",
+        "persist_results",
+        "result_store",
+        "time_budgets",
+        "placeholders",
+        "profile",
+        "fixed",
+        "cutoff",
+    )
+    return {k: configs[k] for k in keys if k in configs}
+
+
+MEMOS_KEY = "_dagapp_memos"
+
+
+def get_session_memos(dag, memoize):
+    """
+    Returns the current session's node memos of dag (a dict of nodes to
+    `dagapp.cache.NodeMemo`), making them the first time they are asked for
+    """
+    if not memoize:
+        return {}
+    from dagapp.cache import mk_memos
+
+    session_memos = st.session_state.setdefault(MEMOS_KEY, {})
+    key = (dag_fingerprint(dag), freeze(memoize))
+    if key not in session_memos:
+        session_memos[key] = mk_memos(memoize)
+    return session_memos[key]
+
+
+BUDGETS_KEY = "_dagapp_budgets"
+
+
+def get_session_budgets(dag, time_budgets):
+    """
+    Returns the current session's `dagapp.budget.TimeBudget`s of the nodes of dag
+    (which keep the overrunning calls of the nodes, to be picked up later)
+    """
+    if not time_budgets:
+        return {}
+    from dagapp.budget import TimeBudget
+
+    session_budgets = st.session_state.setdefault(BUDGETS_KEY, {})
+    key = (dag_fingerprint(dag), freeze(time_budgets))
+    if key not in session_budgets:
+        session_budgets[key] = {
+            node: TimeBudget(seconds) for node, seconds in time_budgets.items()
+        }
+    return session_budgets[key]
+
+
+def get_node_caches(dag, caching):
+    """
+    Returns a dict of nodes to the caches (objects with a `call(func, args, kwargs)`
+    method) their values should be computed through: the session's memo of the
+    node if it's memoized, then the shared results store if it's shared, then the
+    disk store if it's persisted
+    """
+    if not caching:
+        return {}
+    from dagapp.budget import Budgeted
+    from dagapp.cache import CacheChain, shared_results
+    from dagapp.profiling import Profiled
+
+    caches = {
+        node: CacheChain((memo, ()))
+        for node, memo in get_session_memos(dag, caching.get("memoize")).items()
+    }
+    share = caching.get("share_results")
+    if share:
+        dag_key = dag_fingerprint(dag)
+        if share is True:
+            share = [fn.out for fn in dag.func_nodes]
+        for node in share:
+            shared = shared_results.node_cache(dag_key, node)
+            caches[node] = caches[node] + shared if node in caches else shared
+    persist = caching.get("persist_results")
+    if persist:
+        from dagapp.disk_cache import get_disk_store
+
+        store = get_disk_store(**caching.get("result_store", {}))
+        funcs = {fn.out: fn.func for fn in dag.func_nodes}
+        if persist is True:
+            persist = list(funcs)
+        for node in persist:
+            stored = store.node_cache(node, funcs[node])
+            if stored is None:  # no fingerprint identifying the function on disk
+                continue
+            caches[node] = caches[node] + stored if node in caches else stored
+    budgets = get_session_budgets(dag, caching.get("time_budgets"))
+    for node, budget in budgets.items():
+        caches[node] = Budgeted(budget, caches.get(node))
+    if caching.get("profile"):
+        profiler = get_profiler(dag)
+        for func_node in dag.func_nodes:
+            node = func_node.out
+            caches[node] = Profiled(profiler, node, caches.get(node))
+    return caches
+
+
+PROFILES_KEY = "_dagapp_profiles"
+
+
+def get_profiler(dag):
+    """
+    Returns the current session's `dagapp.profiling.NodeProfiler` of dag
+    """
+    from dagapp.profiling import NodeProfiler
+
+    profilers = st.session_state.setdefault(PROFILES_KEY, {})
+    return profilers.setdefault(dag_fingerprint(dag), NodeProfiler())
+
+
+def profile_overlay(dag):
+    """
+    Returns the `dagapp.diagram.display_diagram` arguments showing the profile of
+    dag: its function nodes filled by cumulative cost, and its critical path
+    """
+    from dagapp.index import dag_index
+    from dagapp.profiling import cost_colors, critical_path
+
+    index, profiler = dag_index(dag), get_profiler(dag)
+    costs = cost_colors(profiler.costs())
+    fills = {index.funcs[node].name: color for node, color in costs.items()}
+    highlight = []
+    for node in critical_path(index, profiler.costs("mean")):
+        highlight.append(node)
+        if node in index.funcs:
+            highlight.append(index.funcs[node].name)
+    return dict(highlight=highlight, fills=fills)
+
+
+def display_profile(dag, col):
+    """
+    Displays the timings of the computations of the nodes of dag, and its critical
+    path (the chain of nodes that takes the longest to compute, on average)
+    """
+    from dagapp.index import dag_index
+    from dagapp.profiling import critical_path
+
+    profiler = get_profiler(dag)
+    stats = profiler.stats
+    with col.expander("Profile"):
+        if not stats:
+            st.write("No node was computed yet")
+            return
+        table = pd.DataFrame.from_dict(stats, orient="index")
+        st.dataframe(table.sort_values("total", ascending=False))
+        path = critical_path(dag_index(dag), profiler.costs("mean"))
+        st.write(f"Critical path: {' → '.join(path)}")
+        st.button("Reset profile", on_click=profiler.clear)
+
+
+def memo_stats(dag, caching):
+    """
+    Returns the hit/miss statistics of the current session's node memos of dag
+    """
+    memos = get_session_memos(dag, (caching or {}).get("memoize"))
+    return {node: memo.stats for node, memo in memos.items()}
+
+
 def get_default_configs(dags):
     """
     Returns default configs based on dags if the user did not provide them
@@ -409,8 +2013,9 @@ def check_configs(dags, configs):
         if "arg_types" not in config:
             st_error("You need to define an argument type for your root nodes!")
         else:
-            # ensure arg_types provides an entry per root node
-            if len(config["arg_types"]) < len(dag.roots):
+            # ensure arg_types provides an entry per (non fixed) root node
+            fixed = config.get("fixed", {})
+            if set(dag.roots) - set(config["arg_types"]) - set(fixed):
                 st_error(
                     "You need to define an argument type for all of your root nodes!"
                 )
@@ -0,0 +1,425 @@
+"""Evaluating DAG nodes on whole arrays of inputs"""
+
+import numpy as np
+
+from dagapp.utils import LazyModule
+
+pd = LazyModule("pandas")  # only the grid sweeps make tables
+
+VEC_MODES = ("auto", "broadcast", "elementwise", "parallel")
+
+_elementwise_nodes = set()  # keys of the nodes that turned out not to broadcast
+
+
+class NotBroadcastable(ValueError):
+    """Raised when a function doesn't give the right result on whole arrays"""
+
+
+def _from_objects(results):
+    """Return an object array of numbers as a numeric array (other objects as is)"""
+    results = np.asarray(results)
+    flat = results.ravel().tolist()
+    if all(isinstance(x, (bool, int, float, complex, np.number)) for x in flat):
+        numeric = np.array(flat)
+        if numeric.dtype != object:
+            return numeric.reshape(results.shape)
+    return results
+
+
+def elementwise_call(func, args):
+    """
+    Call func on each tuple of (python scalar) elements of the broadcast args
+
+    >>> elementwise_call(lambda a, b: a + b, [np.array([1, 2]), np.array([10, 20])])
+    array([11, 22])
+    >>> elementwise_call(lambda a, b: a + b, [np.array([1, 2]), np.array([[10], [20]])])
+    array([[11, 12],
+           [21, 22]])
+    """
+    return _from_objects(np.frompyfunc(func, len(args), 1)(*args))
+
+
+def _same(expected, got):
+    try:
+        return bool(np.isclose(expected, got, equal_nan=True))
+    except TypeError:
+        return bool(expected == got)
+
+
+def _overflowed(func, arrays, result):
+    """
+    Return the (flat) position of the first element of result that integer
+    arithmetic got wrong, found by calling func again on float64 copies of arrays
+    (that overflow to large or infinite values, not to wrapped around ones), or None
+    """
+    if not any(array.dtype.kind in "biu" for array in arrays):
+        return None
+    floats = [
+        array.astype(np.float64) if array.dtype.kind in "biu" else array
+        for array in arrays
+    ]
+    with np.errstate(all="ignore"):
+        try:
+            expected = np.asarray(func(*floats))
+            agree = np.isclose(result, expected, rtol=1e-9, atol=0, equal_nan=True)
+        except Exception:  # e.g. bitwise operations, that floats don't support
+            raise NotBroadcastable("Can't check the integer results for overflows")
+    agree = np.broadcast_to(agree, result.shape).reshape(-1)
+    return None if agree.all() else int(np.argmin(agree))
+
+
+def broadcast_call(func, args, check=(0, -1)):
+    """
+    Call func once on the whole arrays args, relying on numpy broadcasting.
+
+    Raises `NotBroadcastable` if func doesn't return an array of the broadcast shape
+    of the args, if its results at the `check` positions differ from calling it
+    on (python) scalars, or if any of its results differs from what func computes
+    on float copies of the integer args, as happens when numpy integers silently
+    overflow (see `_overflowed`).
+
+    >>> broadcast_call(lambda a, b: a * b, [np.arange(3), np.arange(3)])
+    array([0, 1, 4])
+    >>> broadcast_call(lambda a: 2 ** a, [np.array([1, 70])])
+    Traceback (most recent call last):
+      ...
+    dagapp.vectorize.NotBroadcastable: Results of the whole array and element 1 differ
+    >>> broadcast_call(lambda x: x ** 3, [np.array([1, 3_000_000, 2])])
+    Traceback (most recent call last):
+      ...
+    dagapp.vectorize.NotBroadcastable: Integer results of the whole array overflow at element 1
+    """
+    arrays = [np.asarray(arg) for arg in args]
+    shape = np.broadcast_shapes(*(array.shape for array in arrays))
+    result = func(*arrays)
+    if np.shape(result) != shape or np.asarray(result).dtype == object:
+        raise NotBroadcastable(f"Expected a result of shape {shape}")
+    result = np.asarray(result)
+    if result.size:
+        flat_args = [np.broadcast_to(array, shape).reshape(-1) for array in arrays]
+        for i in check:
+            expected = func(*(flat_arg[i].item() for flat_arg in flat_args))
+            if not _same(expected, result.reshape(-1)[i].item()):
+                raise NotBroadcastable(
+                    f"Results of the whole array and element {i % result.size} differ"
+                )
+        position = _overflowed(func, arrays, result)
+        if position is not None:
+            raise NotBroadcastable(
+                f"Integer results of the whole array overflow at element {position}"
+            )
+    return result
+
+
+def vectorized_call(func, args, mode="auto", key=None, executor=None):
+    """
+    Call func on the arrays args, with the given mode:
+
+    - "broadcast": on the whole arrays at once (see `broadcast_call`)
+    - "elementwise": on each tuple of elements (see `elementwise_call`)
+    - "parallel": on each tuple of elements, spread over the processes of executor
+      (a `dagapp.parallel.SweepExecutor`, the default one if not given), for
+      CPU-bound functions that don't broadcast
+    - "auto": broadcast, falling back to elementwise if func doesn't support it, in
+      which case `key` (if given) is remembered to go straight to elementwise next
+      time
+
+    >>> def double(x):
+    ...     return 2 * x
+    >>> def clip(x):
+    ...     return x if x > 1 else 1
+    >>> vectorized_call(double, [np.arange(3)])
+    array([0, 2, 4])
+    >>> vectorized_call(clip, [np.arange(3)])
+    array([1, 1, 2])
+    """
+    if mode not in VEC_MODES:
+        raise ValueError(f"mode should be one of {VEC_MODES}, was {mode!r}")
+    if mode == "auto" and key is not None and key in _elementwise_nodes:
+        mode = "elementwise"
+    if mode == "elementwise":
+        return elementwise_call(func, args)
+    if mode == "broadcast":
+        return broadcast_call(func, args)
+    if mode == "parallel":
+        if executor is None:
+            from dagapp.parallel import get_sweep_executor
+
+            executor = get_sweep_executor()
+        return executor.map(func, args)
+    try:
+        return broadcast_call(func, args)
+    except Exception:
+        if key is not None:
+            _elementwise_nodes.add(key)
+        return elementwise_call(func, args)
+
+
+class _KwargsCaller:
+    """Calls func with its last arguments as keyword arguments (and pickles)"""
+
+    def __init__(self, func, n_args, names):
+        self.func, self.n_args, self.names = func, n_args, names
+
+    def __call__(self, *xs):
+        kwargs = dict(zip(self.names, xs[self.n_args :]))
+        return self.func(*xs[: self.n_args], **kwargs)
+
+
+def call_step(step, values, mode="auto", executor=None):
+    """
+    Call the function of a `dagapp.plan.NodeStep` on the arrays of values, with the
+    given mode (see `vectorized_call`)
+    """
+    args, kwargs = step.bind(values)
+    if not kwargs:
+        return vectorized_call(step.func, args, mode, key=step, executor=executor)
+    func = _KwargsCaller(step.func, len(args), tuple(kwargs))
+    return vectorized_call(
+        func, [*args, *kwargs.values()], mode, key=step, executor=executor
+    )
+
+
+# ------------------------------------ GRID SWEEPS ------------------------------------
+
+DFLT_GRID_CHUNK_SIZE = 100_000
+
+
+def root_supports(plan):
+    """
+    Return a dict mapping each node of plan to the set of roots it depends on
+    """
+    supports = dict()
+    steps = {step.node: step for step in plan.steps}
+    for node in plan.nodes:
+        if node in steps:
+            supports[node] = frozenset().union(
+                *(supports[source] for source in steps[node].sources)
+            )
+        else:
+            supports[node] = frozenset([node])
+    return supports
+
+
+def _grid_chunks(
+    index,
+    ranges,
+    nodes=None,
+    *,
+    fixed=None,
+    modes=None,
+    chunk_size=None,
+    executor=None,
+    check=None,
+    profiler=None,
+):
+    """
+    Evaluate nodes over the Cartesian product of the ranges of some roots, yielding
+    the results chunk by chunk, as tables indexed by the values of the swept roots.
+
+    The nodes whose sub-grid (that of the swept roots they depend on) has at most
+    `chunk_size` points are computed once, on that sub-grid: their values are
+    arrays with one axis per swept root, of size 1 for the roots the node doesn't
+    depend on, that numpy broadcasting combines. The grid is then walked, in the
+    order of the Cartesian product, in slices of `chunk_size` points, on which the
+    other nodes are computed (as 1d arrays, with the values of the nodes they
+    depend on taken at the points of the slice), so that memory stays bounded by
+    the chunk size whatever the shape of the grid.
+
+    :param index: The `dagapp.index.DagIndex` of the dag
+    :param ranges: A mapping of (swept) root names to 1d arrays of their values
+    :param nodes: The nodes to output (all the non-root nodes by default)
+    :param fixed: Values of the roots that aren't swept (defaults to the dag's)
+    :param modes: A mapping of nodes to the `VEC_MODES` to call their functions with
+    :param chunk_size: The maximum number of grid points per chunk
+    :param executor: The `dagapp.parallel.SweepExecutor` of the "parallel" nodes
+    :param check: A function called before computing each chunk (that can raise to
+        abandon the sweep)
+    :param profiler: A `dagapp.profiling.NodeProfiler` timing the computations of
+        the nodes
+    """
+    plan = index.plan
+    steps = {step.node: step for step in plan.steps}
+    swept = list(ranges)
+    axes = {root: i for i, root in enumerate(swept)}
+    shape = [len(ranges[root]) for root in swept]
+    nodes = list(nodes or (node for node in plan.nodes if node in steps))
+    modes = modes or {}
+    chunk_size = chunk_size or DFLT_GRID_CHUNK_SIZE
+
+    # the non-root nodes the output nodes need, and the swept roots they depend on
+    needed = set(nodes)
+    for node in reversed(plan.nodes):
+        if node in needed and node in steps:
+            needed.update(steps[node].sources)
+    supports = root_supports(plan)
+    swept_supports = {node: supports[node] & axes.keys() for node in plan.nodes}
+
+    def axis_array(root, values):
+        return np.asarray(values).reshape(
+            [-1 if i == axes[root] else 1 for i in range(len(swept))]
+        )
+
+    def evaluate(values, node_subset):
+        for step in plan.steps:
+            if step.node in node_subset:
+                mode = modes.get(step.node, "auto")
+                if profiler is None:
+                    values[step.out] = call_step(step, values, mode, executor)
+                else:
+                    args = (step, values, mode, executor)
+                    values[step.out] = profiler.call(step.node, call_step, args, {})
+
+    values = plan.load({**index.defaults, **(fixed or {})})
+    for root in swept:
+        values[plan.slot[root]] = axis_array(root, ranges[root])
+
+    if not swept:
+        evaluate(values, needed)
+        yield _grid_table(plan, values, nodes, swept, ranges)
+        return
+
+    def grid_size(node):
+        return int(np.prod([shape[axes[root]] for root in swept_supports[node]]))
+
+    # computed once, on their sub-grid: the nodes that don't depend on many points
+    once = {node for node in needed if node in steps and grid_size(node) <= chunk_size}
+    evaluate(values, once)
+    per_chunk = {node for node in needed if node in steps and node not in once}
+    # the swept values (roots and nodes computed once) to take at each chunk's points
+    used = set(nodes).union(*(steps[node].sources for node in per_chunk))
+    gathered = [
+        node
+        for node in plan.nodes
+        if node in used and swept_supports[node] and (node in once or node in axes)
+    ]
+
+    size = int(np.prod(shape))
+    for start in range(0, size, chunk_size):
+        if check is not None:
+            check()
+        points = np.unravel_index(
+            np.arange(start, min(start + chunk_size, size)), shape
+        )
+        chunk_values = list(values)
+        for node in gathered:
+            slot = plan.slot[node]
+            chunk_values[slot] = np.broadcast_to(values[slot], shape)[points]
+        evaluate(chunk_values, per_chunk)
+        chunk_index = pd.MultiIndex.from_arrays(
+            [np.asarray(ranges[root])[points[axes[root]]] for root in swept],
+            names=swept,
+        )
+        n = len(chunk_index)
+        columns = {
+            node: (
+                chunk_values[plan.slot[node]]
+                if swept_supports[node]
+                else np.broadcast_to(np.asarray(chunk_values[plan.slot[node]]), n)
+            )
+            for node in nodes
+        }
+        yield pd.DataFrame(columns, index=chunk_index)
+
+
+def iter_grid_sweep(
+    index,
+    ranges,
+    nodes=None,
+    *,
+    fixed=None,
+    modes=None,
+    chunk_size=None,
+    executor=None,
+    check=None,
+    profiler=None,
+):
+    """
+    Evaluate nodes over the Cartesian product of the ranges of some roots, yielding
+    the results in chunks of at most `chunk_size` points, in the order of the
+    Cartesian product: tables indexed by the values of the swept roots (see
+    `grid_sweep`). Memory stays bounded by the chunk size, even when the range of
+    a single root is bigger than it:
+
+    >>> from meshed.dag import DAG
+    >>> from dagapp.index import DagIndex
+    >>> def result(a, c):
+    ...     return a * c
+    >>> index = DagIndex(DAG([result]))
+    >>> grid = dict(a=np.arange(3), c=np.arange(1, 4))
+    >>> [len(table) for table in iter_grid_sweep(index, grid, chunk_size=2)]
+    [2, 2, 2, 2, 1]
+    >>> pd.concat(iter_grid_sweep(index, grid, chunk_size=2))['result'].tolist()
+    [0, 0, 0, 1, 2, 3, 2, 4, 6]
+    """
+    return _grid_chunks(
+        index,
+        ranges,
+        nodes,
+        fixed=fixed,
+        modes=modes,
+        chunk_size=chunk_size,
+        executor=executor,
+        check=check,
+        profiler=profiler,
+    )
+
+
+def _grid_table(plan, values, nodes, swept, ranges):
+    shape = [len(ranges[root]) for root in swept]
+    index = pd.MultiIndex.from_product([ranges[root] for root in swept], names=swept)
+    columns = {
+        node: np.broadcast_to(np.asarray(values[plan.slot[node]]), shape).reshape(-1)
+        for node in nodes
+    }
+    return pd.DataFrame(columns, index=index)
+
+
+def grid_sweep(
+    index,
+    ranges,
+    nodes=None,
+    *,
+    fixed=None,
+    modes=None,
+    chunk_size=None,
+    executor=None,
+    check=None,
+    profiler=None,
+):
+    """
+    Evaluate nodes over the Cartesian product of the ranges of some roots, returning
+    a table indexed by the values of the swept roots (see `_grid_chunks` for how
+    it's evaluated, and `iter_grid_sweep` to get it in chunks).
+
+    >>> from meshed.dag import DAG
+    >>> from dagapp.index import DagIndex
+    >>> def b(a):
+    ...     return 2 * a
+    >>> def d(c):
+    ...     return c + 1
+    >>> def result(b, d):
+    ...     return b * d
+    >>> index = DagIndex(DAG((b, d, result)))
+    >>> grid_sweep(index, dict(a=np.array([1, 2]), c=np.array([0, 1, 2])), chunk_size=2)
+         b  d  result
+    a c
+    1 0  2  1       2
+      1  2  2       4
+      2  2  3       6
+    2 0  4  1       4
+      1  4  2       8
+      2  4  3      12
+    """
+    chunks = _grid_chunks(
+        index,
+        ranges,
+        nodes,
+        fixed=fixed,
+        modes=modes,
+        chunk_size=chunk_size,
+        executor=executor,
+        check=check,
+        profiler=profiler,
+    )
+    return pd.concat(chunks)